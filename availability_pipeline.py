@@ -0,0 +1,135 @@
+"""Producer/consumer availability lookups that run alongside category pagination."""
+
+import logging
+import math
+import queue
+import threading
+
+import metrics
+
+
+_STOP = object()
+
+
+class AvailabilityPipeline:
+    """
+    Drain a bounded queue of SKU IDs with a pool of availability workers.
+
+    The crawl pushes SKU IDs as each search page is parsed, so availability
+    lookups overlap with pagination instead of waiting for the whole crawl.
+    Duplicate and null SKU IDs are dropped on submit.
+
+    Parameters:
+        fetch_status (callable): Returns the availability status of one SKU ID.
+        workers (int): Number of worker threads.
+        queue_size (int): Maximum number of SKU IDs waiting; producers block when full.
+    """
+
+    def __init__(self, fetch_status, workers=12, queue_size=1000):
+        self.fetch_status = fetch_status
+        self.workers = max(1, int(workers))
+        self.statuses = {}
+        self.submitted = 0
+        self.completed = 0
+        self._queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._seen_sku_ids = set()
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._threads = []
+        self._progress = metrics.ProgressReporter("availability lookups")
+
+    def start(self):
+        for worker_number in range(self.workers):
+            thread = threading.Thread(
+                target=self._work,
+                name=f"availability-{worker_number + 1}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def _work(self):
+        while True:
+            sku_id = self._queue.get()
+            try:
+                if sku_id is _STOP:
+                    return
+                if self._cancelled.is_set():
+                    continue
+                try:
+                    status = self.fetch_status(sku_id)
+                except Exception as e:
+                    logging.warning(f"Availability fetch failed for SKU ID {sku_id}: {e}")
+                    status = "N/A"
+                with self._lock:
+                    self.statuses[sku_id] = status
+                    self.completed += 1
+                    completed, submitted = self.completed, self.submitted
+                self._progress.update(completed, submitted)
+            finally:
+                self._queue.task_done()
+
+    def preload(self, statuses):
+        """Treat SKU IDs with known statuses (e.g. from a checkpoint) as already looked up."""
+        with self._lock:
+            self.statuses.update(statuses)
+            self._seen_sku_ids.update(statuses)
+
+    def spill(self, seen_sku_ids, statuses):
+        """
+        Move the submitted SKU IDs and the statuses into disk-backed containers.
+
+        Parameters:
+            seen_sku_ids (MutableSet): E.g. a memory_budget.DiskSet.
+            statuses (MutableMapping): E.g. a memory_budget.DiskDict; close() returns it.
+        """
+        with self._lock:
+            seen_sku_ids.update(self._seen_sku_ids)
+            statuses.update(self.statuses)
+            self._seen_sku_ids = seen_sku_ids
+            self.statuses = statuses
+
+    def submit(self, sku_id):
+        """Queue one SKU ID unless it is null or was already submitted."""
+        if sku_id is None or (isinstance(sku_id, float) and math.isnan(sku_id)):
+            return
+        with self._lock:
+            if sku_id in self._seen_sku_ids:
+                return
+            self._seen_sku_ids.add(sku_id)
+            self.submitted += 1
+        self._queue.put(sku_id)
+        metrics.get_metrics().set_gauge("availability_queue_depth", self._queue.qsize())
+
+    def submit_many(self, sku_ids):
+        for sku_id in sku_ids:
+            self.submit(sku_id)
+
+    def close(self):
+        """
+        Wait for every queued SKU ID to be looked up and stop the workers.
+
+        Returns:
+            dict: A dictionary mapping SKU IDs to their availability statuses.
+        """
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        return self.statuses
+
+    def cancel(self):
+        """Drop queued SKU IDs and stop the workers after their current lookup."""
+        self._cancelled.set()
+        return self.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.cancel()
+        else:
+            self.close()
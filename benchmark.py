@@ -0,0 +1,229 @@
+"""End-to-end benchmark: run both pipeline stages against the local mock retailer and report throughput."""
+
+from pathlib import Path
+import argparse
+import copy
+import json
+import logging
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import yaml
+
+from mock_retailer import add_catalog_arguments, build_retailer
+import http_client
+import memory_budget
+import menu_extractor
+import product_catalog_scraper
+
+
+EXAMPLE_CONFIG_PATH = Path(__file__).resolve().with_name("config.example.yaml")
+
+IMPORT_TIME_MODULES = ["cli", "http_client", "menu_extractor", "product_catalog_scraper", "sharding"]
+
+HEAVY_MODULES = ["numpy", "openpyxl", "pandas", "pyarrow"]
+
+# Run in a fresh interpreter per measurement, so earlier imports are not cached.
+IMPORT_TIME_SCRIPT = """
+import importlib, json, sys, time
+started = time.perf_counter()
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - started
+print(json.dumps({"seconds": seconds, "heavy_modules": [name for name in sys.argv[2:] if name in sys.modules]}))
+"""
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers; None for an empty list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered), max(1, math.ceil(fraction * len(ordered)))) - 1]
+
+
+def process_peak_rss_mb():
+    """
+    Peak resident set size of the whole benchmark process so far, in MB.
+
+    This is a process-lifetime high-water mark: it includes the in-process mock
+    retailer and any earlier runs in the same process, not just the last run.
+    """
+    return memory_budget.peak_rss_mb()
+
+
+def count_exported_rows(path):
+    path = Path(path)
+    if path.suffix == ".jsonl":
+        with open(path, "r", encoding="utf-8") as export_file:
+            return sum(1 for _ in export_file)
+    import pandas as pd
+
+    if path.suffix == ".csv":
+        return len(pd.read_csv(path))
+    if path.suffix == ".parquet":
+        return len(pd.read_parquet(path))
+    return len(pd.read_excel(path))
+
+
+def measure_import_times(module_names=IMPORT_TIME_MODULES, repeat=3):
+    """
+    Time a cold import of each module in a fresh interpreter.
+
+    Returns:
+        dict: Per module, the best of ``repeat`` import times in milliseconds and the
+            heavy optional dependencies (pandas, numpy, openpyxl, pyarrow) the import pulled in.
+    """
+    report = {}
+    for module_name in module_names:
+        timings = []
+        for _ in range(repeat):
+            completed = subprocess.run(
+                [sys.executable, "-c", IMPORT_TIME_SCRIPT, module_name, *HEAVY_MODULES],
+                cwd=Path(__file__).resolve().parent,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            timings.append(json.loads(completed.stdout))
+        report[module_name] = {
+            "import_ms": round(min(timing["seconds"] for timing in timings) * 1000, 1),
+            "heavy_modules": timings[0]["heavy_modules"],
+        }
+    return report
+
+
+def build_config(retailer, overrides=None, page_size=15):
+    """
+    Build a pipeline config for a benchmark run from config.example.yaml.
+
+    Endpoints point at the mock retailer; checkpointing, caching and delta mode
+    are off so every run measures a cold, full crawl unless ``overrides`` says otherwise.
+    """
+    with open(EXAMPLE_CONFIG_PATH, "r", encoding="utf-8") as config_file:
+        config = yaml.safe_load(config_file)
+    config.update(retailer.config(page_size=page_size))
+    config["io"]["checkpoint_filename"] = None
+    config["io"]["output_filename_template"] = "benchmark_{brand_name}.xlsx"
+    config["runtime"]["response_cache"] = {}
+    config["delta"] = {"enabled": False}
+    for section, values in (overrides or {}).items():
+        config.setdefault(section, {}).update(values)
+    return config
+
+
+def run_benchmark(retailer, overrides=None, page_size=15, workdir=None):
+    """
+    Run menu_extractor and product_catalog_scraper against a started mock retailer.
+
+    Returns:
+        dict: Timings, request and product throughput, client latency percentiles and
+            the process-lifetime peak RSS.
+    """
+    config = build_config(retailer, overrides, page_size)
+    latencies = []
+
+    def record_latency(response, *args, **kwargs):
+        latencies.append(response.elapsed.total_seconds())
+
+    original_cwd = os.getcwd()
+    previous_config = product_catalog_scraper.CONFIG
+    http_client.add_response_hook(record_latency)
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        os.chdir(workdir or temporary_directory)
+        try:
+            stage_1_started = time.perf_counter()
+            menu_extractor.main(copy.deepcopy(config))
+            stage_1_seconds = time.perf_counter() - stage_1_started
+
+            product_catalog_scraper.configure(copy.deepcopy(config))
+            stage_2_started = time.perf_counter()
+            product_catalog_scraper.main()
+            stage_2_seconds = time.perf_counter() - stage_2_started
+
+            export_name = "benchmark_MockRetail.xlsx"
+            output_format = config["io"].get("output_format", "excel")
+            if output_format != "excel":
+                export_name = str(Path(export_name).with_suffix(f".{output_format}"))
+            products = count_exported_rows(export_name)
+        finally:
+            os.chdir(original_cwd)
+            http_client.remove_response_hook(record_latency)
+            product_catalog_scraper.configure(previous_config)
+
+    requests_served = sum(
+        count for key, count in retailer.request_counts.items() if key not in ("throttled", "errors")
+    )
+    total_requests = requests_served + retailer.request_counts["throttled"] + retailer.request_counts["errors"]
+    total_seconds = stage_1_seconds + stage_2_seconds
+    return {
+        "catalog_products": retailer.catalog.product_count,
+        "exported_products": products,
+        "stage_1_seconds": round(stage_1_seconds, 3),
+        "stage_2_seconds": round(stage_2_seconds, 3),
+        "requests": total_requests,
+        "requests_per_second": round(total_requests / total_seconds, 1) if total_seconds else None,
+        "products_per_second": round(products / stage_2_seconds, 1) if stage_2_seconds else None,
+        "latency_ms": {
+            name: None if value is None else round(value * 1000, 2)
+            for name, value in (
+                ("p50", percentile(latencies, 0.50)),
+                ("p95", percentile(latencies, 0.95)),
+                ("p99", percentile(latencies, 0.99)),
+            )
+        },
+        "server_counts": dict(retailer.request_counts),
+        "process_peak_rss_mb": process_peak_rss_mb(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_catalog_arguments(parser)
+    parser.add_argument("--page-size", type=int, default=15)
+    parser.add_argument("--crawl-engine", choices=["serial", "async"], default="serial")
+    parser.add_argument("--availability-mode", choices=["pipeline", "barrier"], default="pipeline")
+    parser.add_argument("--output-format", choices=["excel", "csv", "jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--no-rate-limit", action="store_true", help="Disable client-side rate limiting.")
+    parser.add_argument("--parse-workers", type=int, default=0, help="Worker processes decoding search pages.")
+    parser.add_argument("--json-decoder", choices=["auto", "json"], default="auto")
+    parser.add_argument("--memory-budget", type=float, default=None, metavar="MB", help="Stage-2 memory budget.")
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    parser.add_argument(
+        "--import-time",
+        action="store_true",
+        help="Only measure the cold import time of the pipeline modules; no crawl is run.",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s", force=True)
+    overrides = {
+        "runtime": {
+            "crawl_engine": args.crawl_engine,
+            "availability_mode": args.availability_mode,
+            "parse_workers": args.parse_workers,
+            "json_decoder": args.json_decoder,
+            "memory_budget_mb": args.memory_budget,
+        },
+        "io": {"output_format": args.output_format},
+    }
+    if args.no_rate_limit:
+        overrides["runtime"]["rate_limit"] = {"enabled": False}
+    if args.import_time:
+        report = {"imports": measure_import_times()}
+    else:
+        with build_retailer(args) as retailer:
+            report = run_benchmark(retailer, overrides, page_size=args.page_size)
+    report["settings"] = vars(args)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
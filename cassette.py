@@ -0,0 +1,143 @@
+"""HTTP cassettes: record every fetched response body into a compressed, indexed archive and replay it offline."""
+
+from pathlib import Path
+import atexit
+import json
+import logging
+import mmap
+import threading
+import time
+import zlib
+
+
+def index_path(path):
+    return Path(f"{path}.index")
+
+
+class CassetteWriter:
+    """
+    Append response bodies to a cassette.
+
+    Each body is zlib-compressed on its own and appended to the archive; a
+    ``<archive>.index`` JSON-lines sidecar maps its URL to the offset and
+    length. Recording into an existing cassette appends, so stage 1 and
+    stage 2 can record into the same file; a URL recorded twice keeps its last
+    body.
+
+    Parameters:
+        path (str): Archive file.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._archive = open(self.path, "ab")
+        self._index = open(index_path(self.path), "a", encoding="utf-8")
+
+    def record(self, url, body):
+        compressed = zlib.compress(body)
+        with self._lock:
+            offset = self._archive.tell()
+            self._archive.write(compressed)
+            self._index.write(json.dumps({"url": url, "offset": offset, "length": len(compressed)}) + "\n")
+            self.recorded += 1
+
+    def close(self):
+        with self._lock:
+            self._archive.close()
+            self._index.close()
+        logging.info(f"Cassette: recorded {self.recorded} responses into {self.path}")
+
+
+class CassetteReader:
+    """
+    Serve recorded response bodies from a memory-mapped cassette.
+
+    Parameters:
+        path (str): Archive file written by CassetteWriter.
+        latency (float): Seconds slept before each replayed response, to simulate the network.
+    """
+
+    def __init__(self, path, latency=0.0):
+        self.path = str(path)
+        self.latency = float(latency)
+        self.replayed = 0
+        self.missing = 0
+        self._lock = threading.Lock()
+        self._archive = open(self.path, "rb")
+        size = Path(self.path).stat().st_size
+        self._map = mmap.mmap(self._archive.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.offsets = {}
+        with open(index_path(self.path), "r", encoding="utf-8") as index_file:
+            for line in index_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a torn last line from an interrupted recording
+                if entry["offset"] + entry["length"] <= size:
+                    self.offsets[entry["url"]] = (entry["offset"], entry["length"])
+
+    def get(self, url):
+        """
+        Return the recorded body of ``url``.
+
+        Returns:
+            bytes: The decompressed body, or None when the URL was not recorded.
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        location = self.offsets.get(url)
+        with self._lock:
+            if location is None:
+                self.missing += 1
+                return None
+            self.replayed += 1
+        offset, length = location
+        return zlib.decompress(self._map[offset:offset + length])
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._archive.close()
+        logging.info(f"Cassette: replayed {self.replayed} responses from {self.path}, {self.missing} not recorded")
+
+
+_writer = None
+_reader = None
+
+
+def configure(runtime_config):
+    """Apply the ``runtime.cassette`` section: "off", "record" or "replay"."""
+    global _writer, _reader
+    close()
+    settings = runtime_config.get("cassette") or {}
+    mode = settings.get("mode", "off")
+    if mode in (None, False, "off"):
+        return
+    path = settings.get("path", "responses.cassette")
+    if mode == "record":
+        _writer = CassetteWriter(path)
+    elif mode == "replay":
+        _reader = CassetteReader(path, latency=float(settings.get("latency_ms", 0)) / 1000)
+    else:
+        raise ValueError(f"Unknown cassette mode '{mode}'; expected 'off', 'record' or 'replay'")
+
+
+def get_writer():
+    return _writer
+
+
+def get_reader():
+    return _reader
+
+
+@atexit.register
+def close():
+    global _writer, _reader
+    if _writer is not None:
+        _writer.close()
+        _writer = None
+    if _reader is not None:
+        _reader.close()
+        _reader = None
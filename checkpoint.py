@@ -0,0 +1,108 @@
+"""Append-only JSONL checkpoint journal so an interrupted stage-2 run can resume where it stopped."""
+
+from pathlib import Path
+import json
+import logging
+import threading
+
+
+class CheckpointJournal:
+    """
+    Durable record of crawl progress.
+
+    Every fetched search page, finished category and availability status is
+    appended as one JSON line and flushed straight away, so the journal survives
+    the process being killed. A resumed run replays the journal instead of
+    refetching that work.
+
+    Record types:
+        category: ``{"type": "category", "key", "info"}`` - category-level fields
+        page: ``{"type": "page", "key", "page", "products"}`` - raw products of one page
+        category_done: ``{"type": "category_done", "key"}`` - pagination finished
+        availability: ``{"type": "availability", "sku_id", "status"}``
+
+    Parameters:
+        path (str): Journal file path.
+        resume (bool): Load an existing journal instead of starting a new one.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = Path(path)
+        self.categories = {}
+        self.statuses = {}
+        self._lock = threading.Lock()
+        if resume and self.path.exists():
+            self._load()
+            logging.info(
+                f"Resuming from {self.path}: {sum(1 for c in self.categories.values() if c['done'])} "
+                f"completed categories, {len(self.statuses)} availability statuses"
+            )
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+
+    def _category(self, key):
+        return self.categories.setdefault(key, {"info": None, "pages": {}, "done": False})
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as journal_file:
+            for line_number, line in enumerate(journal_file, start=1):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A run killed mid-write leaves a partial last line.
+                    logging.warning(f"Ignoring unreadable checkpoint line {line_number} in {self.path}")
+                    continue
+                record_type = record.get("type")
+                if record_type == "category":
+                    self._category(record["key"])["info"] = record["info"]
+                elif record_type == "page":
+                    self._category(record["key"])["pages"][record["page"]] = record["products"]
+                elif record_type == "category_done":
+                    self._category(record["key"])["done"] = True
+                elif record_type == "availability":
+                    self.statuses[record["sku_id"]] = record["status"]
+
+    def _append(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def category_info(self, key):
+        """Return the saved category-level fields of a category, or None."""
+        category = self.categories.get(key)
+        return category["info"] if category else None
+
+    def saved_pages(self, key):
+        """
+        Return what is already known about a category's pages.
+
+        Returns:
+            tuple: (products of each saved page in page order, next page number to fetch, category finished).
+        """
+        category = self.categories.get(key)
+        if not category:
+            return [], 1, False
+        page_numbers = sorted(category["pages"])
+        next_page = page_numbers[-1] + 1 if page_numbers else 1
+        return [category["pages"][number] for number in page_numbers], next_page, category["done"]
+
+    def record_category(self, key, info):
+        self._category(key)["info"] = info
+        self._append({"type": "category", "key": key, "info": info})
+
+    def record_page(self, key, page_number, products):
+        self._append({"type": "page", "key": key, "page": page_number, "products": products})
+
+    def record_category_done(self, key):
+        self._category(key)["done"] = True
+        self._append({"type": "category_done", "key": key})
+
+    def record_availability(self, sku_id, status):
+        self._append({"type": "availability", "sku_id": sku_id, "status": status})
+
+    def close(self, remove=False):
+        """Close the journal; ``remove`` deletes it once the run has been exported."""
+        with self._lock:
+            self._file.close()
+        if remove:
+            self.path.unlink(missing_ok=True)
@@ -0,0 +1,46 @@
+"""Command-line entry point for both pipeline stages and their tools: ``python cli.py <command> [options]``."""
+
+import argparse
+import importlib
+import logging
+
+
+# command: (module, function taking argv, help). A command's module is only imported when it runs,
+# so ``--help`` and every command only pay for the imports they use.
+COMMANDS = {
+    "menu": ("menu_extractor", "run_cli", "Stage 1: export the navigation menu categories to Excel."),
+    "products": ("product_catalog_scraper", "run_cli", "Stage 2: crawl the categories' products and export them."),
+    "pipeline": ("pipeline", "run_cli", "Both stages in one process, crawling categories as stage 1 emits them."),
+    "shard": ("sharding", "run_cli", "Stage 2 across several worker processes or hosts."),
+    "history": ("history_store", "main", "Backfill or query the price and availability history."),
+    "benchmark": ("benchmark", "main", "Run both stages against the local mock retailer."),
+}
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        epilog="Run '<command> --help' for the options of a command.",
+    )
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command, (_, _, help_text) in COMMANDS.items():
+        # Everything after the command, --help included, is parsed by the command's module.
+        subparsers.add_parser(command, help=help_text, add_help=False)
+    args, arguments = parser.parse_known_args(argv)
+    args.arguments = arguments
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=getattr(logging, args.log_level), format=LOG_FORMAT)
+    module_name, function_name, _ = COMMANDS[args.command]
+    module = importlib.import_module(module_name)
+    return getattr(module, function_name)(args.arguments)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""Incremental scraping: reuse unchanged categories and availability from the previous run's snapshot."""
+
+import csv
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+
+CHANGE_REPORT_COLUMNS = [
+    "change_type",
+    "uniqueID",
+    "singleSKUCatalogEntryID",
+    "name",
+    "field",
+    "old_value",
+    "new_value",
+]
+
+
+def content_hash(value):
+    """Stable hash of a JSON-serialisable value."""
+    return hashlib.sha1(json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class DeltaSnapshot:
+    """
+    SQLite snapshot of the previous run.
+
+    A category whose first search page hashes the same as last time (and that
+    was fully crawled within ``category_max_age``) is replayed from the
+    snapshot instead of being paginated again. A SKU keeps its previous
+    availability status unless it is new, its product payload changed, or the
+    status is older than ``availability_max_age``.
+
+    Parameters:
+        path (str): SQLite database file.
+        category_max_age (float): Seconds after which a category is always re-crawled.
+        availability_max_age (float): Seconds after which a status is always refreshed.
+    """
+
+    def __init__(self, path, category_max_age=7 * 86400, availability_max_age=86400):
+        self.path = str(path)
+        self.category_max_age = float(category_max_age)
+        self.availability_max_age = float(availability_max_age)
+        self.reused_categories = 0
+        self.reused_statuses = 0
+        self._pending_pages = {}
+        self._product_hashes = {}
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS categories (
+                key TEXT PRIMARY KEY, first_page_hash TEXT NOT NULL, crawled_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS category_pages (
+                key TEXT NOT NULL, page INTEGER NOT NULL, products TEXT NOT NULL, PRIMARY KEY (key, page));
+            CREATE TABLE IF NOT EXISTS availability (
+                sku_id TEXT PRIMARY KEY, status TEXT, product_hash TEXT NOT NULL, checked_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS products (
+                unique_id TEXT PRIMARY KEY, sku_id TEXT, name TEXT,
+                original_price TEXT, current_price TEXT, availability TEXT);
+            DROP TABLE IF EXISTS current_products;
+            CREATE TABLE current_products (
+                unique_id TEXT PRIMARY KEY, sku_id TEXT, name TEXT,
+                original_price TEXT, current_price TEXT, availability TEXT);
+            """
+        )
+
+    def unchanged_pages(self, key, first_page_data):
+        """
+        Return the saved pages of a category if its first page is unchanged.
+
+        Parameters:
+            key (str): Category key.
+            first_page_data (dict): Freshly fetched first search page.
+
+        Returns:
+            list: Products of each saved page in order, or None if the category must be crawled.
+        """
+        if first_page_data is None:
+            return None
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT first_page_hash, crawled_at FROM categories WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[0] != content_hash(first_page_data):
+                return None
+            if time.time() - row[1] > self.category_max_age:
+                return None
+            pages = self._connection.execute(
+                "SELECT products FROM category_pages WHERE key = ? ORDER BY page", (key,)
+            ).fetchall()
+            self.reused_categories += 1
+        return [json.loads(products) for (products,) in pages]
+
+    def record_page(self, key, page_number, products, data=None):
+        """Hold a freshly crawled page until its category finishes; ``data`` is the raw first page."""
+        with self._lock:
+            pending = self._pending_pages.setdefault(key, {"first_page_hash": None, "pages": []})
+            if page_number == 1 and data is not None:
+                pending["first_page_hash"] = content_hash(data)
+            pending["pages"].append((page_number, products))
+
+    def record_category_done(self, key):
+        """Replace the snapshot of a fully crawled category."""
+        with self._lock:
+            pending = self._pending_pages.pop(key, None)
+            if pending is None or pending["first_page_hash"] is None:
+                return
+            self._connection.execute("DELETE FROM category_pages WHERE key = ?", (key,))
+            self._connection.executemany(
+                "INSERT INTO category_pages (key, page, products) VALUES (?, ?, ?)",
+                [(key, page, json.dumps(products, ensure_ascii=False)) for page, products in pending["pages"]],
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO categories (key, first_page_hash, crawled_at) VALUES (?, ?, ?)",
+                (key, pending["first_page_hash"], time.time()),
+            )
+            self._connection.commit()
+
+    def discard_category(self, key):
+        """Drop the pending pages of a category that was not fully crawled; its old snapshot stays."""
+        with self._lock:
+            self._pending_pages.pop(key, None)
+
+    def reusable_statuses(self, products):
+        """
+        Split the SKUs of a page into reusable statuses and SKUs to refresh.
+
+        Returns:
+            tuple: (dict of SKU ID to still-valid status, list of SKU IDs to look up).
+        """
+        reusable, to_fetch = {}, []
+        now = time.time()
+        with self._lock:
+            for product in products:
+                sku_id = product.get("singleSKUCatalogEntryID", None)
+                if sku_id is None:
+                    continue
+                product_hash = content_hash(product)
+                self._product_hashes[sku_id] = product_hash
+                row = self._connection.execute(
+                    "SELECT status, product_hash, checked_at FROM availability WHERE sku_id = ?", (str(sku_id),)
+                ).fetchone()
+                if row is not None and row[1] == product_hash and now - row[2] <= self.availability_max_age:
+                    reusable[sku_id] = row[0]
+                else:
+                    to_fetch.append(sku_id)
+            self.reused_statuses += len(reusable)
+        return reusable, to_fetch
+
+    def record_statuses(self, statuses):
+        """Store freshly fetched availability statuses with the product payload they were checked for."""
+        now = time.time()
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO availability (sku_id, status, product_hash, checked_at) VALUES (?, ?, ?, ?)",
+                [
+                    (str(sku_id), status, self._product_hashes[sku_id], now)
+                    for sku_id, status in statuses.items()
+                    if sku_id in self._product_hashes
+                ],
+            )
+            self._connection.commit()
+
+    def observe_rows(self, rows):
+        """Stage exported rows for the change report; call once per output chunk."""
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO current_products VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        str(row.get("uniqueID")),
+                        _text(row.get("singleSKUCatalogEntryID")),
+                        _text(row.get("name")),
+                        _text(row.get("Original_Price")),
+                        _text(row.get("Current_Price")),
+                        _text(row.get("Availability Status")),
+                    )
+                    for row in rows
+                ],
+            )
+
+    def iter_changes(self):
+        """Yield change report rows comparing the staged rows with the previous snapshot."""
+        queries = [
+            (
+                "added",
+                "SELECT c.unique_id, c.sku_id, c.name, NULL, NULL, NULL FROM current_products c"
+                " LEFT JOIN products p ON p.unique_id = c.unique_id WHERE p.unique_id IS NULL",
+            ),
+            (
+                "removed",
+                "SELECT p.unique_id, p.sku_id, p.name, NULL, NULL, NULL FROM products p"
+                " LEFT JOIN current_products c ON c.unique_id = p.unique_id WHERE c.unique_id IS NULL",
+            ),
+            (
+                "price_changed",
+                "SELECT c.unique_id, c.sku_id, c.name, 'Current_Price', p.current_price, c.current_price"
+                " FROM current_products c JOIN products p ON p.unique_id = c.unique_id"
+                " WHERE p.current_price IS NOT c.current_price"
+                " UNION ALL"
+                " SELECT c.unique_id, c.sku_id, c.name, 'Original_Price', p.original_price, c.original_price"
+                " FROM current_products c JOIN products p ON p.unique_id = c.unique_id"
+                " WHERE p.original_price IS NOT c.original_price",
+            ),
+            (
+                "availability_changed",
+                "SELECT c.unique_id, c.sku_id, c.name, 'Availability Status', p.availability, c.availability"
+                " FROM current_products c JOIN products p ON p.unique_id = c.unique_id"
+                " WHERE p.availability IS NOT c.availability",
+            ),
+        ]
+        with self._lock:
+            for change_type, query in queries:
+                for row in self._connection.execute(query).fetchall():
+                    yield dict(zip(CHANGE_REPORT_COLUMNS, (change_type, *row)))
+
+    def finish(self, report_path):
+        """
+        Write the change report and make this run the snapshot for the next one.
+
+        Returns:
+            dict: Number of changes per change type.
+        """
+        counts = {"added": 0, "removed": 0, "price_changed": 0, "availability_changed": 0}
+        with open(report_path, "w", encoding="utf-8", newline="") as report_file:
+            writer = csv.DictWriter(report_file, fieldnames=CHANGE_REPORT_COLUMNS)
+            writer.writeheader()
+            for change in self.iter_changes():
+                writer.writerow(change)
+                counts[change["change_type"]] += 1
+        with self._lock:
+            self._connection.execute("DELETE FROM products")
+            self._connection.execute("INSERT INTO products SELECT * FROM current_products")
+            self._connection.execute("DELETE FROM current_products")
+            self._connection.commit()
+        logging.info(
+            f"Delta run reused {self.reused_categories} categories and {self.reused_statuses} availability "
+            f"statuses; changes: {counts} (report: {report_path})"
+        )
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def _text(value):
+    return None if value is None else str(value)
@@ -0,0 +1,287 @@
+"""Persistent price and availability history: every run's export ingested into one indexed SQLite store."""
+
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import argparse
+import csv
+import logging
+import re
+import sqlite3
+import sys
+import time
+
+import yaml
+
+
+CONFIG_PATH = Path(__file__).resolve().with_name("config.yaml")
+
+OBSERVATION_COLUMNS = [
+    "sku_id",
+    "run_date",
+    "unique_id",
+    "part_number",
+    "name",
+    "manufacturer",
+    "original_price",
+    "current_price",
+    "availability",
+]
+
+LISTING_COLUMNS = ["run_date", "category_id", "sku_id", "category_title", "level_1", "level_2", "level_3"]
+
+
+def _price(value):
+    """Numeric price, or None for "N/A" and other non-numeric values."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _text(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return str(value)
+
+
+class HistoryStore:
+    """
+    SQLite history of exported rows, keyed by (``singleSKUCatalogEntryID``, run date).
+
+    ``observations`` holds one row per SKU and run, clustered on the key so a
+    SKU's history is one index range scan; ``listings`` holds the category
+    memberships of each run, clustered on (run date, category). Each run is
+    ingested in bulk inside one transaction, and ingesting a run date again
+    replaces it.
+
+    Parameters:
+        path (str): SQLite database file.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.run_date = None
+        self.row_count = 0
+        self._connection = sqlite3.connect(self.path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_date TEXT PRIMARY KEY, ingested_at REAL NOT NULL, row_count INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS observations (
+                sku_id TEXT NOT NULL, run_date TEXT NOT NULL, unique_id TEXT, part_number TEXT, name TEXT,
+                manufacturer TEXT, original_price REAL, current_price REAL, availability TEXT,
+                PRIMARY KEY (sku_id, run_date)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS observations_run_date ON observations (run_date);
+            CREATE TABLE IF NOT EXISTS listings (
+                run_date TEXT NOT NULL, category_id TEXT NOT NULL, sku_id TEXT NOT NULL, category_title TEXT,
+                level_1 TEXT, level_2 TEXT, level_3 TEXT,
+                PRIMARY KEY (run_date, category_id, sku_id)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS listings_category_id ON listings (category_id, run_date);
+            CREATE INDEX IF NOT EXISTS listings_category_title ON listings (category_title, run_date);
+            """
+        )
+
+    def start_run(self, run_date=None):
+        """Start ingesting the run of ``run_date`` (ISO date, default today), replacing an earlier ingest of it."""
+        self.run_date = run_date or date.today().isoformat()
+        self.row_count = 0
+        self._connection.execute("DELETE FROM observations WHERE run_date = ?", (self.run_date,))
+        self._connection.execute("DELETE FROM listings WHERE run_date = ?", (self.run_date,))
+
+    def ingest_rows(self, rows):
+        """
+        Add exported rows to the current run; call once per output chunk.
+
+        Rows without a ``singleSKUCatalogEntryID`` are skipped. Rows without
+        category columns (the "normalized" products file) add no listings.
+        """
+        observations = []
+        listings = []
+        for row in rows:
+            sku_id = _text(row.get("singleSKUCatalogEntryID"))
+            if sku_id is None or sku_id == "N/A":
+                continue
+            observations.append(
+                (
+                    sku_id,
+                    self.run_date,
+                    _text(row.get("uniqueID")),
+                    _text(row.get("partNumber")),
+                    _text(row.get("name")),
+                    _text(row.get("manufacturer")),
+                    _price(row.get("Original_Price")),
+                    _price(row.get("Current_Price")),
+                    _text(row.get("Availability Status")),
+                )
+            )
+            if row.get("Category_ID_number") is not None:
+                listings.append(
+                    (
+                        self.run_date,
+                        _text(row["Category_ID_number"]),
+                        sku_id,
+                        _text(row.get("Category_Title")),
+                        _text(row.get("Level 1")),
+                        _text(row.get("Level 2")),
+                        _text(row.get("Level 3")),
+                    )
+                )
+        self._connection.executemany(
+            f"INSERT OR REPLACE INTO observations VALUES ({', '.join('?' * len(OBSERVATION_COLUMNS))})", observations
+        )
+        self._connection.executemany(
+            f"INSERT OR IGNORE INTO listings VALUES ({', '.join('?' * len(LISTING_COLUMNS))})", listings
+        )
+        self.row_count += len(observations)
+
+    def finish_run(self):
+        """Commit the current run."""
+        self._connection.execute(
+            "INSERT OR REPLACE INTO runs VALUES (?, ?, ?)", (self.run_date, time.time(), self.row_count)
+        )
+        self._connection.commit()
+        logging.info(f"History store: {self.row_count} rows of {self.run_date} ingested into {self.path}")
+
+    def _query(self, sql, parameters):
+        cursor = self._connection.execute(sql, parameters)
+        columns = [description[0] for description in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def price_history(self, sku_id, since=None):
+        """
+        Prices and availability of one SKU per run, oldest first.
+
+        Parameters:
+            sku_id (str): ``singleSKUCatalogEntryID``.
+            since (str): Earliest ISO run date to include.
+        """
+        return self._query(
+            "SELECT run_date, name, original_price, current_price, availability FROM observations"
+            " WHERE sku_id = ? AND run_date >= ? ORDER BY run_date",
+            (str(sku_id), since or ""),
+        )
+
+    def availability_flips(self, since=None, sku_id=None):
+        """
+        Runs in which a SKU's availability differed from its previous run within the window.
+
+        Parameters:
+            since (str): Earliest ISO run date considered.
+            sku_id (str): Only this SKU; all SKUs when None.
+        """
+        sku_filter = "AND sku_id = ?" if sku_id is not None else ""
+        parameters = (since or "", *(() if sku_id is None else (str(sku_id),)))
+        return self._query(
+            "SELECT sku_id, name, run_date, previous_availability, availability FROM ("
+            " SELECT sku_id, name, run_date, availability,"
+            " LAG(availability) OVER (PARTITION BY sku_id ORDER BY run_date) AS previous_availability"
+            f" FROM observations WHERE run_date >= ? {sku_filter})"
+            " WHERE previous_availability IS NOT availability AND previous_availability IS NOT NULL"
+            " ORDER BY run_date, sku_id",
+            parameters,
+        )
+
+    def category_snapshot(self, category, run_date=None):
+        """
+        Products of a category, matched by ID or title, as of ``run_date`` (default: its latest run).
+        """
+        if run_date is None:
+            row = self._connection.execute(
+                "SELECT MAX(run_date) FROM listings WHERE category_id = ? OR category_title = ?",
+                (category, category),
+            ).fetchone()
+            run_date = row[0]
+        return self._query(
+            "SELECT l.run_date, l.category_id, l.category_title, o.sku_id, o.name, o.original_price,"
+            " o.current_price, o.availability FROM listings l"
+            " JOIN observations o ON o.sku_id = l.sku_id AND o.run_date = l.run_date"
+            " WHERE l.run_date = ? AND (l.category_id = ? OR l.category_title = ?) ORDER BY o.sku_id",
+            (run_date, category, category),
+        )
+
+    def close(self):
+        self._connection.close()
+
+
+def read_export(path):
+    """Load the rows of an earlier export (xlsx, csv, jsonl or parquet) as dictionaries."""
+    import pandas as pd
+
+    path = Path(path)
+    if path.suffix == ".csv":
+        df = pd.read_csv(path, dtype=str)
+    elif path.suffix == ".jsonl":
+        df = pd.read_json(path, lines=True, dtype=False)
+    elif path.suffix == ".parquet":
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_excel(path, dtype=str)
+    return df.to_dict("records")
+
+
+def run_date_from_filename(path):
+    """ISO run date from a ``%Y%m%d_...`` export name, or None."""
+    match = re.match(r"(\d{8})", Path(path).name)
+    if match is None:
+        return None
+    return datetime.strptime(match.group(1), "%Y%m%d").date().isoformat()
+
+
+def default_store_path():
+    if CONFIG_PATH.exists():
+        with open(CONFIG_PATH, "r", encoding="utf-8") as config_file:
+            history_config = (yaml.safe_load(config_file) or {}).get("history") or {}
+        return history_config.get("path", "history.sqlite")
+    return "history.sqlite"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default=None, help="History store; defaults to history.path in config.yaml.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = subparsers.add_parser("ingest", help="Backfill the store from earlier exports.")
+    ingest_parser.add_argument("files", nargs="+")
+    ingest_parser.add_argument("--run-date", default=None, help="ISO date; defaults to the file name's date.")
+    prices_parser = subparsers.add_parser("prices", help="Price history of one SKU.")
+    prices_parser.add_argument("sku_id")
+    prices_parser.add_argument("--days", type=int, default=90)
+    flips_parser = subparsers.add_parser("flips", help="Availability changes between runs.")
+    flips_parser.add_argument("--days", type=int, default=7)
+    flips_parser.add_argument("--sku-id", default=None)
+    category_parser = subparsers.add_parser("category", help="Products of a category in one run.")
+    category_parser.add_argument("category", help="Category ID or title.")
+    category_parser.add_argument("--run-date", default=None, help="ISO date; defaults to the latest run.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    store = HistoryStore(args.db or default_store_path())
+    try:
+        if args.command == "ingest":
+            for file_name in args.files:
+                store.start_run(args.run_date or run_date_from_filename(file_name))
+                store.ingest_rows(read_export(file_name))
+                store.finish_run()
+            return None
+        if args.command == "prices":
+            since = (date.today() - timedelta(days=args.days)).isoformat()
+            rows = store.price_history(args.sku_id, since=since)
+        elif args.command == "flips":
+            since = (date.today() - timedelta(days=args.days)).isoformat()
+            rows = store.availability_flips(since=since, sku_id=args.sku_id)
+        else:
+            rows = store.category_snapshot(args.category, run_date=args.run_date)
+    finally:
+        store.close()
+    if rows:
+        writer = csv.DictWriter(sys.stdout, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
@@ -0,0 +1,292 @@
+"""Shared HTTP client: one pooled, keep-alive session used by both pipeline stages."""
+
+from urllib.parse import urlparse
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+import cassette
+import metrics
+import parse_pool
+import rate_limiter
+import response_cache
+
+
+DEFAULT_SETTINGS = {
+    "request_retries": 3,
+    "request_timeout": 5,
+    "http_pool_size": None,  # None sizes the pool for crawl + availability workers
+    "http_keep_alive": True,
+    "http_compression": True,
+    "json_decoder": "auto",  # "auto" decodes with orjson when it is installed, "json" with the standard library
+}
+
+_settings = dict(DEFAULT_SETTINGS)
+_session = None
+_session_lock = threading.Lock()
+_endpoint_prefixes = []
+_response_hooks = []
+_json_loads = parse_pool.json_loads()
+
+
+def resolve_pool_size(runtime_config, store_config=None):
+    """
+    Work out the connection pool size for a runtime config.
+
+    Parameters:
+        runtime_config (dict): The ``runtime`` config section.
+        store_config (dict): The ``store_availability`` config section, if any.
+
+    Returns:
+        int: ``http_pool_size`` if set, otherwise enough connections for the crawl
+        workers (or the serial crawl's page batch), the availability workers and,
+        when multi-store availability is enabled, its workers to be in flight at
+        the same time.
+    """
+    pool_size = runtime_config.get("http_pool_size")
+    if pool_size:
+        return int(pool_size)
+    crawl_workers = int(runtime_config.get("global_concurrency", 16))
+    if runtime_config.get("crawl_engine", "serial") != "async":
+        # The serial crawl fetches one category at a time, a batch of pages at once.
+        crawl_workers = max(
+            1, int(runtime_config.get("parallel_pages", 4)), int(runtime_config.get("speculative_pages", 2))
+        )
+    store_workers = 0
+    if store_config and store_config.get("enabled", False) and store_config.get("store_ids"):
+        store_workers = int(store_config.get("workers", 32))
+    return crawl_workers + int(runtime_config.get("availability_workers", 12)) + store_workers
+
+
+def configure(runtime_config, store_config=None):
+    """
+    Apply the ``runtime`` config section and drop any existing session.
+
+    Parameters:
+        runtime_config (dict): The ``runtime`` config section.
+        store_config (dict): The ``store_availability`` config section, sizing the default pool.
+    """
+    global _session, _json_loads
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update({key: value for key, value in runtime_config.items() if key in DEFAULT_SETTINGS})
+    settings["request_retries"] = int(settings["request_retries"])
+    settings["request_timeout"] = float(settings["request_timeout"])
+    settings["http_pool_size"] = resolve_pool_size(runtime_config, store_config)
+    with _session_lock:
+        _settings.clear()
+        _settings.update(settings)
+        if _session is not None:
+            _session.close()
+        _session = None
+    _json_loads = parse_pool.json_loads(settings["json_decoder"] != "json")
+    rate_limiter.configure(runtime_config)
+    response_cache.configure(runtime_config)
+    metrics.configure(runtime_config)
+    cassette.configure(runtime_config)
+    parse_pool.configure(runtime_config)
+
+
+def register_endpoint(name, template):
+    """
+    Name an endpoint class so requests to it share a rate limiter.
+
+    Parameters:
+        name (str): Endpoint class name, e.g. "search".
+        template (str): URL template from config; everything before the first
+            placeholder identifies URLs of this class.
+    """
+    prefix = template.split("{", 1)[0]
+    _endpoint_prefixes[:] = [entry for entry in _endpoint_prefixes if entry[1] != name]
+    _endpoint_prefixes.append((prefix, name))
+    _endpoint_prefixes.sort(key=lambda entry: len(entry[0]), reverse=True)
+
+
+def classify_url(url):
+    """Return the registered endpoint class of a URL, or "default"."""
+    for prefix, name in _endpoint_prefixes:
+        if url.startswith(prefix):
+            return name
+    return "default"
+
+
+def _build_session():
+    pool_size = _settings["http_pool_size"] or resolve_pool_size({})
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if _settings["http_compression"]:
+        # Advertises br only when a brotli decoder is installed for urllib3.
+        session.headers.update(make_headers(accept_encoding=True))
+    else:
+        session.headers["Accept-Encoding"] = "identity"
+    session.headers["Connection"] = "keep-alive" if _settings["http_keep_alive"] else "close"
+    session.hooks["response"].extend(_response_hooks)
+    return session
+
+
+def add_response_hook(hook):
+    """
+    Call ``hook(response, *args, **kwargs)`` for every response of the shared session.
+
+    Hooks survive ``configure`` so observers such as the benchmark see both stages.
+    """
+    with _session_lock:
+        _response_hooks.append(hook)
+        if _session is not None:
+            _session.hooks["response"].append(hook)
+
+
+def remove_response_hook(hook):
+    with _session_lock:
+        if hook in _response_hooks:
+            _response_hooks.remove(hook)
+        if _session is not None and hook in _session.hooks["response"]:
+            _session.hooks["response"].remove(hook)
+
+
+def get_session():
+    """Return the process-wide session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def decode_json(body):
+    """Decode a JSON body with the configured decoder (orjson when installed, unless ``json_decoder`` is "json")."""
+    return _json_loads(body)
+
+
+def _replay(reader, url, endpoint, decode=decode_json):
+    """Serve ``url`` from the replay cassette, recording the same metrics as a network fetch."""
+    run_metrics = metrics.get_metrics()
+    started = time.perf_counter()
+    body = reader.get(url)
+    if body is None:
+        logging.warning(f"Not in the replay cassette: {url}")
+        run_metrics.record_failure(endpoint)
+        return None
+    run_metrics.record_response(endpoint, time.perf_counter() - started, len(body))
+    started = time.perf_counter()
+    try:
+        data = decode(body)
+    except ValueError as e:
+        logging.warning(f"Error decoding recorded {url}: {e}")
+        run_metrics.record_failure(endpoint)
+        return None
+    run_metrics.record_parse(endpoint, time.perf_counter() - started)
+    return data
+
+
+def fetch_json_data(url, retries=None, timeout=None, decode=decode_json):
+    """
+    Fetch JSON data from a given URL through the shared session.
+
+    Requests are paced by the rate limiter of the URL's endpoint class. Throttling
+    responses (429/503) lower that endpoint's rate and honour ``Retry-After``;
+    failed attempts back off exponentially with jitter, and requests to a host
+    whose circuit breaker is open wait for its half-open trial. Endpoint classes that opted into the response
+    cache are served from it while fresh and revalidated with a conditional
+    request once their TTL has passed.
+
+    With ``runtime.cassette.mode`` "record", every successful response body is
+    also appended to the cassette; with "replay", responses come from the
+    cassette alone and the network is never touched.
+
+    Parameters:
+        url (str): The URL to fetch data from.
+        retries (int): Number of retry attempts.
+        timeout (int): Timeout in seconds for the request.
+        decode (callable): Turns the response body (bytes) into the returned data; defaults to
+            decode_json; e.g. ParsePool.decode_search_page decodes in worker processes.
+
+    Returns:
+        dict: The JSON data fetched from the URL. Returns None if fetching fails.
+    """
+    retries = _settings["request_retries"] if retries is None else retries
+    timeout = _settings["request_timeout"] if timeout is None else timeout
+    endpoint = classify_url(url)
+    reader = cassette.get_reader()
+    if reader is not None:
+        return _replay(reader, url, endpoint, decode)
+    writer = cassette.get_writer()
+    limiter = rate_limiter.get_limiter(endpoint)
+    breaker = rate_limiter.get_breaker(urlparse(url).netloc)
+    cache, ttl = response_cache.cache_for(endpoint)
+    cached = cache.get(url) if cache is not None else None
+    if cached is not None and time.time() - cached.stored_at < ttl:
+        try:
+            data = decode(cached.body)
+        except ValueError:
+            cached = None
+        else:
+            cache.record("hits")
+            if writer is not None:
+                writer.record(url, cached.body)
+            return data
+    request_kwargs = {}
+    if cached is not None:
+        request_kwargs["headers"] = response_cache.conditional_headers(cached)
+
+    run_metrics = metrics.get_metrics()
+    for attempt in range(1, retries + 1):
+        if not breaker.allow():
+            # The circuit's trial request failed while this one waited: the outage goes on.
+            logging.warning(f"Circuit open for {urlparse(url).netloc} (attempt {attempt}/{retries}): {url}")
+            continue
+        if attempt > 1:
+            run_metrics.record_retry(endpoint)
+        retry_after = None
+        try:
+            with limiter.slot():
+                started = time.perf_counter()
+                response = get_session().get(url, timeout=timeout, **request_kwargs)
+                run_metrics.record_response(endpoint, time.perf_counter() - started, len(response.content))
+            if response.status_code < 500:
+                # Any non-5xx answer, 4xx included, shows the host is up and settles a half-open circuit.
+                breaker.record_success()
+            if response.status_code in rate_limiter.THROTTLE_STATUS_CODES:
+                retry_after = rate_limiter.parse_retry_after(response.headers.get("Retry-After"))
+                limiter.on_throttle(retry_after)
+            if response.status_code == 304 and cached is not None:
+                body = cached.body
+                data = decode(body)
+                cache.refresh(url)
+                cache.record("revalidated")
+            else:
+                response.raise_for_status()
+                body = response.content
+                started = time.perf_counter()
+                data = decode(body)
+                run_metrics.record_parse(endpoint, time.perf_counter() - started)
+                if cache is not None:
+                    cache.put(
+                        url,
+                        response.content,
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                    )
+                    cache.record("misses")
+        except requests.RequestException as e:
+            status_code = getattr(getattr(e, "response", None), "status_code", None)
+            if status_code is None or status_code >= 500:
+                breaker.record_failure()
+            logging.warning(f"Error fetching {url} (attempt {attempt}/{retries}): {e}")
+        except ValueError as e:
+            logging.warning(f"Error fetching {url} (attempt {attempt}/{retries}): {e}")
+        else:
+            limiter.on_success()
+            if writer is not None:
+                writer.record(url, body)
+            return data
+        if attempt < retries:
+            time.sleep(limiter.backoff_delay(attempt, retry_after))
+    run_metrics.record_failure(endpoint)
+    return None
@@ -0,0 +1,119 @@
+"""Deferred imports and config loading, so importing a pipeline module stays cheap and needs no config file."""
+
+from collections.abc import MutableMapping
+import importlib
+import threading
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    Attributes set on the stand-in (e.g. by a test's monkeypatch) shadow the
+    module's own, for code that goes through the stand-in.
+
+    Parameters:
+        name (str): Dotted module name, e.g. "pandas".
+    """
+
+    def __init__(self, name):
+        self._module_name = name
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if attribute.startswith("__"):
+            raise AttributeError(attribute)
+        if self._module is None:
+            self._module = importlib.import_module(self._module_name)
+        return getattr(self._module, attribute)
+
+    def __repr__(self):
+        state = "imported" if self._module is not None else "not imported"
+        return f"<LazyModule {self._module_name!r} ({state})>"
+
+
+class LazyConfig(MutableMapping):
+    """
+    Config mapping that calls ``loader`` the first time it is read or written.
+
+    Parameters:
+        loader (callable): Returns the parsed config dict.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._data = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    def load(self):
+        """Load the config if needed and return the underlying dict."""
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    self._data = self._loader()
+        return self._data
+
+    def section(self, key, optional=False):
+        """
+        Lazy view of one section.
+
+        Parameters:
+            key (str): Top-level key, e.g. "runtime".
+            optional (bool): Treat a missing or empty section as ``{}`` instead of raising KeyError.
+        """
+        return LazyConfigSection(self, key, optional)
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def __setitem__(self, key, value):
+        self.load()[key] = value
+
+    def __delitem__(self, key):
+        del self.load()[key]
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self):
+        return len(self.load())
+
+    def __repr__(self):
+        return f"<LazyConfig {self._data!r}>" if self.loaded else "<LazyConfig (not loaded)>"
+
+
+class LazyConfigSection(MutableMapping):
+    """A section of a LazyConfig; reading or writing it loads the whole config."""
+
+    def __init__(self, config, key, optional=False):
+        self._config = config
+        self._key = key
+        self._optional = optional
+
+    def _section(self):
+        data = self._config.load()
+        if self._optional and data.get(self._key) is None:
+            data[self._key] = {}
+        return data[self._key]
+
+    def __getitem__(self, key):
+        return self._section()[key]
+
+    def __setitem__(self, key, value):
+        self._section()[key] = value
+
+    def __delitem__(self, key):
+        del self._section()[key]
+
+    def __iter__(self):
+        return iter(self._section())
+
+    def __len__(self):
+        return len(self._section())
+
+    def __repr__(self):
+        return f"<LazyConfigSection {self._key!r}>"
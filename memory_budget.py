@@ -0,0 +1,241 @@
+"""Memory-bounded runs: watch the process RSS against a budget and spill SKU sets and statuses to SQLite."""
+
+from collections.abc import MutableMapping, MutableSet
+from pathlib import Path
+import json
+import logging
+import os
+import resource
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from output_sinks import chunked
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def current_rss_mb():
+    """Current resident set size in MB; the peak where /proc is not available."""
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+    return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+
+class MemoryBudget:
+    """
+    Memory budget of a run: once the RSS reaches it, the run spills to disk.
+
+    Parameters:
+        limit_mb (float): Budget in MB of resident memory.
+        check_interval (float): Minimum seconds between two RSS reads.
+    """
+
+    def __init__(self, limit_mb, check_interval=0.5):
+        self.limit_mb = float(limit_mb)
+        self.check_interval = float(check_interval)
+        self.reached = False
+        self._last_checked = None
+
+    def check(self):
+        """Whether the RSS has reached the budget; the first True is remembered in ``reached``."""
+        if self.reached:
+            return True
+        now = time.monotonic()
+        if self._last_checked is not None and now - self._last_checked < self.check_interval:
+            return False
+        self._last_checked = now
+        rss = current_rss_mb()
+        if rss >= self.limit_mb:
+            self.reached = True
+            logging.warning(f"RSS of {rss:g} MB reached the memory budget of {self.limit_mb:g} MB; spilling to disk")
+        return self.reached
+
+
+def summary(budget=None):
+    """Run summary section: the peak RSS and, with a budget, its limit and whether the run spilled."""
+    return {
+        "peak_rss_mb": peak_rss_mb(),
+        "budget_mb": budget.limit_mb if budget is not None else None,
+        "spilled": budget.reached if budget is not None else False,
+    }
+
+
+class SpillStore:
+    """
+    Temporary SQLite database holding spilled SKU sets and status maps.
+
+    The file is written without journal or fsync, since it only lives for one
+    run, and is removed on close.
+
+    Parameters:
+        directory (str): Where to create the file; the system temporary directory when None.
+    """
+
+    def __init__(self, directory=None):
+        descriptor, path = tempfile.mkstemp(prefix="spill_", suffix=".sqlite", dir=directory)
+        os.close(descriptor)
+        self.path = Path(path)
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=OFF")
+        self.connection.execute("PRAGMA synchronous=OFF")
+
+    def set(self, name):
+        """Open (creating it if needed) the disk-backed set ``name``."""
+        return DiskSet(self, name)
+
+    def dict(self, name, tuple_keys=False):
+        """Open (creating it if needed) the disk-backed dict ``name``; see DiskDict for ``tuple_keys``."""
+        return DiskDict(self, name, tuple_keys=tuple_keys)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+        self.path.unlink(missing_ok=True)
+
+
+# Rows per query when a container is read or written in batches; also keeps IN (...) below SQLite's variable limit.
+BATCH_SIZE = 500
+
+
+class _SpillTable:
+    # Keys are stored without a column type, so SQLite keeps strings and integers apart like a dict does.
+    COLUMNS = "key PRIMARY KEY"
+
+    def __init__(self, store, name):
+        if not name.isidentifier():
+            raise ValueError(f"Invalid spill table name '{name}'")
+        self.store = store
+        self.name = name
+        with store.lock:
+            store.connection.execute(f"CREATE TABLE IF NOT EXISTS {name} ({self.COLUMNS})")
+
+    def _encode(self, key):
+        return key
+
+    def _decode(self, key):
+        return key
+
+    def _execute(self, sql, parameters=()):
+        with self.store.lock:
+            return self.store.connection.execute(sql, parameters).fetchall()
+
+    def _executemany(self, sql, rows):
+        with self.store.lock:
+            self.store.connection.executemany(sql, rows)
+
+    def _iter_rows(self, columns):
+        # Batches by rowid, so the lock is not held while the caller works on the rows.
+        last_rowid = 0
+        while True:
+            rows = self._execute(
+                f"SELECT rowid, {columns} FROM {self.name} WHERE rowid > ? ORDER BY rowid LIMIT {BATCH_SIZE}",
+                (last_rowid,),
+            )
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            yield from rows
+
+    def __contains__(self, key):
+        return bool(self._execute(f"SELECT 1 FROM {self.name} WHERE key = ?", (self._encode(key),)))
+
+    def __len__(self):
+        return self._execute(f"SELECT COUNT(*) FROM {self.name}")[0][0]
+
+
+class DiskSet(_SpillTable, MutableSet):
+    """Set in a SpillStore table; iterates in first-added order."""
+
+    def __iter__(self):
+        for _, key in self._iter_rows("key"):
+            yield key
+
+    def add(self, key):
+        self._execute(f"INSERT OR IGNORE INTO {self.name} VALUES (?)", (key,))
+
+    def discard(self, key):
+        self._execute(f"DELETE FROM {self.name} WHERE key = ?", (key,))
+
+    def update(self, keys):
+        for batch in chunked(keys, BATCH_SIZE):
+            self._executemany(f"INSERT OR IGNORE INTO {self.name} VALUES (?)", ((key,) for key in batch))
+
+    def difference_update(self, keys):
+        for batch in chunked(keys, BATCH_SIZE):
+            self._executemany(f"DELETE FROM {self.name} WHERE key = ?", ((key,) for key in batch))
+
+
+class DiskDict(_SpillTable, MutableMapping):
+    """
+    Dict in a SpillStore table; lookup() reads many keys in one query.
+
+    Parameters:
+        store (SpillStore): Database holding the table.
+        name (str): Table name.
+        tuple_keys (bool): Keys are tuples of strings and numbers, e.g. ``(sku_id, store_id)``;
+            they are stored as JSON arrays.
+    """
+
+    COLUMNS = "key PRIMARY KEY, value"
+
+    def __init__(self, store, name, tuple_keys=False):
+        self.tuple_keys = tuple_keys
+        super().__init__(store, name)
+
+    def _encode(self, key):
+        return json.dumps(key) if self.tuple_keys else key
+
+    def _decode(self, key):
+        return tuple(json.loads(key)) if self.tuple_keys else key
+
+    def __getitem__(self, key):
+        rows = self._execute(f"SELECT value FROM {self.name} WHERE key = ?", (self._encode(key),))
+        if not rows:
+            raise KeyError(key)
+        return rows[0][0]
+
+    def __setitem__(self, key, value):
+        self._execute(f"INSERT OR REPLACE INTO {self.name} VALUES (?, ?)", (self._encode(key), value))
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._execute(f"DELETE FROM {self.name} WHERE key = ?", (self._encode(key),))
+
+    def __iter__(self):
+        for _, key in self._iter_rows("key"):
+            yield self._decode(key)
+
+    def items(self):
+        return ((self._decode(key), value) for _, key, value in self._iter_rows("key, value"))
+
+    def update(self, other=(), **kwargs):
+        items = other.items() if hasattr(other, "items") else other
+        for batch in chunked(items, BATCH_SIZE):
+            self._executemany(
+                f"INSERT OR REPLACE INTO {self.name} VALUES (?, ?)",
+                ((self._encode(key), value) for key, value in batch),
+            )
+        if kwargs:
+            self.update(kwargs)
+
+    def lookup(self, keys):
+        """Return a plain dict of the stored entries among ``keys`` (e.g. the SKU IDs of one export chunk)."""
+        found = {}
+        for batch in chunked({self._encode(key) for key in keys}, BATCH_SIZE):
+            placeholders = ", ".join("?" * len(batch))
+            rows = self._execute(f"SELECT key, value FROM {self.name} WHERE key IN ({placeholders})", batch)
+            found.update((self._decode(key), value) for key, value in rows)
+        return found
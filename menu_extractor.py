@@ -1,18 +1,23 @@
 """Stage 1: fetch navigation menu JSON and export structured category levels to Excel."""
 
 from pathlib import Path
+import argparse
 import logging
-import time
 
-import pandas as pd
-import requests
 import yaml
 
+from http_client import fetch_json_data
+from lazy_loading import LazyModule
+from output_sinks import format_for_path, open_sink
+import http_client
+import rate_limiter
+import response_cache
 
-CONFIG_PATH = Path(__file__).resolve().with_name("config.yaml")
 
+# pandas (and openpyxl through it) is only imported when the Excel workbook is written.
+pd = LazyModule("pandas")
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+CONFIG_PATH = Path(__file__).resolve().with_name("config.yaml")
 
 
 def load_config(config_path=CONFIG_PATH):
@@ -20,81 +25,73 @@ def load_config(config_path=CONFIG_PATH):
         return yaml.safe_load(config_file)
 
 
-def fetch_json_data(url, retries=3, timeout=5):
-    for attempt in range(1, retries + 1):
-        try:
-            response = requests.get(url, timeout=timeout)
-            response.raise_for_status()
-            return response.json()
-        except (requests.RequestException, ValueError) as e:
-            logging.warning(f"Error fetching {url} (attempt {attempt}/{retries}): {e}")
-            time.sleep(1)
-    return None
+MENU_COLUMNS = ["Level", "UniqueID", "ParentUniqueID", "Title", "SEO_URL", "AEM_URL"]
+
+_END = object()
+
+
+def iter_categories(menu, level=1, parent_uniqueID=None):
+    """
+    Yield the category rows of a menu tree, depth-first with parents before their children.
+
+    The walk keeps its own stack of child-menu iterators instead of recursing,
+    so deep menus never hit the recursion limit, and each row is yielded as
+    soon as its category is reached.
+
+    Parameters:
+        menu (list): Categories of one menu level.
+        level (int): Level of the categories in ``menu``; categories of another level are skipped.
+        parent_uniqueID (str): uniqueID of the category ``menu`` belongs to.
+    """
+    stack = [(iter(menu), level, parent_uniqueID)]
+    while stack:
+        categories, level, parent_uniqueID = stack[-1]
+        category = next(categories, _END)
+        if category is _END:
+            stack.pop()
+            continue
+        if category.get("level") != str(level):
+            continue
+        uniqueID = category.get("uniqueID")
+        yield {
+            "Level": level,
+            "UniqueID": uniqueID,
+            "ParentUniqueID": parent_uniqueID,
+            "Title": category.get("jcr:title"),
+            "SEO_URL": category.get("seo_url"),
+            "AEM_URL": category.get("aem_url"),
+        }
+        if "childMenu" in category:
+            stack.append((iter(category["childMenu"]), level + 1, uniqueID))
 
 
-# Function to recursively extract categories
 def extract_categories(menu, level, parent_uniqueID, data):
-    for category in menu:
-        if category.get("level") == str(level):
-            uniqueID = category.get("uniqueID")
-            jcr_title = category.get("jcr:title")
-            seo_url = category.get("seo_url")
-            aem_url = category.get("aem_url")
-
-            data.append(
-                {
-                    "Level": level,
-                    "UniqueID": uniqueID,
-                    "ParentUniqueID": parent_uniqueID,
-                    "Title": jcr_title,
-                    "SEO_URL": seo_url,
-                    "AEM_URL": aem_url,
-                }
-            )
-
-            # Recur for child menus
-            if "childMenu" in category:
-                extract_categories(category["childMenu"], level + 1, uniqueID, data)
-
-
-def main():
-    config = load_config()
-    menu_endpoint = config["site"]["menu_endpoint"]
+    """Append the category rows of a menu tree to ``data``."""
+    data.extend(iter_categories(menu, level, parent_uniqueID))
+
+
+def iter_menu_categories(config):
+    """
+    Fetch the menu and yield the category rows of the configured navigation section.
+
+    Logs an error and yields nothing when the menu cannot be fetched or parsed
+    or the section is missing.
+    """
     nav_title = config["site"]["nav_title"]
-    menu_excel_filename = config["io"]["menu_excel_filename"]
-    menu_levels_to_export = int(config["io"]["menu_levels_to_export"])
-    runtime_config = config.get("runtime", {})
-    retries = int(runtime_config.get("request_retries", 3))
-    timeout = int(runtime_config.get("request_timeout", 5))
-
-    # Fetch JSON data
-    json_data = fetch_json_data(menu_endpoint, retries=retries, timeout=timeout)
-    if not isinstance(json_data, list):
+    data = fetch_json_data(config["site"]["menu_endpoint"])
+    if not isinstance(data, list):
         logging.error("Menu endpoint returned invalid JSON payload.")
         return
+    # Extraction starts from the main menu whose navTitle matches the config.
+    for item in data:
+        if isinstance(item, dict) and item.get("navTitle") == nav_title and isinstance(item.get("childMenu"), list):
+            yield from iter_categories(item["childMenu"])
+            return
+    logging.error(f"Navigation section '{nav_title}' was not found.")
 
-    # Start extraction from the main menu where navTitle matches config
-    main_menu = None
-    for item in json_data:
-        if item.get("navTitle") == nav_title and isinstance(item.get("childMenu"), list):
-            main_menu = item["childMenu"]
-            break
-    if main_menu is None:
-        logging.error(f"Navigation section '{nav_title}' was not found.")
-        return
 
-    # List to hold extracted data
-    data = []
-    extract_categories(main_menu, 1, None, data)
-    if not data:
-        logging.error(f"No categories were extracted for nav title '{nav_title}'.")
-        return
-
-    # Convert to DataFrame
-    df = pd.DataFrame(data)
-    if "Level" not in df.columns:
-        logging.error("Extracted category data is missing required 'Level' column.")
-        return
+def write_menu_excel(data, menu_excel_filename, menu_levels_to_export):
+    df = pd.DataFrame(data, columns=MENU_COLUMNS)
 
     # Create an Excel writer object
     with pd.ExcelWriter(menu_excel_filename) as writer:
@@ -107,5 +104,82 @@ def main():
         level_3_data.to_excel(writer, sheet_name="Level_3_UniqueIDs", index=False)
 
 
+def write_menu_outputs(rows, config, on_row=None):
+    """
+    Write the stage-1 outputs from a stream of category rows.
+
+    Rows are appended to ``io.menu_handoff_filename`` (JSONL, CSV or Parquet,
+    by suffix) and passed to ``on_row`` as they arrive, so stage 2 can start on
+    them early. The per-level Excel workbook, if ``io.menu_excel_filename`` is
+    set, is written once every row is in.
+
+    Parameters:
+        rows (iterable): Category rows, e.g. from iter_menu_categories.
+        config (dict): Parsed config.
+        on_row (callable): Called with every row as it is emitted.
+
+    Returns:
+        int: Number of category rows.
+    """
+    io_config = config["io"]
+    menu_excel_filename = io_config.get("menu_excel_filename")
+    handoff_filename = io_config.get("menu_handoff_filename")
+    chunk_size = int(io_config.get("write_chunk_size", 10000))
+    sink = open_sink(format_for_path(handoff_filename), handoff_filename, MENU_COLUMNS) if handoff_filename else None
+    data = []
+    chunk = []
+    row_count = 0
+    try:
+        for row in rows:
+            row_count += 1
+            if on_row is not None:
+                on_row(row)
+            if menu_excel_filename:
+                data.append(row)
+            if sink is not None:
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    sink.write_rows(chunk)
+                    chunk = []
+        if sink is not None and chunk:
+            sink.write_rows(chunk)
+    finally:
+        if sink is not None:
+            sink.close()
+    if not row_count:
+        logging.error(f"No categories were extracted for nav title '{config['site']['nav_title']}'.")
+        return 0
+    if sink is not None:
+        logging.info(f"{row_count} categories handed off in {handoff_filename}")
+    if menu_excel_filename:
+        write_menu_excel(data, menu_excel_filename, int(io_config["menu_levels_to_export"]))
+    return row_count
+
+
+def main(config=None):
+    config = load_config() if config is None else config
+    menu_endpoint = config["site"]["menu_endpoint"]
+    http_client.configure(config.get("runtime", {}))
+    http_client.register_endpoint("menu", menu_endpoint)
+
+    if not write_menu_outputs(iter_menu_categories(config), config):
+        return
+
+    rate_limiter.log_summary()
+    response_cache.log_summary()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--config", default=None, help="Config file; defaults to config.yaml next to this module.")
+    return parser.parse_args(argv)
+
+
+def run_cli(argv=None):
+    args = parse_args(argv)
+    main(load_config(args.config) if args.config else None)
+
+
 if __name__ == "__main__":
-    main()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    run_cli()
@@ -0,0 +1,259 @@
+"""Run metrics: per-endpoint request counters and latency histograms, phase timings, queue depths and reports."""
+
+from contextlib import contextmanager
+from pathlib import Path
+import json
+import logging
+import threading
+import time
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+DEFAULT_METRICS = {
+    "summary_filename": None,  # JSON run summary
+    "prometheus_textfile": None,  # node_exporter textfile collector output
+    "progress_interval": 10.0,  # seconds between progress log lines
+}
+
+_settings = dict(DEFAULT_METRICS)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram in the Prometheus layout.
+
+    Parameters:
+        buckets (tuple): Upper bounds in ascending order; an implicit +Inf bucket follows.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the ``fraction`` quantile; None when empty."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for position, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets[position] if position < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def cumulative(self):
+        """Yield ``(upper bound label, cumulative count)`` pairs, ending with "+Inf"."""
+        seen = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            seen += count
+            yield str(bound), seen
+
+
+class EndpointMetrics:
+    """Counters for one endpoint class."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.bytes = 0
+        self.network_seconds = 0.0
+        self.parse_seconds = 0.0
+        self.latency = Histogram()
+
+    def summary(self):
+        return {
+            "endpoint": self.endpoint,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "bytes": self.bytes,
+            "network_seconds": round(self.network_seconds, 3),
+            "parse_seconds": round(self.parse_seconds, 3),
+            "latency_p50_seconds": self.latency.quantile(0.50),
+            "latency_p95_seconds": self.latency.quantile(0.95),
+            "latency_p99_seconds": self.latency.quantile(0.99),
+        }
+
+
+class RunMetrics:
+    """Thread-safe collection of everything measured during one run."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.endpoints = {}
+        self.timings = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def _endpoint(self, endpoint):
+        if endpoint not in self.endpoints:
+            self.endpoints[endpoint] = EndpointMetrics(endpoint)
+        return self.endpoints[endpoint]
+
+    def record_response(self, endpoint, seconds, size):
+        with self._lock:
+            stats = self._endpoint(endpoint)
+            stats.requests += 1
+            stats.bytes += size
+            stats.network_seconds += seconds
+            stats.latency.observe(seconds)
+
+    def record_parse(self, endpoint, seconds):
+        with self._lock:
+            self._endpoint(endpoint).parse_seconds += seconds
+
+    def record_retry(self, endpoint):
+        with self._lock:
+            self._endpoint(endpoint).retries += 1
+
+    def record_failure(self, endpoint):
+        with self._lock:
+            self._endpoint(endpoint).failures += 1
+
+    def add_time(self, phase, seconds):
+        with self._lock:
+            self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    def set_gauge(self, name, value):
+        """Record the current value of a gauge; its high-water mark is kept too."""
+        with self._lock:
+            gauge = self.gauges.setdefault(name, {"current": 0, "max": 0})
+            gauge["current"] = value
+            gauge["max"] = max(gauge["max"], value)
+
+    def summary(self):
+        with self._lock:
+            return {
+                "wall_seconds": round(time.time() - self.started, 3),
+                "endpoints": [stats.summary() for stats in self.endpoints.values()],
+                "timings_seconds": {phase: round(seconds, 3) for phase, seconds in self.timings.items()},
+                "gauges": {name: dict(gauge) for name, gauge in self.gauges.items()},
+            }
+
+    def prometheus_text(self):
+        """Render the metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            endpoints = list(self.endpoints.values())
+            counters = [
+                ("scraper_requests_total", "requests", "HTTP responses received."),
+                ("scraper_retries_total", "retries", "Request attempts after the first."),
+                ("scraper_failures_total", "failures", "Requests that failed after every retry."),
+                ("scraper_response_bytes_total", "bytes", "Response body bytes received."),
+                ("scraper_network_seconds_total", "network_seconds", "Time spent waiting on the network."),
+                ("scraper_parse_seconds_total", "parse_seconds", "Time spent decoding JSON."),
+            ]
+            for name, attribute, help_text in counters:
+                family(name, "counter", help_text)
+                for stats in endpoints:
+                    lines.append(f'{name}{{endpoint="{stats.endpoint}"}} {getattr(stats, attribute)}')
+            family("scraper_request_duration_seconds", "histogram", "HTTP request latency.")
+            for stats in endpoints:
+                labels = f'endpoint="{stats.endpoint}"'
+                for bound, count in stats.latency.cumulative():
+                    lines.append(f'scraper_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f"scraper_request_duration_seconds_sum{{{labels}}} {stats.latency.sum}")
+                lines.append(f"scraper_request_duration_seconds_count{{{labels}}} {stats.latency.count}")
+            family("scraper_phase_seconds", "gauge", "Time spent per pipeline phase.")
+            for phase, seconds in self.timings.items():
+                lines.append(f'scraper_phase_seconds{{phase="{phase}"}} {seconds}')
+            family("scraper_gauge_max", "gauge", "High-water mark of sampled gauges such as queue depths.")
+            for name, gauge in self.gauges.items():
+                lines.append(f'scraper_gauge_max{{name="{name}"}} {gauge["max"]}')
+        return "\n".join(lines) + "\n"
+
+
+_metrics = RunMetrics()
+
+
+def configure(runtime_config):
+    """Apply the ``runtime.metrics`` section and start a fresh set of metrics."""
+    global _metrics
+    _settings.clear()
+    _settings.update({**DEFAULT_METRICS, **(runtime_config.get("metrics") or {})})
+    _metrics = RunMetrics()
+
+
+def get_metrics():
+    return _metrics
+
+
+@contextmanager
+def timer(phase):
+    """Add the time spent in the ``with`` block to ``phase``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _metrics.add_time(phase, time.perf_counter() - started)
+
+
+def write_reports(extra=None):
+    """
+    Write the JSON run summary and Prometheus textfile, if configured.
+
+    Parameters:
+        extra (dict): More sections merged into the JSON summary, e.g. rate limiter state.
+
+    Returns:
+        dict: The run summary.
+    """
+    summary = {**_metrics.summary(), **(extra or {})}
+    if _settings.get("summary_filename"):
+        with open(_settings["summary_filename"], "w", encoding="utf-8") as summary_file:
+            json.dump(summary, summary_file, indent=2)
+    if _settings.get("prometheus_textfile"):
+        # Written to a temporary file and renamed so the collector never reads a partial file.
+        path = Path(_settings["prometheus_textfile"])
+        temporary_path = path.with_name(f"{path.name}.tmp")
+        temporary_path.write_text(_metrics.prometheus_text(), encoding="utf-8")
+        temporary_path.replace(path)
+    return summary
+
+
+class ProgressReporter:
+    """
+    Rate-limited progress logging for hot loops.
+
+    Logs at most once per ``interval`` seconds instead of one line per item.
+
+    Parameters:
+        label (str): What is being counted, e.g. "availability lookups".
+        interval (float): Seconds between log lines; defaults to ``metrics.progress_interval``.
+    """
+
+    def __init__(self, label, interval=None):
+        self.label = label
+        self.interval = float(_settings["progress_interval"] if interval is None else interval)
+        self._last_logged = time.monotonic()
+        self._lock = threading.Lock()
+
+    def update(self, completed, total=None):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_logged < self.interval:
+                return
+            self._last_logged = now
+        progress = f"{completed}/{total}" if total is not None else str(completed)
+        logging.info(f"Progress: {progress} {self.label}")
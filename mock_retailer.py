@@ -0,0 +1,401 @@
+"""Local mock retailer: serves menu, product model, paginated category search and availability endpoints."""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+
+
+AVAILABILITY_STATUSES = [
+    "IMMEDIATELY_AVAILABLE",
+    "LAST_PIECES",
+    "EXPECTED_SOON",
+    "ON_ORDER",
+    "NOT_AVAILABLE",
+    "EXHAUSTED",
+]
+
+MENU_PATH = "/content/home.navMenu.json"
+PRODUCTS_PREFIX = "/content/products/"
+SEARCH_PREFIX = "/api/search/store/"
+AVAILABILITY_PREFIX = "/api/availability/"
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops SYNs under a burst of pooled connections,
+    # which shows up as 1s client-side retransmit stalls.
+    request_queue_size = 256
+
+
+class MockCatalog:
+    """
+    Deterministic synthetic catalog.
+
+    Parameters:
+        level_1 (int): Number of level-1 categories.
+        level_2 (int): Level-2 categories under each level-1 category.
+        level_3 (int): Level-3 categories under each level-2 category.
+        products_per_category (int): Products listed under each level-3 category.
+        shared_products (int): Products from the previous level-3 category also
+            listed in the next one, to imitate cross-category overlap.
+        seed (int): Random seed for prices and availability.
+    """
+
+    def __init__(self, level_1=2, level_2=3, level_3=4, products_per_category=40, shared_products=0, seed=7):
+        self.seed = seed
+        self.categories = []
+        self.products_by_category = {}
+        self.products_by_sku = {}
+        rng = random.Random(seed)
+        previous_products = []
+        for i in range(level_1):
+            for j in range(level_2):
+                for k in range(level_3):
+                    path = [f"l1-{i}", f"l2-{i}-{j}", f"l3-{i}-{j}-{k}"]
+                    slug = path[-1]
+                    self.categories.append(path)
+                    products = previous_products[-shared_products:] if shared_products else []
+                    for n in range(products_per_category - len(products)):
+                        unique_id = f"{slug}-{n}"
+                        price = round(rng.uniform(5, 2000), 2)
+                        product = {
+                            "uniqueID": unique_id,
+                            "singleSKUCatalogEntryID": f"sku-{unique_id}",
+                            "partNumber": f"PN-{unique_id}",
+                            "shortDescription": f"Description of {unique_id}",
+                            "name": f"Product {unique_id}",
+                            "manufacturer": f"Brand {n % 17}",
+                            "buyable": "true",
+                            "UserData": [{"seo_url": f"/p/{unique_id}"}],
+                            "price": [
+                                {"usage": "Display", "value": str(round(price * 1.2, 2))},
+                                {"usage": "Offer", "value": str(price)},
+                            ],
+                        }
+                        products.append(product)
+                        self.products_by_sku[product["singleSKUCatalogEntryID"]] = product
+                    self.products_by_category[slug] = products
+                    previous_products = products
+
+    @property
+    def product_count(self):
+        return sum(len(products) for products in self.products_by_category.values())
+
+    def menu(self, nav_title):
+        tree = {}
+        for path in self.categories:
+            level_1 = tree.setdefault(path[0], {})
+            level_1.setdefault(path[1], []).append(path[2])
+
+        def node(level, name, aem_path, children):
+            entry = {
+                "level": str(level),
+                "uniqueID": f"id-{name}",
+                "jcr:title": name.upper(),
+                "seo_url": f"/{name}",
+                "aem_url": f"/content/products/{aem_path}",
+            }
+            if children:
+                entry["childMenu"] = children
+            return entry
+
+        child_menu = []
+        for level_1, level_2_map in tree.items():
+            level_2_nodes = []
+            for level_2, leaves in level_2_map.items():
+                leaf_nodes = [node(3, leaf, f"{level_1}/{level_2}/{leaf}", None) for leaf in leaves]
+                level_2_nodes.append(node(2, level_2, f"{level_1}/{level_2}", leaf_nodes))
+            child_menu.append(node(1, level_1, level_1, level_2_nodes))
+        return [{"navTitle": "Other", "childMenu": []}, {"navTitle": nav_title, "childMenu": child_menu}]
+
+    def model(self, aem_path):
+        parts = aem_path.split("/")
+        return {
+            "categoryId": f"cat-{parts[-1]}",
+            "title": parts[-1].upper(),
+            "remoteSPAUrl": "/" + "/".join(parts),
+        }
+
+    def search_page(self, slug, page_number, page_size):
+        products = self.products_by_category.get(slug)
+        if products is None:
+            return None
+        start = (page_number - 1) * page_size
+        return {
+            "recordSetTotal": len(products),
+            "recordSetStartNumber": start,
+            "catalogEntryView": products[start:start + page_size],
+        }
+
+    def availability(self, sku_id):
+        if sku_id not in self.products_by_sku:
+            return None
+        status = AVAILABILITY_STATUSES[random.Random(f"{self.seed}-{sku_id}").randrange(len(AVAILABILITY_STATUSES))]
+        return {"availableStatusKey": status}
+
+
+class MockRetailer:
+    """
+    Threaded HTTP server in front of a MockCatalog.
+
+    Parameters:
+        catalog (MockCatalog): The catalog to serve.
+        latency_ms (float): Median added latency per response.
+        latency_jitter (float): Log-normal sigma of the latency; 0 gives a constant latency.
+        error_rate (float): Fraction of requests answered with HTTP 500.
+        throttle_rps (float): Requests per second served before answering 429; 0 disables throttling.
+        outage_seconds (float): Length of an outage, answered with HTTP 503, that starts once
+            ``outage_after`` requests were served; 0 disables it.
+        outage_after (int): Requests served before the outage starts.
+        nav_title (str): Navigation section holding the catalog menu.
+        seed (int): Seed for latency and error sampling.
+    """
+
+    def __init__(
+        self,
+        catalog,
+        latency_ms=0.0,
+        latency_jitter=0.0,
+        error_rate=0.0,
+        throttle_rps=0.0,
+        outage_seconds=0.0,
+        outage_after=0,
+        nav_title="Products",
+        seed=11,
+        host="127.0.0.1",
+        port=0,
+    ):
+        self.catalog = catalog
+        self.latency_ms = float(latency_ms)
+        self.latency_jitter = float(latency_jitter)
+        self.error_rate = float(error_rate)
+        self.throttle_rps = float(throttle_rps)
+        self.outage_seconds = float(outage_seconds)
+        self.outage_after = int(outage_after)
+        self.nav_title = nav_title
+        self.request_counts = {"menu": 0, "model": 0, "search": 0, "availability": 0, "throttled": 0, "errors": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = self.throttle_rps
+        self._tokens_updated = time.monotonic()
+        self._requests_seen = 0
+        self._outage_started = None
+        self._server = _MockHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def config(self, page_size=15):
+        """Return a pipeline config whose endpoints all point at this server."""
+        return {
+            "site": {
+                "brand_name": "MockRetail",
+                "nav_title": self.nav_title,
+                "menu_endpoint": f"{self.base_url}{MENU_PATH}",
+                "web_base_url": "https://www.mock-retail.example.com",
+            },
+            "api": {
+                "product_model_template": f"{self.base_url}{PRODUCTS_PREFIX}{{aem_path}}.model.json",
+                "availability_template": f"{self.base_url}{AVAILABILITY_PREFIX}{{sku_id}}?storeId={{store_id}}",
+                "category_search_template": (
+                    f"{self.base_url}{SEARCH_PREFIX}{{store_id}}/byCategory/{{category_slug}}"
+                    "?pageNumber={page_number}&pageSize={page_size}&catalogId={catalog_id}"
+                    "&currency={currency}&langId={lang_id}&orderBy={order_by}"
+                ),
+                "store_id": "1",
+                "catalog_id": "1",
+                "currency": "EUR",
+                "lang_id": "-1",
+                "order_by": "10",
+                "page_size": page_size,
+            },
+        }
+
+    def _take_token(self):
+        if self.throttle_rps <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.throttle_rps, self._tokens + (now - self._tokens_updated) * self.throttle_rps)
+            self._tokens_updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def _in_outage(self):
+        if self.outage_seconds <= 0:
+            return False
+        with self._lock:
+            self._requests_seen += 1
+            if self._outage_started is None:
+                if self._requests_seen <= self.outage_after:
+                    return False
+                self._outage_started = time.monotonic()
+            return time.monotonic() - self._outage_started < self.outage_seconds
+
+    def _sample_delay(self):
+        if self.latency_ms <= 0:
+            return 0.0
+        with self._lock:
+            factor = self._rng.lognormvariate(0, self.latency_jitter) if self.latency_jitter > 0 else 1.0
+            return self.latency_ms * factor / 1000.0
+
+    def _should_fail(self):
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def _count(self, key):
+        with self._lock:
+            self.request_counts[key] += 1
+
+    def respond(self, path, query):
+        """
+        Build the response for a request.
+
+        Returns:
+            tuple: (status code, headers dict, JSON-serialisable body or None).
+        """
+        if self._in_outage():
+            self._count("errors")
+            return 503, {}, {"error": "outage"}
+        if not self._take_token():
+            self._count("throttled")
+            return 429, {"Retry-After": "1"}, {"error": "throttled"}
+        if self._should_fail():
+            self._count("errors")
+            return 500, {}, {"error": "synthetic failure"}
+
+        if path == MENU_PATH:
+            self._count("menu")
+            return 200, {}, self.catalog.menu(self.nav_title)
+        if path.startswith(PRODUCTS_PREFIX) and path.endswith(".model.json"):
+            self._count("model")
+            return 200, {}, self.catalog.model(path[len(PRODUCTS_PREFIX):-len(".model.json")])
+        if path.startswith(SEARCH_PREFIX):
+            self._count("search")
+            slug = path.rstrip("/").split("/")[-1]
+            page_number = int(query.get("pageNumber", ["1"])[0])
+            page_size = int(query.get("pageSize", ["15"])[0])
+            page = self.catalog.search_page(slug, page_number, page_size)
+            return (200, {}, page) if page is not None else (404, {}, {"error": "unknown category"})
+        if path.startswith(AVAILABILITY_PREFIX):
+            self._count("availability")
+            availability = self.catalog.availability(path[len(AVAILABILITY_PREFIX):])
+            return (200, {}, availability) if availability is not None else (404, {}, {"error": "unknown SKU"})
+        return 404, {}, {"error": "not found"}
+
+    def _handler_class(self):
+        retailer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                delay = retailer._sample_delay()
+                if delay:
+                    time.sleep(delay)
+                status, headers, body = retailer.respond(parsed.path, parse_qs(parsed.query))
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-retailer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def add_catalog_arguments(parser):
+    """Add the catalog and server shape options shared by the server and benchmark CLIs."""
+    parser.add_argument("--level-1", type=int, default=2)
+    parser.add_argument("--level-2", type=int, default=3)
+    parser.add_argument("--level-3", type=int, default=4)
+    parser.add_argument("--products-per-category", type=int, default=40)
+    parser.add_argument("--shared-products", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--latency-jitter", type=float, default=0.5, help="Log-normal sigma of the latency.")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rps", type=float, default=0.0, help="Answer 429 above this rate; 0 disables.")
+    parser.add_argument("--outage-seconds", type=float, default=0.0, help="Answer 503 for this long; 0 disables.")
+    parser.add_argument("--outage-after", type=int, default=1, help="Requests served before the outage starts.")
+    parser.add_argument("--seed", type=int, default=7)
+
+
+def build_retailer(args, host="127.0.0.1", port=0):
+    catalog = MockCatalog(
+        level_1=args.level_1,
+        level_2=args.level_2,
+        level_3=args.level_3,
+        products_per_category=args.products_per_category,
+        shared_products=args.shared_products,
+        seed=args.seed,
+    )
+    return MockRetailer(
+        catalog,
+        latency_ms=args.latency_ms,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        throttle_rps=args.throttle_rps,
+        outage_seconds=args.outage_seconds,
+        outage_after=args.outage_after,
+        seed=args.seed,
+        host=host,
+        port=port,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_catalog_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    retailer = build_retailer(args, host=args.host, port=args.port)
+    logging.info(f"Serving {retailer.catalog.product_count} products on {retailer.base_url}")
+    retailer.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        retailer.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
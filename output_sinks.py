@@ -0,0 +1,226 @@
+"""Streaming output writers: rows are written in chunks as they are produced instead of held in memory."""
+
+from pathlib import Path
+import csv
+import json
+import logging
+
+
+OUTPUT_SUFFIXES = {
+    "csv": ".csv",
+    "jsonl": ".jsonl",
+    "parquet": ".parquet",
+    "excel": ".xlsx",
+}
+
+
+class CsvSink:
+    """Write rows to a CSV file with a fixed header."""
+
+    def __init__(self, path, columns):
+        self.path = Path(path)
+        self.columns = list(columns)
+        self._file = open(self.path, "w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, extrasaction="ignore")
+        self._writer.writeheader()
+
+    def write_rows(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlSink:
+    """Write one JSON object per row."""
+
+    def __init__(self, path, columns):
+        self.path = Path(path)
+        self.columns = list(columns)
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def write_rows(self, rows):
+        for row in rows:
+            self._file.write(json.dumps({column: row.get(column) for column in self.columns}, ensure_ascii=False))
+            self._file.write("\n")
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetSink:
+    """
+    Write rows to Parquet, one row group per ``write_rows`` call.
+
+    Every column is stored as a nullable string, since the source JSON mixes
+    strings, numbers and "N/A" placeholders within the same field.
+    """
+
+    def __init__(self, path, columns):
+        # pyarrow is only needed for the parquet sink, and is slow to import.
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("The parquet output format requires pyarrow (pip install pyarrow).") from None
+        self._pa = pa
+        self.path = Path(path)
+        self.columns = list(columns)
+        self.schema = pa.schema([(column, pa.string()) for column in self.columns])
+        self._writer = pq.ParquetWriter(str(self.path), self.schema)
+
+    def write_rows(self, rows):
+        if not rows:
+            return
+        pa = self._pa
+        arrays = [
+            pa.array([None if row.get(column) is None else str(row.get(column)) for row in rows], type=pa.string())
+            for column in self.columns
+        ]
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+class ExcelSink:
+    """
+    Write rows to an .xlsx file with openpyxl's write-only mode.
+
+    Rows are streamed to the workbook's temporary files instead of being built
+    into a DataFrame, so memory stays flat however many rows are written.
+    Not one of the streaming output formats: export_rows uses it for Excel
+    output once rows were spilled to disk.
+    """
+
+    def __init__(self, path, columns):
+        import openpyxl
+
+        self.path = Path(path)
+        self.columns = list(columns)
+        self._workbook = openpyxl.Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet("Sheet1")
+        self._sheet.append(self.columns)
+
+    def write_rows(self, rows):
+        for row in rows:
+            self._sheet.append([row.get(column) for column in self.columns])
+
+    def close(self):
+        self._workbook.save(self.path)
+
+
+SINKS = {
+    "csv": CsvSink,
+    "jsonl": JsonlSink,
+    "parquet": ParquetSink,
+}
+
+
+def open_sink(output_format, path, columns):
+    """
+    Open a streaming sink.
+
+    Parameters:
+        output_format (str): One of "csv", "jsonl" or "parquet".
+        path (str): Output file path.
+        columns (list): Output columns, in order.
+
+    Returns:
+        An object with ``write_rows(rows)`` and ``close()``.
+    """
+    if output_format not in SINKS:
+        raise ValueError(f"Unknown output format '{output_format}'; expected one of {sorted(SINKS)}")
+    return SINKS[output_format](path, columns)
+
+
+def output_path(file_name, output_format):
+    """Swap the suffix of a configured output filename for the chosen format."""
+    return str(Path(file_name).with_suffix(OUTPUT_SUFFIXES[output_format]))
+
+
+def format_for_path(path):
+    """Streaming output format of a file name, from its suffix."""
+    suffix = Path(path).suffix
+    for output_format, format_suffix in OUTPUT_SUFFIXES.items():
+        if format_suffix == suffix and output_format in SINKS:
+            return output_format
+    raise ValueError(f"Unknown output file suffix '{suffix}'; expected one of .csv, .jsonl or .parquet")
+
+
+def iter_rows(path):
+    """Yield the rows of a CSV, JSONL or Parquet file written by a sink, as dicts."""
+    output_format = format_for_path(path)
+    if output_format == "parquet":
+        import pyarrow.parquet as pq
+
+        yield from pq.read_table(str(path)).to_pylist()
+        return
+    with open(path, "r", encoding="utf-8", newline="" if output_format == "csv" else None) as rows_file:
+        if output_format == "csv":
+            yield from csv.DictReader(rows_file)
+        else:
+            yield from (json.loads(line) for line in rows_file)
+
+
+def chunked(rows, chunk_size):
+    """Group an iterable of rows into lists of at most ``chunk_size``."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class RowSpool:
+    """
+    Append-only JSONL staging file for rows that still need a final pass
+    (e.g. the availability join) before they reach the sink.
+
+    Parameters:
+        path (str): Spool file path.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.row_count = 0
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def write_rows(self, rows):
+        for row in rows:
+            self._file.write(json.dumps(row, ensure_ascii=False))
+            self._file.write("\n")
+        self.row_count += len(rows)
+
+    def iter_chunks(self, chunk_size):
+        """Yield the spooled rows back in lists of at most ``chunk_size``."""
+        self._file.flush()
+        with open(self.path, "r", encoding="utf-8") as spool_file:
+            yield from chunked((json.loads(line) for line in spool_file), chunk_size)
+
+    def close(self, remove=False):
+        self._file.close()
+        if remove:
+            self.path.unlink(missing_ok=True)
+
+
+def convert_to_excel(path, output_format, excel_path):
+    """
+    Convert a finished CSV/JSONL/Parquet export to Excel.
+
+    This loads the whole file, so it is an optional post-processing step and is
+    limited by Excel's row cap.
+    """
+    import pandas as pd
+
+    if output_format == "csv":
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    elif output_format == "jsonl":
+        df = pd.read_json(path, lines=True, dtype=False)
+    else:
+        df = pd.read_parquet(path)
+    df.to_excel(excel_path, index=False)
+    logging.info(f"Converted {path} to {excel_path}")
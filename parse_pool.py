@@ -0,0 +1,140 @@
+"""Process pool for the CPU-bound part of stage 2: decoding search pages and extracting their product fields."""
+
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+import atexit
+import json
+import logging
+import multiprocessing
+import threading
+
+try:
+    import orjson
+except ImportError:  # orjson is only a faster drop-in for json.loads
+    orjson = None
+
+
+# Page- and product-level fields read downstream (pagination, row parsing, SKU collection).
+SEARCH_PAGE_KEYS = ["recordSetTotal", "recordSetStartNumber"]
+
+PRODUCT_SOURCE_KEYS = [
+    "uniqueID",
+    "singleSKUCatalogEntryID",
+    "partNumber",
+    "shortDescription",
+    "name",
+    "manufacturer",
+    "buyable",
+]
+
+
+def json_loads(use_orjson=True):
+    """``orjson.loads`` when it is installed and wanted, else ``json.loads``; both accept bytes."""
+    return orjson.loads if use_orjson and orjson is not None else json.loads
+
+
+def compact_product(product):
+    """Keep the fields of one ``catalogEntryView`` entry that the output rows and SKU lookups use."""
+    compact = {key: product[key] for key in PRODUCT_SOURCE_KEYS if key in product}
+    user_data = product.get("UserData")
+    if isinstance(user_data, list) and user_data:
+        first = user_data[0]
+        has_seo_url = isinstance(first, dict) and "seo_url" in first
+        compact["UserData"] = [{"seo_url": first["seo_url"]} if has_seo_url else {}]
+    elif "UserData" in product:
+        compact["UserData"] = user_data
+    if "price" in product:
+        compact["price"] = [
+            {key: price[key] for key in ("usage", "value") if key in price} for price in product["price"]
+        ]
+    return compact
+
+
+def compact_search_page(body, use_orjson=True):
+    """
+    Decode a search page and reduce it to the fields stage 2 reads.
+
+    Runs in a pool worker: only the raw body goes in and only the compact page
+    comes back, so both transfers stay small and the decoding never holds the
+    main process's GIL.
+
+    Raises:
+        ValueError: The body is not valid JSON (orjson's error subclasses it too).
+    """
+    data = json_loads(use_orjson)(body)
+    if not isinstance(data, dict):
+        return data
+    page = {key: data[key] for key in SEARCH_PAGE_KEYS if key in data}
+    products = data.get("catalogEntryView")
+    page["catalogEntryView"] = [compact_product(product) for product in products] if products else []
+    return page
+
+
+class ParsePool:
+    """
+    Decode search pages in worker processes.
+
+    decode_search_page is a drop-in ``decode`` for http_client.fetch_json_data:
+    the fetching thread hands over the raw body and waits for the compact page,
+    releasing the GIL meanwhile, so fetch threads keep several cores busy.
+    Workers are spawned rather than forked, since the crawl runs threads. If
+    the pool breaks (e.g. a worker is killed by the OOM killer), pages are
+    decoded in the fetching thread for the rest of the run instead of failing.
+
+    Parameters:
+        workers (int): Worker processes.
+        use_orjson (bool): Decode with orjson when it is installed.
+    """
+
+    def __init__(self, workers, use_orjson=True):
+        self.workers = int(workers)
+        self.use_orjson = use_orjson
+        self.broken = False
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def decode_search_page(self, body):
+        if not self.broken:
+            try:
+                return self._executor.submit(compact_search_page, body, self.use_orjson).result()
+            except (BrokenExecutor, RuntimeError) as error:
+                # RuntimeError: the pool was shut down while this thread was still fetching.
+                if not self.broken:
+                    self.broken = True
+                    logging.warning(f"Parse pool failed ({error!r}); decoding search pages in the fetching threads")
+        return compact_search_page(body, self.use_orjson)
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_settings = {"workers": 0, "use_orjson": True}
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def configure(runtime_config):
+    """Apply ``runtime.parse_workers`` (0 decodes in the fetching thread) and ``runtime.json_decoder``."""
+    close()
+    _settings["workers"] = int(runtime_config.get("parse_workers", 0) or 0)
+    _settings["use_orjson"] = runtime_config.get("json_decoder", "auto") != "json"
+
+
+def get_pool():
+    """Return the process-wide parse pool, starting it on first use; None when ``parse_workers`` is 0."""
+    global _pool
+    if not _settings["workers"]:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ParsePool(_settings["workers"], use_orjson=_settings["use_orjson"])
+                logging.info(f"Decoding search pages in {_pool.workers} worker processes")
+    return _pool
+
+
+@atexit.register
+def close():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
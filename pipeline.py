@@ -0,0 +1,99 @@
+"""Both stages in one process: stage 2 crawls categories while stage 1 is still emitting them."""
+
+import argparse
+import logging
+import queue
+import threading
+
+import http_client
+import menu_extractor
+import product_catalog_scraper as scraper
+
+
+_END = object()
+
+
+class CategoryHandoff:
+    """
+    Pass stage-1 category rows of one level to stage 2 as they are emitted.
+
+    Iterating blocks until the next row arrives and ends once stage 1 closes
+    the handoff; an error that stopped stage 1 is raised in the consumer.
+
+    Parameters:
+        level (int): Menu level stage 2 crawls; rows of other levels are dropped.
+    """
+
+    def __init__(self, level=3):
+        self.level = str(level)
+        self.handed_off = 0
+        self._queue = queue.Queue()
+        self._error = None
+
+    def put(self, row):
+        if str(row.get("Level")) == self.level:
+            self.handed_off += 1
+            self._queue.put(row)
+
+    def close(self, error=None):
+        self._error = error
+        self._queue.put(_END)
+
+    def __iter__(self):
+        while True:
+            row = self._queue.get()
+            if row is _END:
+                if self._error is not None:
+                    raise self._error
+                return
+            yield row
+
+
+def run_pipeline(limit=None, resume=False):
+    """
+    Run stage 1 in a background thread and stage 2 on its categories as they arrive.
+
+    Stage 1 still writes its configured outputs (the Excel workbook and/or the
+    handoff file), so a later stage-2 run or ``--resume`` can use them.
+    """
+    config = scraper.ensure_configured()
+    http_client.register_endpoint("menu", config["site"]["menu_endpoint"])
+    handoff = CategoryHandoff(config["io"].get("menu_crawl_level", 3))
+
+    def run_stage_1():
+        error = None
+        try:
+            menu_extractor.write_menu_outputs(menu_extractor.iter_menu_categories(config), config, on_row=handoff.put)
+        except Exception as e:
+            logging.error(f"Stage 1 failed: {e}")
+            error = e
+        finally:
+            handoff.close(error)
+            logging.info(f"Stage 1 handed off {handoff.handed_off} categories")
+
+    stage_1 = threading.Thread(target=run_stage_1, name="menu-extractor", daemon=True)
+    stage_1.start()
+    try:
+        scraper.main(limit=limit, resume=resume, categories=handoff)
+    finally:
+        stage_1.join()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--config", default=None, help="Config file; defaults to config.yaml next to the scraper.")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after roughly this many products.")
+    parser.add_argument("--resume", action="store_true", help="Skip work recorded in the checkpoint journal.")
+    return parser.parse_args(argv)
+
+
+def run_cli(argv=None):
+    args = parse_args(argv)
+    if args.config:
+        scraper.configure_from_file(args.config)
+    run_pipeline(limit=args.limit, resume=args.resume)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    run_cli()
@@ -2,15 +2,42 @@
 
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from operator import attrgetter
 from pathlib import Path
+import argparse
+import asyncio
 import concurrent.futures
+import itertools
 import logging
-import time
+import math
+import queue
+import threading
 
-import pandas as pd
-import requests
 import yaml
 
+from async_engine import AsyncFetchEngine
+from availability_pipeline import AvailabilityPipeline
+from checkpoint import CheckpointJournal
+from delta import DeltaSnapshot
+from history_store import HistoryStore
+from lazy_loading import LazyConfig, LazyModule
+from memory_budget import DiskDict, MemoryBudget, SpillStore
+from output_sinks import ExcelSink, RowSpool, chunked, convert_to_excel, iter_rows, open_sink, output_path
+from product_index import ProductIndex
+from scheduler import CategoryStats, Deadline, schedule_jobs
+from store_availability import StoreAvailabilityFetcher, write_store_availability
+from http_client import fetch_json_data
+import http_client
+import memory_budget
+import metrics
+import parse_pool
+import rate_limiter
+import response_cache
+
+
+# pandas and numpy are only needed for Excel I/O and the columnar post-processing stage.
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
 
 CONFIG_PATH = Path(__file__).resolve().with_name("config.yaml")
 
@@ -20,40 +47,61 @@ def load_config(config_path=CONFIG_PATH):
         return yaml.safe_load(config_file)
 
 
-CONFIG = load_config()
-SITE_CONFIG = CONFIG["site"]
-API_CONFIG = CONFIG["api"]
-IO_CONFIG = CONFIG["io"]
-RUNTIME_CONFIG = CONFIG["runtime"]
-
-# Initialize logging to log information and errors.
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+def configure(config):
+    """
+    Make ``config`` the active configuration and set up the shared HTTP client for it.
 
+    A LazyConfig that has not been loaded yet is installed as is: the HTTP
+    client is set up when it is first read.
 
-def fetch_json_data(url, retries=None, timeout=None):
+    Parameters:
+        config (dict): Parsed config with site, api, io and runtime sections, or a LazyConfig.
     """
-    Fetch JSON data from a given URL.
+    global CONFIG, SITE_CONFIG, API_CONFIG, IO_CONFIG, RUNTIME_CONFIG, DELTA_CONFIG
+    if isinstance(config, LazyConfig):
+        if config.loaded:
+            config = config.load()
+        else:
+            CONFIG = config
+            SITE_CONFIG = config.section("site")
+            API_CONFIG = config.section("api")
+            IO_CONFIG = config.section("io")
+            RUNTIME_CONFIG = config.section("runtime")
+            DELTA_CONFIG = config.section("delta", optional=True)
+            return
+    CONFIG = config
+    SITE_CONFIG = config["site"]
+    API_CONFIG = config["api"]
+    IO_CONFIG = config["io"]
+    RUNTIME_CONFIG = config["runtime"]
+    DELTA_CONFIG = config.get("delta") or {}
+    http_client.configure(RUNTIME_CONFIG, config.get("store_availability"))
+    http_client.register_endpoint("model", API_CONFIG["product_model_template"])
+    http_client.register_endpoint("search", API_CONFIG["category_search_template"])
+    http_client.register_endpoint("availability", API_CONFIG["availability_template"])
+    if API_CONFIG.get("availability_batch_template"):
+        http_client.register_endpoint("availability_batch", API_CONFIG["availability_batch_template"])
 
-    Parameters:
-        url (str): The URL to fetch data from.
-        retries (int): Number of retry attempts.
-        timeout (int): Timeout in seconds for the request.
 
-    Returns:
-        dict: The JSON data fetched from the URL. Returns None if fetching fails.
-    """
-    retries = RUNTIME_CONFIG["request_retries"] if retries is None else retries
-    timeout = RUNTIME_CONFIG["request_timeout"] if timeout is None else timeout
+def configure_from_file(config_path=CONFIG_PATH):
+    """Install the config at ``config_path``, to be read and applied on first use."""
 
-    for _ in range(retries):
-        try:
-            response = requests.get(url, timeout=timeout)
-            response.raise_for_status()
-            return response.json()
-        except (requests.RequestException, ValueError) as e:
-            logging.warning(f"Error fetching {url}: {e}")
-            time.sleep(1)
-    return None
+    def load_and_apply():
+        config = load_config(config_path)
+        configure(config)
+        return config
+
+    configure(LazyConfig(load_and_apply))
+
+
+def ensure_configured():
+    """Load the active config now if that has not happened yet, and return it."""
+    if isinstance(CONFIG, LazyConfig):
+        CONFIG.load()
+    return CONFIG
+
+
+configure_from_file()
 
 
 def fetch_additional_info(aem_url_parts):
@@ -77,6 +125,26 @@ def fetch_additional_info(aem_url_parts):
         return {}
 
 
+def fetch_search_page(url):
+    """
+    Fetch one search result page.
+
+    With ``runtime.parse_workers`` set, the page is decoded and reduced to the
+    fields stage 2 reads in the parse pool's worker processes instead of the
+    fetching thread (see parse_pool.ParsePool).
+
+    Parameters:
+        url (str): Search page URL.
+
+    Returns:
+        dict: The search page, or None if fetching fails.
+    """
+    pool = parse_pool.get_pool()
+    if pool is None:
+        return fetch_json_data(url)
+    return fetch_json_data(url, decode=pool.decode_search_page)
+
+
 def fetch_single_availability(sku_id):
     """
     Fetch availability status for a single SKU ID.
@@ -93,42 +161,51 @@ def fetch_single_availability(sku_id):
     )
     data = fetch_json_data(url)
     status = data.get("availableStatusKey", "N/A") if data else "N/A"
-    logging.info(f"Fetched availability for SKU ID {sku_id}: {status}")
+    logging.debug(f"Fetched availability for SKU ID {sku_id}: {status}")
     return status
 
 
-def fetch_availability_statuses(single_sku_ids):
+def fetch_availability_statuses(single_sku_ids, fetch_status=None, statuses=None, unique=False):
     """
     Fetch availability statuses for a batch of SKU IDs using multithreading.
 
     Parameters:
         single_sku_ids (list): List of SKU IDs to check.
+        fetch_status (callable): Per-SKU lookup; defaults to fetch_single_availability.
+        statuses (MutableMapping): Receives the statuses, e.g. a spilled DiskDict; a new dict by default.
+        unique (bool): ``single_sku_ids`` is a sized collection already free of duplicates and
+            nulls (e.g. a spilled DiskSet), so no in-memory copy is made to deduplicate it.
 
     Returns:
-        dict: A dictionary mapping SKU IDs to their availability statuses.
+        dict: A dictionary mapping SKU IDs to their availability statuses (``statuses`` when given).
     """
-    unique_sku_ids = []
-    seen_sku_ids = set()
-    for sku_id in single_sku_ids:
-        if sku_id is None or (isinstance(sku_id, float) and pd.isna(sku_id)):
-            continue
-        if sku_id in seen_sku_ids:
-            continue
-        seen_sku_ids.add(sku_id)
-        unique_sku_ids.append(sku_id)
+    statuses = {} if statuses is None else statuses
+    if unique:
+        unique_sku_ids = single_sku_ids
+    else:
+        unique_sku_ids = []
+        seen_sku_ids = set()
+        for sku_id in single_sku_ids:
+            if sku_id is None or (isinstance(sku_id, float) and math.isnan(sku_id)):
+                continue
+            if sku_id in seen_sku_ids:
+                continue
+            seen_sku_ids.add(sku_id)
+            unique_sku_ids.append(sku_id)
 
     if not unique_sku_ids:
-        return {}
+        return statuses
 
-    statuses = {}
-    max_workers = 12
+    fetch_status = fetch_single_availability if fetch_status is None else fetch_status
+    max_workers = int(RUNTIME_CONFIG.get("availability_workers", 12))
     batch_size = 200
     completed = 0
+    total = len(unique_sku_ids)
+    progress = metrics.ProgressReporter("availability lookups")
 
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        for batch_start in range(0, len(unique_sku_ids), batch_size):
-            batch_sku_ids = unique_sku_ids[batch_start:batch_start + batch_size]
-            future_to_sku = {executor.submit(fetch_single_availability, sku_id): sku_id for sku_id in batch_sku_ids}
+        for batch_sku_ids in chunked(unique_sku_ids, batch_size):
+            future_to_sku = {executor.submit(fetch_status, sku_id): sku_id for sku_id in batch_sku_ids}
             for future in concurrent.futures.as_completed(future_to_sku):
                 sku = future_to_sku[future]
                 try:
@@ -137,8 +214,8 @@ def fetch_availability_statuses(single_sku_ids):
                     logging.warning(f"Availability fetch failed for SKU ID {sku}: {e}")
                     statuses[sku] = "N/A"
                 completed += 1
-                if completed % 10 == 0:
-                    logging.info(f"Completed fetching availability for {completed}/{len(unique_sku_ids)} SKU IDs.")
+                progress.update(completed, total)
+    logging.info(f"Completed fetching availability for {completed} SKU IDs.")
     return statuses
 
 
@@ -147,169 +224,1350 @@ def save_to_excel(data, filename):
     Save data to an Excel file.
 
     Parameters:
-        data (list): List of dictionaries containing the data.
+        data (list): List of dictionaries containing the data, or a DataFrame from build_output_frame.
         filename (str): The name of the Excel file to save data to.
     """
-    df = pd.DataFrame(data)
-    df.to_excel(filename, index=False)
+    with metrics.timer("output_write"):
+        df = pd.DataFrame(data)
+        df.to_excel(filename, index=False)
     logging.info(f"Data saved to {filename}")
 
 
-def main(limit=None):
+PRODUCT_KEYS_TO_EXTRACT = [
+    "uniqueID",
+    "singleSKUCatalogEntryID",
+    "partNumber",
+    "shortDescription",
+    "name",
+    "manufacturer",
+    "buyable",
+]
+
+AVAILABILITY_TRANSLATION = {
+    "EXHAUSTED": "Εξαντλημένο",
+    "EXPECTED_SOON": "Αναμένεται Σύντομα",
+    "IMMEDIATELY_AVAILABLE": "Άμεσα διαθέσιμο",
+    "LAST_PIECES": "Τελευταία τεμάχια",
+    "N/A": "N/A",
+    "NOT_AVAILABLE": "Μη διαθέσιμο",
+    "ON_ORDER": "Σε παραγγελία",
+    "Preorderable": "Διαθέσιμο για προπαραγγελία",
+    "SPECIAL_ORDER": "Ειδική Παραγγελία",
+    "": "",  # for any blank values
+}
+
+
+LEVEL_KEYS = ["Level 1", "Level 2", "Level 3"]
+
+PRODUCT_DETAIL_KEYS = ["Link", "Original_Price", "Current_Price"]
+
+OUTPUT_COLUMNS = [
+    "Category_ID_number",
+    "Category_Title",
+    "Category_URL",
+    *PRODUCT_KEYS_TO_EXTRACT,
+    "Level 1",
+    "Level 2",
+    "Level 3",
+    "Link",
+    "Original_Price",
+    "Current_Price",
+    "Availability Status",
+]
+
+# Layout of io.product_index: "normalized", one row per product plus a membership table.
+PRODUCT_COLUMNS = [*PRODUCT_KEYS_TO_EXTRACT, *PRODUCT_DETAIL_KEYS, "Availability Status"]
+
+PRODUCT_CATEGORY_COLUMNS = ["uniqueID", "Category_ID_number", "Category_Title", "Category_URL", *LEVEL_KEYS]
+
+
+def build_category_info(additional_info):
+    """
+    Build the category-level fields shared by every product of a category.
+
+    Parameters:
+        additional_info (dict): Product model JSON returned by fetch_additional_info.
+
+    Returns:
+        dict: Category ID, title and URL.
+    """
+    return {
+        "Category_ID_number": additional_info.get("categoryId", "N/A"),
+        "Category_Title": additional_info.get("title", "N/A"),
+        "Category_URL": additional_info.get("remoteSPAUrl", "N/A"),
+    }
+
+
+def build_category_search_url(category_slug, page_number):
+    """
+    Build the category search URL for a single result page.
+
+    Parameters:
+        category_slug (str): Last AEM URL part identifying the category.
+        page_number (int): 1-based page number.
+
+    Returns:
+        str: The search endpoint URL.
+    """
+    return API_CONFIG["category_search_template"].format(
+        store_id=API_CONFIG["store_id"],
+        category_slug=category_slug,
+        page_number=page_number,
+        page_size=API_CONFIG["page_size"],
+        catalog_id=API_CONFIG["catalog_id"],
+        currency=API_CONFIG["currency"],
+        lang_id=API_CONFIG["lang_id"],
+        order_by=API_CONFIG["order_by"],
+    )
+
+
+class CategoryPagination:
+    """
+    Track page numbers and consecutive page failures while walking one category.
+
+    ``done`` is set when the category ends; ``aborted`` additionally marks that
+    it ended because of repeated page failures, so its pages are incomplete.
+
+    When the first page carries a ``recordSetTotal``, the remaining pages are
+    known up front and next_batch hands out up to ``parallel_pages`` of them at
+    once; a short last page then ends the category without requesting the empty
+    page after it. Without a count, next_batch speculatively hands out
+    ``speculative_pages`` pages. Responses are always recorded in page order, so
+    empty and failed pages end the category exactly as in a page-by-page walk.
+
+    Parameters:
+        category_slug (str): Last AEM URL part identifying the category.
+        start_page (int): First page to fetch; above 1 when resuming a category.
+        max_consecutive_page_failures (int): Failed pages in a row before giving up.
+        page_size (int): Products per full page; defaults to ``api.page_size``.
+    """
+
+    def __init__(self, category_slug, start_page=1, max_consecutive_page_failures=3, page_size=None):
+        self.category_slug = category_slug
+        self.max_consecutive_page_failures = max_consecutive_page_failures
+        self.page_size = int(API_CONFIG["page_size"] if page_size is None else page_size)
+        self.page_number = start_page
+        self.last_page = None
+        self.consecutive_page_failures = 0
+        self.done = False
+        self.aborted = False
+
+    def url(self, page_number):
+        return build_category_search_url(self.category_slug, page_number)
+
+    def next_url(self):
+        return self.url(self.page_number)
+
+    def next_batch(self, parallel_pages=1, speculative_pages=1):
+        """
+        Page numbers to fetch together next, starting with the current page.
+
+        The first page is always fetched alone, since it carries the result count
+        and decides delta replays.
+        """
+        if self.page_number == 1:
+            return [1]
+        if self.last_page is not None and self.page_number <= self.last_page:
+            last = min(self.last_page, self.page_number + max(1, parallel_pages) - 1)
+        else:
+            last = self.page_number + max(1, speculative_pages) - 1
+        return list(range(self.page_number, last + 1))
+
+    def record(self, data):
+        """
+        Record the response for the current page and advance.
+
+        Parameters:
+            data (dict): Parsed search response, or None if the fetch failed.
+
+        Returns:
+            list: Products on the page; empty when the page failed or ended the category.
+        """
+        if data is None:
+            self.consecutive_page_failures += 1
+            logging.warning(
+                f"Failed to fetch category page {self.page_number} for '{self.category_slug}' "
+                f"({self.consecutive_page_failures}/{self.max_consecutive_page_failures})"
+            )
+            if self.consecutive_page_failures >= self.max_consecutive_page_failures:
+                logging.error(f"Stopping category '{self.category_slug}' after repeated page fetch failures.")
+                self.done = True
+                self.aborted = True
+            self.page_number += 1
+            return []
+
+        self.consecutive_page_failures = 0
+        products = data.get("catalogEntryView", [])
+        if not products:
+            self.done = True
+            return []
+        if self.page_number == 1:
+            self.last_page = result_page_count(data, self.page_size)
+        if self.last_page is not None and self.page_number >= self.last_page and len(products) < self.page_size:
+            self.done = True
+        self.page_number += 1
+        return products
+
+
+def result_page_count(first_page_data, page_size):
+    """Number of result pages from the first page's ``recordSetTotal``, or None when it is missing."""
+    try:
+        total = int(first_page_data.get("recordSetTotal"))
+    except (TypeError, ValueError):
+        return None
+    return max(1, math.ceil(total / page_size))
+
+
+def page_windows():
+    """``(parallel_pages, speculative_pages)`` from the runtime config."""
+    return (
+        max(1, int(RUNTIME_CONFIG.get("parallel_pages", 4))),
+        max(1, int(RUNTIME_CONFIG.get("speculative_pages", 2))),
+    )
+
+
+def record_page_batch(pagination, state, key, page_numbers, responses):
+    """
+    Feed a batch of fetched pages to ``pagination`` in page order.
+
+    Pages fetched past the end of the category are dropped.
+
+    Returns:
+        tuple: The non-empty product pages, and the previous run's pages when page 1
+            showed the category is unchanged (else None).
+    """
+    pages = []
+    for page_number, data in zip(page_numbers, responses):
+        if page_number == 1:
+            unchanged_pages = state.unchanged_pages(key, data)
+            if unchanged_pages is not None:
+                return pages, unchanged_pages
+        products = pagination.record(data)
+        if products:
+            state.record_page(key, page_number, products, data)
+            pages.append(products)
+        if pagination.done:
+            break
+    return pages, None
+
+
+def category_fields(category_info):
+    """
+    Category-level output fields: the category info plus its Level 1-3 split of Category_URL.
+
+    Parameters:
+        category_info (dict): Category-level fields from build_category_info.
+
+    Returns:
+        dict: The category info followed by "Level 1" to "Level 3".
+    """
+    fields = category_info.copy()
+    category_levels = fields["Category_URL"].strip("/").split("/")
+    for i, level_key in enumerate(LEVEL_KEYS):
+        fields[level_key] = category_levels[i] if i < len(category_levels) else None
+    return fields
+
+
+PRODUCT_RECORD_KEYS = [*PRODUCT_KEYS_TO_EXTRACT, *PRODUCT_DETAIL_KEYS]
+
+
+class ProductRecord:
+    """
+    Compact product-level fields of one search result.
+
+    Attributes are named after the output columns, and ``record[column]`` reads
+    them like a dict. ``category`` is the category_fields dict shared by
+    reference by every record of a category (None for records kept in a
+    ProductIndex, which stores category fields separately).
+    """
+
+    __slots__ = ("category", *PRODUCT_RECORD_KEYS)
+
+    def __init__(self, category, values):
+        self.category = category
+        for key, value in zip(PRODUCT_RECORD_KEYS, values):
+            setattr(self, key, value)
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def __eq__(self, other):
+        if not isinstance(other, ProductRecord):
+            return NotImplemented
+        return self.category == other.category and self.product_fields() == other.product_fields()
+
+    def product_fields(self):
+        """The product-level fields as a dict, in PRODUCT_RECORD_KEYS order."""
+        return {key: getattr(self, key) for key in PRODUCT_RECORD_KEYS}
+
+    def as_row(self):
+        """The full output row, in OUTPUT_COLUMNS order."""
+        return build_row(self.category, self)
+
+
+def parse_product_record(product, category=None, link_prefix=None):
+    """
+    Parse one search result into a ProductRecord.
+
+    Parameters:
+        product (dict): One ``catalogEntryView`` entry.
+        category (dict): Shared category_fields of the category, or None.
+        link_prefix (str): ``site.web_base_url`` with one trailing slash; computed when omitted.
+
+    Returns:
+        ProductRecord: The record; nothing else is allocated per product.
+    """
+    if link_prefix is None:
+        link_prefix = product_link_prefix()
+    get = product.get
+
+    user_data = get("UserData")
+    user_data_first = user_data[0] if isinstance(user_data, list) and user_data else None
+    seo_url = user_data_first.get("seo_url", "N/A") if isinstance(user_data_first, dict) else "N/A"
+    link = link_prefix + seo_url.lstrip("/") if isinstance(seo_url, str) else "N/A"
+
+    # Display is interpreted as the old price, Offer as the new price.
+    original_price, current_price = "N/A", "N/A"
+    for price in get("price", ()):
+        usage = price.get("usage")
+        if usage == "Display":
+            original_price = price.get("value", "N/A")
+        elif usage == "Offer":
+            current_price = price.get("value", "N/A")
+
+    return ProductRecord(
+        category,
+        (
+            get("uniqueID", "N/A"),
+            get("singleSKUCatalogEntryID", "N/A"),
+            get("partNumber", "N/A"),
+            get("shortDescription", "N/A"),
+            get("name", "N/A"),
+            get("manufacturer", "N/A"),
+            get("buyable", "N/A"),
+            link,
+            original_price,
+            current_price,
+        ),
+    )
+
+
+def product_link_prefix():
+    """``site.web_base_url`` with exactly one trailing slash, for building product links."""
+    return SITE_CONFIG["web_base_url"].rstrip("/") + "/"
+
+
+def parse_product(product):
+    """
+    Extract the product-level output fields of one search result.
+
+    Parameters:
+        product (dict): One ``catalogEntryView`` entry.
+
+    Returns:
+        dict: PRODUCT_KEYS_TO_EXTRACT followed by Link, Original_Price and Current_Price.
+    """
+    return parse_product_record(product).product_fields()
+
+
+def build_row(category_fields, product_info):
+    """
+    Combine category-level and product-level fields into one output row, in OUTPUT_COLUMNS order.
+
+    ``product_info`` may be a dict from parse_product or a ProductRecord.
+    """
+    row = {key: value for key, value in category_fields.items() if key not in LEVEL_KEYS}
+    for key in PRODUCT_KEYS_TO_EXTRACT:
+        row[key] = product_info[key]
+    for key in LEVEL_KEYS:
+        row[key] = category_fields[key]
+    for key in PRODUCT_DETAIL_KEYS:
+        row[key] = product_info[key]
+    return row
+
+
+def parse_category_records(products, category):
+    """
+    Parse the raw products of one search page into records sharing ``category``.
+
+    Parameters:
+        products (list): The ``catalogEntryView`` entries of a search page.
+        category (dict): category_fields of the category, computed once per category.
+
+    Returns:
+        list: One ProductRecord per product.
+    """
+    link_prefix = product_link_prefix()
+    return [parse_product_record(product, category, link_prefix) for product in products]
+
+
+def parse_category_products(products, category_info):
+    """
+    Turn the raw products of one search page into output rows.
+
+    Parameters:
+        products (list): The ``catalogEntryView`` entries of a search page.
+        category_info (dict): Category-level fields from build_category_info.
+
+    Returns:
+        list: One dictionary per product.
+    """
+    records = parse_category_records(products, category_fields(category_info))
+    return [record.as_row() for record in records]
+
+
+def extract_sku_ids(products):
+    """Return the non-null ``singleSKUCatalogEntryID`` values of a search page, in order."""
+    return [
+        product["singleSKUCatalogEntryID"]
+        for product in products
+        if product.get("singleSKUCatalogEntryID", None) is not None
+    ]
+
+
+def progress_label(index, total_rows):
+    """``"3/10"`` for the 0-based ``index``, or just ``"3"`` while the total is unknown."""
+    return f"{index + 1}/{total_rows}" if total_rows is not None else f"{index + 1}"
+
+
+def read_category_rows():
+    """
+    Load the stage-1 categories to crawl.
+
+    Reads the ``io.menu_crawl_level`` rows of ``io.menu_handoff_filename`` when
+    it is set, otherwise the ``io.menu_sheet_name`` sheet of the Excel workbook.
+
+    Returns:
+        list or pandas.DataFrame: Rows with at least an ``AEM_URL`` column.
+    """
+    handoff_filename = IO_CONFIG.get("menu_handoff_filename")
+    if handoff_filename:
+        level = str(IO_CONFIG.get("menu_crawl_level", 3))
+        return [row for row in iter_rows(handoff_filename) if str(row.get("Level")) == level]
+    return pd.read_excel(IO_CONFIG["menu_excel_filename"], sheet_name=IO_CONFIG["menu_sheet_name"])
+
+
+def iter_category_jobs(df):
+    """
+    Yield ``(index, aem_url_parts)`` for every usable row of the stage-1 categories.
+
+    ``df`` is the stage-1 sheet, a list of row dicts, or any iterable of row
+    dicts, such as a stage-1 handoff still being filled. Rows with a missing or
+    invalid AEM_URL are logged and skipped.
+    """
+    rows = df.to_dict("records") if hasattr(df, "to_dict") else df
+    total_rows = len(rows) if hasattr(rows, "__len__") else None
+    for index, row in enumerate(rows):
+        aem_url = row.get("AEM_URL")
+        if not isinstance(aem_url, str) or not aem_url.strip():
+            logging.warning(f"Skipping row {progress_label(index, total_rows)}: missing AEM_URL")
+            continue
+        aem_url_parts = [part for part in aem_url.split("/") if part][-3:]
+        if not aem_url_parts:
+            logging.warning(f"Skipping row {progress_label(index, total_rows)}: invalid AEM_URL '{aem_url}'")
+            continue
+        yield index, aem_url_parts
+
+
+def category_key(aem_url_parts):
+    """Stable identifier of a category in checkpoints and reports."""
+    return "/".join(aem_url_parts)
+
+
+class CrawlState:
+    """
+    Per-run collaborators consulted while crawling categories.
+
+    Parameters:
+        checkpoint (CheckpointJournal): Journal replayed on resume and appended to as pages arrive.
+        delta (DeltaSnapshot): Previous run's snapshot used to skip unchanged categories.
+        stats (CategoryStats): Size and change history that schedules the next run.
+    """
+
+    def __init__(self, checkpoint=None, delta=None, stats=None):
+        self.checkpoint = checkpoint
+        self.delta = delta
+        self.stats = stats
+
+    def category_info(self, aem_url_parts, additional_info_fetcher):
+        key = category_key(aem_url_parts)
+        if self.checkpoint is not None:
+            saved_info = self.checkpoint.category_info(key)
+            if saved_info is not None:
+                return saved_info
+        category_info = build_category_info(additional_info_fetcher(aem_url_parts))
+        if self.checkpoint is not None:
+            self.checkpoint.record_category(key, category_info)
+        return category_info
+
+    def saved_pages(self, key):
+        """Pages journaled by an interrupted run, the next page to fetch and whether the category finished."""
+        if self.checkpoint is None:
+            return [], 1, False
+        return self.checkpoint.saved_pages(key)
+
+    def unchanged_pages(self, key, first_page_data):
+        """The previous run's pages when the first page shows the category is unchanged, else None."""
+        if self.delta is None:
+            return None
+        return self.delta.unchanged_pages(key, first_page_data)
+
+    def record_page(self, key, page_number, products, data):
+        if self.checkpoint is not None:
+            self.checkpoint.record_page(key, page_number, products)
+        if self.delta is not None:
+            self.delta.record_page(key, page_number, products, data)
+        if self.stats is not None:
+            self.stats.record_page(key, page_number, products, data)
+
+    def record_category_done(self, key):
+        if self.checkpoint is not None:
+            self.checkpoint.record_category_done(key)
+        if self.delta is not None:
+            self.delta.record_category_done(key)
+        if self.stats is not None:
+            self.stats.record_category_done(key)
+
+    def record_category_aborted(self, key):
+        """Keep a category cut short by page failures out of the snapshot and unfinished in the journal."""
+        if self.delta is not None:
+            self.delta.discard_category(key)
+        if self.stats is not None:
+            self.stats.discard_category(key)
+
+
+def iter_category_pages(category_slug, state=None, key=None):
+    """
+    Fetch the pages of one category, yielding the products of each non-empty page in order.
+
+    Pages journaled by an interrupted run are replayed first and fetching
+    continues after the last saved page. In delta mode an unchanged first page
+    replays the previous run's pages instead of paginating further. Later pages
+    are fetched in parallel batches (see CategoryPagination.next_batch).
+    """
+    state = CrawlState() if state is None else state
+    saved_pages, start_page, done = state.saved_pages(key)
+    yield from saved_pages
+    if done:
+        return
+
+    parallel_pages, speculative_pages = page_windows()
+    pagination = CategoryPagination(category_slug, start_page=start_page)
+    executor = None
+    try:
+        while not pagination.done:
+            page_numbers = pagination.next_batch(parallel_pages, speculative_pages)
+            urls = [pagination.url(page_number) for page_number in page_numbers]
+            if len(urls) == 1:
+                responses = [fetch_search_page(urls[0])]
+            else:
+                if executor is None:
+                    executor = ThreadPoolExecutor(max_workers=max(parallel_pages, speculative_pages))
+                responses = list(executor.map(fetch_search_page, urls))
+            pages, unchanged_pages = record_page_batch(pagination, state, key, page_numbers, responses)
+            if unchanged_pages is not None:
+                yield from unchanged_pages
+                return
+            yield from pages
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+    if pagination.aborted:
+        state.record_category_aborted(key)
+    else:
+        state.record_category_done(key)
+
+
+def crawl_categories_serial(jobs, total_rows, state=None, deadline=None):
+    """
+    Crawl categories one after another.
+
+    Yields ``(category_info, pages)`` per category, where ``pages`` lazily fetches
+    result pages so the caller can stop as soon as its product limit is reached.
+    Once ``deadline`` has passed no further category is started.
+    """
+    state = CrawlState() if state is None else state
+    for index, aem_url_parts in jobs:
+        if deadline is not None and deadline.check():
+            break
+        category_info = state.category_info(aem_url_parts, fetch_additional_info)
+        logging.info(f"Collecting product info {progress_label(index, total_rows)}")
+        yield category_info, iter_category_pages(aem_url_parts[-1], state, category_key(aem_url_parts))
+
+
+class ProductBudget:
+    """
+    Share the ``--limit`` product budget between concurrently crawled categories.
+
+    Categories are exported in input order, so a category may stop once it and
+    every category before it already hold ``limit`` products. Counts of earlier
+    categories that are still running only grow, so stopping on them never drops
+    a page the serial crawl would have exported.
+
+    Parameters:
+        categories (int): Number of categories known up front; more are added as they are scheduled.
+        limit (int): Product budget, or None for no limit.
+    """
+
+    def __init__(self, categories=0, limit=None):
+        self.limit = limit
+        self._counts = [0] * categories
+
+    def add(self, position, product_count):
+        if position >= len(self._counts):
+            self._counts.extend([0] * (position + 1 - len(self._counts)))
+        self._counts[position] += product_count
+
+    def reached(self, position):
+        """Whether the categories up to and including ``position`` already fill the budget."""
+        return self.limit is not None and sum(self._counts[:position + 1]) >= self.limit
+
+
+async def _crawl_category_async(engine, aem_url_parts, position, budget, state):
+    key = category_key(aem_url_parts)
+    model_url = API_CONFIG["product_model_template"].format(aem_path="/".join(aem_url_parts))
+    category_info = await engine.run(model_url, state.category_info, aem_url_parts, fetch_additional_info)
+
+    pages = []
+
+    def add_page(products):
+        pages.append(products)
+        budget.add(position, len(products))
+
+    saved_pages, start_page, done = state.saved_pages(key)
+    for products in saved_pages:
+        add_page(products)
+
+    parallel_pages, speculative_pages = page_windows()
+    pagination = CategoryPagination(aem_url_parts[-1], start_page=start_page)
+    pagination.done = done
+    while not pagination.done:
+        if budget.reached(position):
+            break
+        page_numbers = pagination.next_batch(parallel_pages, speculative_pages)
+        urls = [pagination.url(page_number) for page_number in page_numbers]
+        responses = await asyncio.gather(*(engine.run(url, fetch_search_page, url) for url in urls))
+        batch_pages, unchanged_pages = record_page_batch(pagination, state, key, page_numbers, responses)
+        for products in batch_pages:
+            add_page(products)
+        if unchanged_pages is not None:
+            for products in unchanged_pages:
+                add_page(products)
+            return category_info, pages
+    if pagination.aborted:
+        state.record_category_aborted(key)
+    elif pagination.done and not done:
+        state.record_category_done(key)
+    return category_info, pages
+
+
+def crawl_categories_async(jobs, total_rows, limit=None, state=None, deadline=None):
+    """
+    Crawl many categories at once with the asyncio engine.
+
+    Pages within a category are fetched in batches and recorded in order; categories run concurrently
+    under ``runtime.global_concurrency`` and ``runtime.per_host_concurrency`` on an
+    event loop in a background thread. Yields ``(category_info, pages)`` per
+    category in input order, so rows match the serial crawl, as soon as each
+    category and all earlier ones are finished. At most ``global_concurrency``
+    categories are crawled ahead of the caller, which bounds the pages held in
+    memory. Nothing runs caller code on the event loop, so a caller blocked on
+    a full availability queue never stalls in-flight categories. With ``limit``,
+    no further pages or categories are scheduled once the categories before
+    them hold enough products.
+
+    ``jobs`` may be a stream that blocks until its next category is known (a
+    stage-1 handoff); it is read off the event loop, and ``total_rows`` may be
+    None then. Once ``deadline`` has passed no further category is started;
+    categories already running finish.
+    """
+    jobs = iter(jobs)
+    state = CrawlState() if state is None else state
+    window = max(1, int(RUNTIME_CONFIG.get("global_concurrency", 16)))
+    finished = queue.Queue()
+    slots = asyncio.Semaphore(window)
+    budget = ProductBudget(limit=limit)
+
+    async def crawl_one(engine, position, aem_url_parts):
+        try:
+            result = await _crawl_category_async(engine, aem_url_parts, position, budget, state)
+        except BaseException as e:
+            finished.put((position, None, e))
+        else:
+            finished.put((position, result, None))
+
+    async def crawl_all(engine):
+        tasks = []
+        try:
+            for position in itertools.count():
+                await slots.acquire()
+                if budget.reached(position) or (deadline is not None and deadline.check()):
+                    break
+                job = await asyncio.to_thread(next, jobs, None)
+                if job is None:
+                    break
+                tasks.append(asyncio.create_task(crawl_one(engine, position, job[1])))
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def run_loop(loop, crawl_task):
+        try:
+            loop.run_until_complete(crawl_task)
+        except BaseException as e:
+            finished.put((None, None, e))
+        else:
+            finished.put((None, None, None))
+
+    loop = asyncio.new_event_loop()
+    yielded = 0
+    with AsyncFetchEngine(
+        global_concurrency=RUNTIME_CONFIG.get("global_concurrency", 16),
+        per_host_concurrency=RUNTIME_CONFIG.get("per_host_concurrency", 8),
+    ) as engine:
+        crawl_task = loop.create_task(crawl_all(engine))
+        thread = threading.Thread(target=run_loop, args=(loop, crawl_task), name="category-crawl", daemon=True)
+        thread.start()
+        ready = {}
+        try:
+            while True:
+                position, result, error = finished.get()
+                if error is not None:
+                    raise error
+                if position is None:
+                    break
+                ready[position] = result
+                while yielded in ready:
+                    yield ready.pop(yielded)
+                    yielded += 1
+                    loop.call_soon_threadsafe(slots.release)
+        finally:
+            # Also reached when the caller stops early: stop scheduling and wait for in-flight pages.
+            loop.call_soon_threadsafe(crawl_task.cancel)
+            thread.join()
+            loop.close()
+    logging.info(f"Collected product info for {yielded}/{yielded if total_rows is None else total_rows} categories")
+
+
+def availability_fetcher(checkpoint=None, fresh_statuses=None):
+    """
+    Return the per-SKU availability lookup.
+
+    Each status is journaled when checkpointing and collected into
+    ``fresh_statuses`` (so delta mode knows which statuses were refreshed).
+    Failed lookups ("N/A") are neither journaled nor kept as fresh, so
+    ``--resume`` and the next delta run retry them.
+    """
+    if checkpoint is None and fresh_statuses is None:
+        return fetch_single_availability
+
+    def fetch_and_record(sku_id):
+        status = fetch_single_availability(sku_id)
+        if checkpoint is not None and status != "N/A":
+            checkpoint.record_availability(sku_id, status)
+        if fresh_statuses is not None and status != "N/A":
+            fresh_statuses[sku_id] = status
+        return status
+
+    return fetch_and_record
+
+
+def start_availability_pipeline(fetch_status, known_statuses):
+    """
+    Start the availability worker pool when ``runtime.availability_mode`` is "pipeline".
+
+    Returns:
+        AvailabilityPipeline: The running pipeline, or None in "barrier" mode.
+    """
+    if RUNTIME_CONFIG.get("availability_mode", "pipeline") != "pipeline":
+        return None
+    pipeline = AvailabilityPipeline(
+        fetch_status,
+        workers=RUNTIME_CONFIG.get("availability_workers", 12),
+        queue_size=RUNTIME_CONFIG.get("availability_queue_size", 1000),
+    )
+    pipeline.preload(known_statuses)
+    return pipeline.start()
+
+
+def open_checkpoint(resume=False):
+    """
+    Open the checkpoint journal named by ``io.checkpoint_filename``.
+
+    Returns:
+        CheckpointJournal: The journal, or None when checkpointing is not configured.
+    """
+    checkpoint_filename = IO_CONFIG.get("checkpoint_filename")
+    if not checkpoint_filename:
+        if resume:
+            logging.warning("--resume ignored: io.checkpoint_filename is not configured.")
+        return None
+    return CheckpointJournal(checkpoint_filename, resume=resume)
+
+
+def open_delta_snapshot():
+    """
+    Open the previous run's snapshot when the ``delta`` section is enabled.
+
+    Returns:
+        DeltaSnapshot: The snapshot, or None for a full run.
+    """
+    if not DELTA_CONFIG.get("enabled", False):
+        return None
+    return DeltaSnapshot(
+        DELTA_CONFIG.get("snapshot_filename", "delta_snapshot.sqlite"),
+        category_max_age=DELTA_CONFIG.get("category_max_age", 7 * 86400),
+        availability_max_age=DELTA_CONFIG.get("availability_max_age", 86400),
+    )
+
+
+def open_category_stats():
+    """
+    Open the category size and change history when the ``schedule`` section is enabled.
+
+    Returns:
+        CategoryStats: The history, or None when categories are crawled in sheet order.
+    """
+    schedule_config = CONFIG.get("schedule") or {}
+    if not schedule_config.get("enabled", False):
+        return None
+    return CategoryStats(schedule_config.get("stats_filename", "category_stats.sqlite"))
+
+
+def scheduled_jobs(jobs, category_stats, streamed=False):
+    """
+    Order category jobs by the ``schedule`` section; jobs pass through unchanged without history.
+
+    Ordering needs every job up front, so ``streamed`` jobs (categories stage 1
+    is still emitting) keep their arrival order instead of waiting for stage 1
+    to finish; their sizes are still recorded for later runs.
+    """
+    if category_stats is None:
+        return jobs
+    if streamed:
+        logging.warning("Categories are streamed from stage 1; schedule ordering is skipped for this run")
+        return jobs
+    schedule_config = CONFIG.get("schedule") or {}
+    return schedule_jobs(
+        jobs,
+        category_stats.load(),
+        priorities=schedule_config.get("priorities"),
+        order=schedule_config.get("order", "lpt"),
+    )
+
+
+def run_deadline(deadline_seconds=None):
+    """A Deadline for ``deadline_seconds``, else ``schedule.deadline_seconds``; None when neither is set."""
+    if deadline_seconds is None:
+        deadline_seconds = (CONFIG.get("schedule") or {}).get("deadline_seconds")
+    return Deadline(deadline_seconds) if deadline_seconds else None
+
+
+def open_memory_budget(memory_budget_mb=None):
+    """A MemoryBudget of ``memory_budget_mb``, else ``runtime.memory_budget_mb``; None when neither is set."""
+    if memory_budget_mb is None:
+        memory_budget_mb = RUNTIME_CONFIG.get("memory_budget_mb")
+    return MemoryBudget(memory_budget_mb) if memory_budget_mb else None
+
+
+def open_store_availability():
+    """
+    Start the multi-store availability fan-out when ``store_availability`` is enabled.
+
+    Returns:
+        StoreAvailabilityFetcher: The running fetcher, or None when disabled or no stores are listed.
+    """
+    store_config = CONFIG.get("store_availability") or {}
+    if not store_config.get("enabled", False) or not store_config.get("store_ids"):
+        return None
+    return StoreAvailabilityFetcher(
+        lambda url: fetch_json_data(url),
+        API_CONFIG["availability_template"],
+        store_config["store_ids"],
+        workers=store_config.get("workers", 32),
+        queue_size=store_config.get("queue_size", 1000),
+        batch_template=API_CONFIG.get("availability_batch_template"),
+        batch_size=store_config.get("batch_size", 20),
+        batch_sku_field=store_config.get("batch_sku_field", "skuId"),
+    )
+
+
+def export_store_availability(store_fetcher):
+    """Wait for the multi-store lookups and write them in the configured layout and format."""
+    store_config = CONFIG.get("store_availability") or {}
+    with metrics.timer("store_availability"):
+        statuses = store_fetcher.close()
+    template = store_config.get("filename_template", "%Y%m%d_{brand_name}_store_availability.csv")
+    return write_store_availability(
+        statuses,
+        store_fetcher.sku_ids,
+        store_fetcher.store_ids,
+        datetime.now().strftime(template.format(brand_name=SITE_CONFIG["brand_name"])),
+        layout=store_config.get("layout", "matrix"),
+        output_format=store_config.get("output_format", "csv"),
+        chunk_size=int(IO_CONFIG.get("write_chunk_size", 10000)),
+    )
+
+
+def open_history_store():
+    """
+    Open the history store and start today's run when the ``history`` section is enabled.
+
+    Returns:
+        HistoryStore: The store, or None when history is off.
+    """
+    history_config = CONFIG.get("history") or {}
+    if not history_config.get("enabled", False):
+        return None
+    history = HistoryStore(history_config.get("path", "history.sqlite"))
+    history.start_run()
+    return history
+
+
+def chunk_observers(*observers):
+    """Combine the per-chunk callbacks that are not None into one ``on_chunk`` callback, or None."""
+    observers = [observer for observer in observers if observer is not None]
+    if not observers:
+        return None
+
+    def on_chunk(rows):
+        for observer in observers:
+            observer(rows)
+
+    return on_chunk
+
+
+def apply_availability(rows, availability_statuses):
+    """Set the translated "Availability Status" of each row in place."""
+    if isinstance(availability_statuses, DiskDict):
+        # Spilled statuses are read once per chunk instead of twice per row.
+        availability_statuses = availability_statuses.lookup(row.get("singleSKUCatalogEntryID") for row in rows)
+    for product in rows:
+        sku_id = product.get("singleSKUCatalogEntryID", None)
+        if sku_id and sku_id in availability_statuses:
+            english_status = availability_statuses[sku_id]
+            greek_status = AVAILABILITY_TRANSLATION.get(english_status, english_status)
+            product["Availability Status"] = greek_status
+        else:
+            product["Availability Status"] = "N/A"
+
+
+CATEGORY_COLUMNS = ["Category_ID_number", "Category_Title", "Category_URL"]
+
+
+def build_output_frame(records, availability_statuses):
+    """
+    Build the export table of crawled records in one columnar pass.
+
+    Category columns and the Level 1-3 split are computed once per distinct
+    category with pandas string operations and expanded to rows as categoricals.
+    The availability join and translation are vectorised maps. The result holds
+    the same values as apply_availability on ``record.as_row()`` rows, in
+    OUTPUT_COLUMNS order, with missing levels as NaN instead of None.
+
+    Parameters:
+        records (list): ProductRecord objects in export order.
+        availability_statuses (dict): SKU ID to English availability status.
+
+    Returns:
+        pandas.DataFrame: The export table.
+    """
+    category_positions = {}
+    categories = []
+    codes = np.empty(len(records), dtype=np.int64)
+    for row_number, record in enumerate(records):
+        position = category_positions.get(id(record.category))
+        if position is None:
+            position = category_positions[id(record.category)] = len(categories)
+            categories.append(record.category)
+        codes[row_number] = position
+
+    def expand(values):
+        distinct = pd.Categorical(values)
+        return pd.Categorical.from_codes(distinct.codes[codes], categories=distinct.categories)
+
+    columns = {key: expand([category[key] for category in categories]) for key in CATEGORY_COLUMNS}
+    levels = pd.Series([category["Category_URL"] for category in categories], dtype=object)
+    levels = levels.str.strip("/").str.split("/", expand=True)
+    for level_number, level_key in enumerate(LEVEL_KEYS):
+        level_values = levels[level_number] if level_number in levels else pd.Series([None] * len(categories))
+        columns[level_key] = expand(level_values.tolist())
+    for key in PRODUCT_RECORD_KEYS:
+        columns[key] = list(map(attrgetter(key), records))
+    frame = pd.DataFrame(columns)
+
+    sku_ids = frame["singleSKUCatalogEntryID"]
+    english_statuses = sku_ids.map(availability_statuses)
+    translation = {
+        status: AVAILABILITY_TRANSLATION.get(status, status) for status in english_statuses.dropna().unique()
+    }
+    found = sku_ids.astype(bool) & english_statuses.notna()
+    frame["Availability Status"] = english_statuses.map(translation).where(found, "N/A").astype("category")
+    return frame[OUTPUT_COLUMNS]
+
+
+def iter_frame_rows(frame, chunk_size):
+    """Yield the rows of an export table as chunks of dicts, with NaN as None, for per-chunk observers."""
+    for start in range(0, len(frame), chunk_size):
+        chunk = frame.iloc[start:start + chunk_size].astype(object)
+        yield chunk.where(chunk.notna(), None).to_dict("records")
+
+
+def export_rows(chunks, availability_statuses, file_name, columns=OUTPUT_COLUMNS, on_chunk=None, stream_excel=False):
+    """
+    Write chunks of rows, through the availability join, in the configured output format.
+
+    Excel output collects every row for a single save_to_excel, unless
+    ``stream_excel`` writes it chunk by chunk through an ExcelSink; the
+    streaming formats write each chunk as it comes. Pass
+    ``availability_statuses=None`` for tables without an availability column.
+    ``on_chunk`` is called with every finished chunk of rows.
+
+    Returns:
+        str: Path of the written export.
+    """
+    output_format = IO_CONFIG.get("output_format", "excel")
+    if output_format == "excel" and not stream_excel:
+        rows = []
+        for chunk in chunks:
+            if availability_statuses is not None:
+                apply_availability(chunk, availability_statuses)
+            rows.extend(chunk)
+        save_to_excel(rows, file_name)
+        if on_chunk is not None:
+            on_chunk(rows)
+        return file_name
+
+    path = output_path(file_name, output_format)
+    sink = ExcelSink(path, columns) if output_format == "excel" else open_sink(output_format, path, columns)
+    try:
+        for chunk in chunks:
+            if availability_statuses is not None:
+                apply_availability(chunk, availability_statuses)
+            with metrics.timer("output_write"):
+                sink.write_rows(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+    finally:
+        sink.close()
+    logging.info(f"Data saved to {path}")
+    if output_format != "excel" and IO_CONFIG.get("convert_to_excel", False):
+        convert_to_excel(path, output_format, output_path(file_name, "excel"))
+    return path
+
+
+def export_spooled_rows(spool, availability_statuses, file_name, on_chunk=None):
+    """Stream spooled rows through the availability join into the configured sink, Excel included."""
+    chunk_size = int(IO_CONFIG.get("write_chunk_size", 10000))
+    return export_rows(
+        spool.iter_chunks(chunk_size), availability_statuses, file_name, on_chunk=on_chunk, stream_excel=True
+    )
+
+
+def export_product_index(product_index, availability_statuses, file_name, on_chunk=None, stream_excel=False):
+    """
+    Write the indexed products in the layout chosen by ``io.product_index``.
+
+    "denormalized" rebuilds the usual one-row-per-listing export. "normalized"
+    writes ``<name>_products`` with one row per product and ``<name>_product_categories``
+    with one row per product/category pair; ``on_chunk`` only sees product rows.
+    ``stream_excel`` is passed on to export_rows.
+    """
+    chunk_size = int(IO_CONFIG.get("write_chunk_size", 10000))
+    logging.info(
+        f"Product index holds {len(product_index.products)} products "
+        f"for {len(product_index.memberships)} listings"
+    )
+    if IO_CONFIG.get("product_index") != "normalized":
+        rows = (build_row(fields, product_info) for fields, product_info in product_index.iter_listings())
+        export_rows(
+            chunked(rows, chunk_size), availability_statuses, file_name, on_chunk=on_chunk, stream_excel=stream_excel
+        )
+        return
+
+    path = Path(file_name)
+    products = (product_info.product_fields() for product_info in product_index.iter_products())
+    export_rows(
+        chunked(products, chunk_size),
+        availability_statuses,
+        str(path.with_name(f"{path.stem}_products{path.suffix}")),
+        columns=PRODUCT_COLUMNS,
+        on_chunk=on_chunk,
+        stream_excel=stream_excel,
+    )
+    memberships = (
+        {"uniqueID": product_info["uniqueID"], **fields} for product_info, fields in product_index.iter_memberships()
+    )
+    export_rows(
+        chunked(memberships, chunk_size),
+        None,
+        str(path.with_name(f"{path.stem}_product_categories{path.suffix}")),
+        columns=PRODUCT_CATEGORY_COLUMNS,
+        stream_excel=stream_excel,
+    )
+
+
+def main(limit=None, resume=False, categories=None, deadline_seconds=None, memory_budget_mb=None):
+    """
+    Run stage 2.
+
+    Parameters:
+        limit (int): Stop after roughly this many products.
+        resume (bool): Skip work recorded in the checkpoint journal and merge it into the export.
+        categories (iterable): Stage-1 category rows to crawl instead of read_category_rows(),
+            e.g. a handoff that stage 1 is still filling.
+        deadline_seconds (float): Stop starting categories after this many seconds and export
+            what was crawled; overrides ``schedule.deadline_seconds``.
+        memory_budget_mb (float): Spill rows, SKU sets and statuses to disk once the RSS reaches
+            this many MB; overrides ``runtime.memory_budget_mb``.
+    """
+    ensure_configured()
+    deadline = run_deadline(deadline_seconds)
+    memory = open_memory_budget(memory_budget_mb)
     all_data = []
+    availability_pipeline = None
+    category_results = None
+    category_stats = None
+    checkpoint = None
+    delta = None
+    history = None
+    product_index = None
+    spill = None
+    spool = None
+    store_fetcher = None
     try:
-        # Read Excel file into a DataFrame
-        df = pd.read_excel(IO_CONFIG["menu_excel_filename"], sheet_name=IO_CONFIG["menu_sheet_name"])
-        total_rows = len(df)
+        df = read_category_rows() if categories is None else categories
+        total_rows = len(df) if hasattr(df, "__len__") else None
+
+        output_template = IO_CONFIG["output_filename_template"].format(brand_name=SITE_CONFIG["brand_name"])
+        file_name = datetime.now().strftime(output_template)
+        if IO_CONFIG.get("product_index") in ("denormalized", "normalized"):
+            # Shared products are parsed once; rows are rebuilt from the index at write time.
+            product_index = ProductIndex()
+        elif IO_CONFIG.get("output_format", "excel") != "excel":
+            # Rows go to disk as pages are parsed; only the availability join waits for the crawl.
+            spool = RowSpool(f"{file_name}.rows.jsonl")
 
         single_sku_ids = []
         product_count = 0
+        checkpoint = open_checkpoint(resume)
+        delta = open_delta_snapshot()
+        known_statuses = dict(checkpoint.statuses) if checkpoint is not None else {}
+        fresh_statuses = {} if delta is not None else None
+        fetch_status = availability_fetcher(checkpoint, fresh_statuses)
+        availability_pipeline = start_availability_pipeline(fetch_status, known_statuses)
+        store_fetcher = open_store_availability()
 
-        for index, row in enumerate(df.itertuples()):
-            if limit is not None and product_count >= limit:
-                break
+        def collect_sku_ids(products):
+            if store_fetcher is not None:
+                store_fetcher.submit_many(extract_sku_ids(products))
+            if delta is not None:
+                reusable_statuses, sku_ids = delta.reusable_statuses(products)
+                known_statuses.update(reusable_statuses)
+                if availability_pipeline is not None:
+                    availability_pipeline.preload(reusable_statuses)
+            else:
+                sku_ids = extract_sku_ids(products)
+            if availability_pipeline is not None:
+                availability_pipeline.submit_many(sku_ids)
+            elif spill is not None:
+                single_sku_ids.update(sku_ids)
+            else:
+                single_sku_ids.extend(sku_ids)
 
-            aem_url = getattr(row, "AEM_URL", None)
-            if not isinstance(aem_url, str) or not aem_url.strip():
-                logging.warning(f"Skipping row {index + 1}/{total_rows}: missing AEM_URL")
-                continue
-            aem_url_parts = [part for part in aem_url.split("/") if part][-3:]
-            if not aem_url_parts:
-                logging.warning(f"Skipping row {index + 1}/{total_rows}: invalid AEM_URL '{aem_url}'")
-                continue
+        def spill_to_disk():
+            # Rows go to a spool file and SKU sets and statuses to SQLite; the export then streams from disk.
+            nonlocal all_data, known_statuses, single_sku_ids, spill, spool
+            spill = SpillStore(RUNTIME_CONFIG.get("spill_dir"))
+            statuses = spill.dict("statuses")
+            statuses.update(known_statuses)
+            known_statuses = statuses
+            if availability_pipeline is not None:
+                availability_pipeline.spill(spill.set("submitted_sku_ids"), statuses)
+            else:
+                spilled_sku_ids = spill.set("sku_ids")
+                spilled_sku_ids.update(single_sku_ids)
+                single_sku_ids = spilled_sku_ids
+            if store_fetcher is not None:
+                store_fetcher.spill(spill.set("store_sku_ids"), spill.dict("store_statuses", tuple_keys=True))
+            if spool is None and product_index is None:
+                spool = RowSpool(f"{file_name}.rows.jsonl")
+                spool.write_rows([record.as_row() for record in all_data])
+                all_data = []
+            logging.info(f"Spilled SKU sets and statuses to {spill.path}")
 
-            additional_info = fetch_additional_info(aem_url_parts)
+        category_stats = open_category_stats()
+        jobs = scheduled_jobs(iter_category_jobs(df), category_stats, streamed=total_rows is None)
+        state = CrawlState(checkpoint=checkpoint, delta=delta, stats=category_stats)
+        if RUNTIME_CONFIG.get("crawl_engine", "serial") == "async":
+            category_results = crawl_categories_async(jobs, total_rows, limit=limit, state=state, deadline=deadline)
+        else:
+            category_results = crawl_categories_serial(jobs, total_rows, state=state, deadline=deadline)
 
-            logging.info(f"Collecting product info {index + 1}/{total_rows}")
+        link_prefix = product_link_prefix()
 
-            category_info = {
-                "Category_ID_number": additional_info.get("categoryId", "N/A"),
-                "Category_Title": additional_info.get("title", "N/A"),
-                "Category_URL": additional_info.get("remoteSPAUrl", "N/A"),
-            }
+        def parse_indexed_product(product):
+            return parse_product_record(product, link_prefix=link_prefix)
 
-            page_number = 1
-            consecutive_page_failures = 0
-            max_consecutive_page_failures = 3
-            while True:
+        for category_info, pages in category_results:
+            # Category-level fields are computed once and shared by reference by the category's records.
+            shared_fields = category_fields(category_info)
+            if product_index is not None:
+                category_position = product_index.add_category(shared_fields)
+            for products in pages:
+                with metrics.timer("row_parsing"):
+                    if product_index is not None:
+                        product_index.add_products(products, category_position, parse_indexed_product)
+                    else:
+                        records = parse_category_records(products, shared_fields)
+                if spool is not None:
+                    spool.write_rows([record.as_row() for record in records])
+                elif product_index is None:
+                    all_data.extend(records)
+                collect_sku_ids(products)
+                if memory is not None and spill is None and memory.check():
+                    spill_to_disk()
+                product_count += len(products)
                 if limit is not None and product_count >= limit:
                     break
+            if limit is not None and product_count >= limit:
+                break
+        category_results.close()
 
-                specific_url = API_CONFIG["category_search_template"].format(
-                    store_id=API_CONFIG["store_id"],
-                    category_slug=aem_url_parts[-1],
-                    page_number=page_number,
-                    page_size=API_CONFIG["page_size"],
-                    catalog_id=API_CONFIG["catalog_id"],
-                    currency=API_CONFIG["currency"],
-                    lang_id=API_CONFIG["lang_id"],
-                    order_by=API_CONFIG["order_by"],
-                )
-                data = fetch_json_data(specific_url)
-                if data is None:
-                    consecutive_page_failures += 1
-                    logging.warning(
-                        f"Failed to fetch category page {page_number} for '{aem_url_parts[-1]}' "
-                        f"({consecutive_page_failures}/{max_consecutive_page_failures})"
-                    )
-                    if consecutive_page_failures >= max_consecutive_page_failures:
-                        logging.error(
-                            f"Stopping category '{aem_url_parts[-1]}' after repeated page fetch failures."
-                        )
-                        break
-                    page_number += 1
-                    continue
-
-                consecutive_page_failures = 0
-                if not data.get("catalogEntryView", []):
-                    break
+        if availability_pipeline is not None:
+            logging.info("Waiting for in-flight availability lookups...")
+            availability_statuses = availability_pipeline.close()
+        elif spill is not None:
+            logging.info("Gathering availability statuses...")
+            # The spilled SKU set is already deduplicated; SKUs with known statuses are dropped on disk.
+            single_sku_ids.difference_update(known_statuses)
+            availability_statuses = fetch_availability_statuses(
+                single_sku_ids, fetch_status=fetch_status, statuses=known_statuses, unique=True
+            )
+        else:
+            logging.info("Gathering availability statuses...")
+            availability_statuses = fetch_availability_statuses(
+                [sku_id for sku_id in single_sku_ids if sku_id not in known_statuses],
+                fetch_status=fetch_status,
+            )
+            availability_statuses.update(known_statuses)
 
-                for product in data["catalogEntryView"]:
-                    product_info = category_info.copy()
-                    keys_to_extract = [
-                        "uniqueID",
-                        "singleSKUCatalogEntryID",
-                        "partNumber",
-                        "shortDescription",
-                        "name",
-                        "manufacturer",
-                        "buyable",
-                    ]
-                    for key in keys_to_extract:
-                        product_info[key] = product.get(key, "N/A")
-
-                    # Splitting the Category_URL and extracting the levels
-                    category_levels = product_info["Category_URL"].strip("/").split("/")
-                    level_keys = ["Level 1", "Level 2", "Level 3"]
-                    for i, level_key in enumerate(level_keys):
-                        product_info[level_key] = category_levels[i] if i < len(category_levels) else None
-
-                    user_data = product.get("UserData")
-                    user_data_first = user_data[0] if isinstance(user_data, list) and user_data else {}
-                    if not isinstance(user_data_first, dict):
-                        user_data_first = {}
-
-                    seo_url = user_data_first.get("seo_url", "N/A")
-                    if isinstance(seo_url, str):
-                        product_info["Link"] = f"{SITE_CONFIG['web_base_url'].rstrip('/')}/{seo_url.lstrip('/')}"
-                    else:
-                        product_info["Link"] = "N/A"
-
-                    # Extracting price information
-                    prices = product.get("price", [])
-                    original_price, current_price = "N/A", "N/A"  # Default values
-                    for price in prices:
-                        if price.get("usage") == "Display":
-                            original_price = price.get("value", "N/A")  # Interpreted as the old price
-                        elif price.get("usage") == "Offer":
-                            current_price = price.get("value", "N/A")  # Interpreted as the new price
-
-                    product_info["Original_Price"] = original_price
-                    product_info["Current_Price"] = current_price
-
-                    sku_id = product.get("singleSKUCatalogEntryID", None)
-                    if sku_id is not None:
-                        single_sku_ids.append(sku_id)
-
-                    all_data.append(product_info)
-                    product_count += 1
-
-                page_number += 1
-
-        logging.info("Gathering availability statuses...")
-        availability_statuses = fetch_availability_statuses(single_sku_ids)
-
-        availability_translation = {
-            "EXHAUSTED": "Εξαντλημένο",
-            "EXPECTED_SOON": "Αναμένεται Σύντομα",
-            "IMMEDIATELY_AVAILABLE": "Άμεσα διαθέσιμο",
-            "LAST_PIECES": "Τελευταία τεμάχια",
-            "N/A": "N/A",
-            "NOT_AVAILABLE": "Μη διαθέσιμο",
-            "ON_ORDER": "Σε παραγγελία",
-            "Preorderable": "Διαθέσιμο για προπαραγγελία",
-            "SPECIAL_ORDER": "Ειδική Παραγγελία",
-            "": "",  # for any blank values
-        }
-
-        for product in all_data:
-            sku_id = product.get("singleSKUCatalogEntryID", None)
-            if sku_id and sku_id in availability_statuses:
-                english_status = availability_statuses[sku_id]
-                greek_status = availability_translation.get(english_status, english_status)
-                product["Availability Status"] = greek_status
+        history = open_history_store()
+        on_chunk = chunk_observers(
+            delta.observe_rows if delta is not None else None,
+            history.ingest_rows if history is not None else None,
+        )
+        if product_index is not None:
+            export_product_index(
+                product_index, availability_statuses, file_name, on_chunk=on_chunk, stream_excel=spill is not None
+            )
+        elif spool is not None:
+            export_spooled_rows(spool, availability_statuses, file_name, on_chunk=on_chunk)
+            spool.close(remove=True)
+        elif IO_CONFIG.get("postprocess", "rows") == "columnar":
+            frame = build_output_frame(all_data, availability_statuses)
+            save_to_excel(frame, file_name)
+            if on_chunk is not None:
+                for chunk in iter_frame_rows(frame, int(IO_CONFIG.get("write_chunk_size", 10000))):
+                    on_chunk(chunk)
+        else:
+            all_data = [record.as_row() for record in all_data]
+            apply_availability(all_data, availability_statuses)
+            save_to_excel(all_data, file_name)
+            if on_chunk is not None:
+                on_chunk(all_data)
+        if store_fetcher is not None:
+            export_store_availability(store_fetcher)
+        stopped_early = deadline is not None and deadline.reached
+        if delta is not None:
+            delta.record_statuses(fresh_statuses)
+            if stopped_early:
+                # Categories that were never started would be reported as removed.
+                logging.warning("Delta snapshot and change report are not updated for a run stopped by its deadline")
             else:
-                product["Availability Status"] = "N/A"
-
-        output_template = IO_CONFIG["output_filename_template"].format(brand_name=SITE_CONFIG["brand_name"])
-        file_name = datetime.now().strftime(output_template)
-        save_to_excel(all_data, file_name)
+                report_template = DELTA_CONFIG.get("change_report_template", "%Y%m%d_{brand_name}_changes.csv")
+                delta.finish(datetime.now().strftime(report_template.format(brand_name=SITE_CONFIG["brand_name"])))
+            delta.close()
+        if category_stats is not None:
+            category_stats.close()
+        if history is not None:
+            history.finish_run()
+            history.close()
+        if spill is not None:
+            spill.close()
+        rate_limiter.log_summary()
+        response_cache.log_summary()
+        memory_summary = memory_budget.summary(memory)
+        logging.info(f"Peak RSS: {memory_summary['peak_rss_mb']:g} MB")
+        metrics.write_reports({"rate_limits": rate_limiter.summary(), "memory": memory_summary})
+        if checkpoint is not None:
+            checkpoint.close(remove=not stopped_early)
+            if stopped_early:
+                logging.warning("Run stopped by its deadline; run with --resume to crawl the remaining categories")
 
     except Exception as e:
         logging.error(f"An error occurred: {e}")
+        if category_results is not None:
+            category_results.close()
+        if availability_pipeline is not None:
+            availability_pipeline.cancel()
+        if store_fetcher is not None:
+            store_fetcher.cancel()
+        if checkpoint is not None:
+            checkpoint.close()
+        if delta is not None:
+            delta.close()
+        if category_stats is not None:
+            category_stats.close()
+        if history is not None:
+            history.close()
+        if spill is not None:
+            spill.close()
+        if spool is not None:
+            spool.close()
+            logging.error(f"{spool.row_count} parsed rows were kept in {spool.path}")
+        if product_index is not None:
+            all_data = [build_row(fields, product_info) for fields, product_info in product_index.iter_listings()]
+        else:
+            all_data = [record.as_row() if isinstance(record, ProductRecord) else record for record in all_data]
         if all_data:
             save_to_excel(all_data, IO_CONFIG["crash_save_filename"])
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--config", default=None, help="Config file; defaults to config.yaml next to this module.")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after roughly this many products.")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip work recorded in the checkpoint journal and merge it into the export.",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        help="Seconds after which no further categories are started; what was crawled is exported.",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=float,
+        default=None,
+        metavar="MB",
+        help="Spill rows, SKU sets and statuses to disk once the process RSS reaches this many MB.",
+    )
+    return parser.parse_args(argv)
+
+
+def run_cli(argv=None):
+    args = parse_args(argv)
+    if args.config:
+        configure_from_file(args.config)
+    main(limit=args.limit, resume=args.resume, deadline_seconds=args.deadline, memory_budget_mb=args.memory_budget)
+
+
 if __name__ == "__main__":
-    main(limit=None)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    run_cli()
@@ -0,0 +1,73 @@
+"""In-run product index: products listed under several categories are parsed and stored once."""
+
+
+class ProductIndex:
+    """
+    Products keyed by ``uniqueID`` with their category memberships.
+
+    Each product's fields are parsed and stored once, however many categories
+    list it; every listing only adds a ``(product key, category position)``
+    membership. Memberships are kept in crawl order, so the one-row-per-listing
+    layout can be rebuilt exactly at write time.
+
+    A product seen again keeps the fields parsed at its first listing.
+    Products without a ``uniqueID`` are never merged.
+    """
+
+    def __init__(self):
+        self.categories = []
+        self.products = {}
+        self.memberships = []
+        self._anonymous_products = 0
+
+    def add_category(self, fields):
+        """
+        Store the category-level fields shared by every product of a category.
+
+        Returns:
+            int: Position of the category, passed back to add_products.
+        """
+        self.categories.append(fields)
+        return len(self.categories) - 1
+
+    def add_products(self, products, category_position, parse_product):
+        """
+        Index the raw products of one search page.
+
+        Parameters:
+            products (list): The ``catalogEntryView`` entries of a search page.
+            category_position (int): Value returned by add_category.
+            parse_product (callable): Turns one raw product into its product-level fields;
+                only called for products not indexed yet.
+        """
+        for product in products:
+            key = product.get("uniqueID")
+            if key is None:
+                self._anonymous_products += 1
+                key = ("anonymous", self._anonymous_products)
+            if key not in self.products:
+                self.products[key] = parse_product(product)
+            self.memberships.append((key, category_position))
+
+    @property
+    def duplicate_listings(self):
+        """Listings that reused an already indexed product."""
+        return len(self.memberships) - len(self.products)
+
+    def iter_listings(self):
+        """Yield ``(category fields, product fields)`` for every listing, in crawl order."""
+        for key, category_position in self.memberships:
+            yield self.categories[category_position], self.products[key]
+
+    def iter_products(self):
+        """Yield the fields of each distinct product, in first-seen order."""
+        yield from self.products.values()
+
+    def iter_memberships(self):
+        """Yield ``(product fields, category fields)`` for every distinct product/category pair."""
+        seen = set()
+        for key, category_position in self.memberships:
+            if (key, category_position) in seen:
+                continue
+            seen.add((key, category_position))
+            yield self.products[key], self.categories[category_position]
@@ -0,0 +1,377 @@
+"""Adaptive request pacing: token buckets with AIMD concurrency per endpoint class, backoff and circuit breakers."""
+
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import logging
+import random
+import threading
+import time
+
+
+DEFAULT_RATE_LIMIT = {
+    "enabled": True,
+    "initial_rate": 20.0,  # requests per second
+    "min_rate": 1.0,
+    "max_rate": 100.0,
+    "burst": 20,
+    "additive_increase": 1.0,  # requests per second gained per second of clean responses
+    "decrease_factor": 0.5,
+    "initial_concurrency": 8,
+    "min_concurrency": 1,
+    "max_concurrency": 32,
+    "backoff_base": 0.5,
+    "backoff_cap": 30.0,
+}
+
+DEFAULT_CIRCUIT_BREAKER = {
+    "failure_threshold": 5,
+    "reset_timeout": 30.0,
+}
+
+THROTTLE_STATUS_CODES = (429, 503)
+
+_config = {"rate_limit": dict(DEFAULT_RATE_LIMIT), "endpoints": {}, "circuit_breaker": dict(DEFAULT_CIRCUIT_BREAKER)}
+_limiters = {}
+_breakers = {}
+_registry_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Parameters:
+        rate (float): Tokens added per second.
+        burst (int): Maximum number of stored tokens.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+    def pause_for(self, seconds):
+        """Hold every caller back for ``seconds``, e.g. to honour a Retry-After header."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        return
+                    wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit adjusted with additive-increase / multiplicative-decrease.
+
+    Parameters:
+        initial (int): Starting number of requests allowed in flight.
+        minimum (int): Lower bound for the limit.
+        maximum (int): Upper bound for the limit.
+        decrease_factor (float): Multiplier applied to the limit on throttling.
+    """
+
+    def __init__(self, initial, minimum, maximum, decrease_factor=0.5):
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum))
+        self.limit = float(min(max(int(initial), self.minimum), self.maximum))
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def on_success(self):
+        with self._condition:
+            # Grows by roughly one slot per window of successful requests.
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    def on_throttle(self):
+        with self._condition:
+            self.limit = max(self.minimum, self.limit * self.decrease_factor)
+
+
+class EndpointLimiter:
+    """
+    Rate and concurrency limiter for one endpoint class (e.g. model, search, availability).
+
+    Parameters:
+        name (str): The endpoint class name.
+        settings (dict): Merged ``rate_limit`` settings for this endpoint class.
+    """
+
+    def __init__(self, name, settings):
+        self.name = name
+        self.settings = settings
+        self.enabled = bool(settings["enabled"])
+        self.bucket = TokenBucket(settings["initial_rate"], settings["burst"])
+        self.concurrency = AdaptiveConcurrency(
+            settings["initial_concurrency"],
+            settings["min_concurrency"],
+            settings["max_concurrency"],
+            settings["decrease_factor"],
+        )
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self):
+        """Wait for a token and a concurrency slot for the duration of one request."""
+        if not self.enabled:
+            with self._lock:
+                self.requests += 1
+            yield
+            return
+        self.concurrency.acquire()
+        try:
+            self.bucket.acquire()
+            with self._lock:
+                self.requests += 1
+            yield
+        finally:
+            self.concurrency.release()
+
+    def on_success(self):
+        if not self.enabled:
+            return
+        rate = self.bucket.rate
+        self.bucket.set_rate(min(self.settings["max_rate"], rate + self.settings["additive_increase"] / rate))
+        self.concurrency.on_success()
+
+    def on_throttle(self, retry_after=None):
+        with self._lock:
+            self.throttled += 1
+        if not self.enabled:
+            return
+        self.bucket.set_rate(max(self.settings["min_rate"], self.bucket.rate * self.settings["decrease_factor"]))
+        self.concurrency.on_throttle()
+        if retry_after:
+            self.bucket.pause_for(retry_after)
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """
+        Jittered exponential backoff before retry ``attempt + 1``.
+
+        Parameters:
+            attempt (int): 1-based number of the attempt that just failed.
+            retry_after (float): Server-requested delay in seconds, if any.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        ceiling = min(self.settings["backoff_cap"], self.settings["backoff_base"] * 2 ** (attempt - 1))
+        delay = random.uniform(0, ceiling)
+        if retry_after:
+            delay = max(delay, min(retry_after, self.settings["backoff_cap"]))
+        return delay
+
+    def summary(self):
+        return {
+            "endpoint": self.name,
+            "rate_per_second": round(self.bucket.rate, 2),
+            "concurrency_limit": int(self.concurrency.limit),
+            "requests": self.requests,
+            "throttled": self.throttled,
+        }
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    requests to the host wait for ``reset_timeout`` seconds; then a single
+    trial request is let through and its outcome closes or re-opens the
+    circuit. Waiting instead of failing fast keeps a short outage from using up
+    the retries of every request made meanwhile.
+    """
+
+    def __init__(self, host, failure_threshold, reset_timeout):
+        self.host = host
+        self.failure_threshold = int(failure_threshold)
+        self.reset_timeout = float(reset_timeout)
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self._opened_at = 0.0
+        self._trial_started = 0.0
+        self._failed_trials = 0
+        self._condition = threading.Condition()
+
+    def allow(self, timeout=None):
+        """
+        Wait until a request may be sent to the host.
+
+        A closed circuit lets requests through at once. While it is open, callers
+        block until ``reset_timeout`` has passed; one of them then gets the
+        half-open trial and the others wait for its outcome. A trial that does
+        not report back within ``reset_timeout`` is replaced by a new one.
+
+        Parameters:
+            timeout (float): Longest wait in seconds; None waits as long as needed.
+
+        Returns:
+            bool: True when the request may go ahead; False when a trial failed
+                while the caller was waiting (the outage goes on, so the caller
+                counts the wait as a failed attempt) or ``timeout`` ran out.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            failed_trials = self._failed_trials
+            while True:
+                if self.state == "closed":
+                    return True
+                if self._failed_trials != failed_trials:
+                    return False
+                now = time.monotonic()
+                started = self._opened_at if self.state == "open" else self._trial_started
+                wait = started + self.reset_timeout - now
+                if wait <= 0:
+                    self.state = "half_open"
+                    self._trial_started = now
+                    return True
+                if deadline is not None:
+                    if deadline <= now:
+                        return False
+                    wait = min(wait, deadline - now)
+                self._condition.wait(wait)
+
+    def record_success(self):
+        with self._condition:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._condition.notify_all()
+
+    def record_failure(self):
+        with self._condition:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                if self.state == "half_open":
+                    self._failed_trials += 1
+                if self.state != "open":
+                    self.times_opened += 1
+                    logging.warning(f"Circuit opened for host {self.host} after {self.consecutive_failures} failures")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._condition.notify_all()
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header value.
+
+    Parameters:
+        value (str): Either delay-seconds or an HTTP date.
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or malformed.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def configure(runtime_config):
+    """
+    Apply the ``runtime.rate_limit`` and ``runtime.circuit_breaker`` sections and reset all state.
+
+    ``rate_limit.endpoints`` may hold per-endpoint-class overrides, e.g.
+    ``{"availability": {"initial_rate": 5}}``.
+    """
+    rate_limit = dict(runtime_config.get("rate_limit") or {})
+    endpoints = rate_limit.pop("endpoints", None) or {}
+    circuit_breaker = runtime_config.get("circuit_breaker") or {}
+    with _registry_lock:
+        _config["rate_limit"] = {**DEFAULT_RATE_LIMIT, **rate_limit}
+        _config["endpoints"] = endpoints
+        _config["circuit_breaker"] = {**DEFAULT_CIRCUIT_BREAKER, **circuit_breaker}
+        _limiters.clear()
+        _breakers.clear()
+
+
+def get_limiter(endpoint):
+    """Return the limiter for an endpoint class, creating it on first use."""
+    with _registry_lock:
+        if endpoint not in _limiters:
+            settings = {**_config["rate_limit"], **(_config["endpoints"].get(endpoint) or {})}
+            _limiters[endpoint] = EndpointLimiter(endpoint, settings)
+        return _limiters[endpoint]
+
+
+def get_breaker(host):
+    """Return the circuit breaker for a host, creating it on first use."""
+    with _registry_lock:
+        if host not in _breakers:
+            settings = _config["circuit_breaker"]
+            _breakers[host] = CircuitBreaker(host, settings["failure_threshold"], settings["reset_timeout"])
+        return _breakers[host]
+
+
+def summary():
+    """Return the settled rate and concurrency of every endpoint class used so far."""
+    with _registry_lock:
+        limiters = list(_limiters.values())
+        breakers = list(_breakers.values())
+    return {
+        "endpoints": [limiter.summary() for limiter in limiters],
+        "circuits": [
+            {"host": breaker.host, "state": breaker.state, "times_opened": breaker.times_opened}
+            for breaker in breakers
+        ],
+    }
+
+
+def log_summary():
+    """Log the rate each endpoint class settled on during the run."""
+    for endpoint in summary()["endpoints"]:
+        logging.info(
+            f"Endpoint '{endpoint['endpoint']}' settled at {endpoint['rate_per_second']} req/s, "
+            f"concurrency {endpoint['concurrency_limit']} "
+            f"({endpoint['requests']} requests, {endpoint['throttled']} throttled)"
+        )
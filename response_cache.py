@@ -0,0 +1,164 @@
+"""On-disk HTTP response cache with TTL, LRU size eviction and ETag/Last-Modified revalidation."""
+
+from collections import namedtuple
+import logging
+import sqlite3
+import threading
+import time
+
+
+CacheEntry = namedtuple("CacheEntry", ["url", "body", "etag", "last_modified", "stored_at"])
+
+_cache = None
+_cache_settings = {}
+_endpoint_ttls = {}
+_configure_lock = threading.Lock()
+
+
+class ResponseCache:
+    """
+    SQLite-backed response cache keyed by URL.
+
+    Entries are evicted least-recently-used first once the stored bodies
+    exceed ``max_bytes``.
+
+    Parameters:
+        path (str): SQLite database file.
+        max_bytes (int): Total body size kept before evicting.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = str(path)
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " url TEXT PRIMARY KEY,"
+            " body BLOB NOT NULL,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " stored_at REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " size INTEGER NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._connection.commit()
+
+    def get(self, url):
+        """Return the cached entry for ``url`` and mark it as recently used, or None."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT url, body, etag, last_modified, stored_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute("UPDATE responses SET last_used = ? WHERE url = ?", (time.time(), url))
+            self._connection.commit()
+        return CacheEntry(*row)
+
+    def put(self, url, body, etag=None, last_modified=None):
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (url, body, etag, last_modified, stored_at, last_used, size)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, body, etag, last_modified, now, now, len(body)),
+            )
+            self._evict()
+            self._connection.commit()
+
+    def refresh(self, url):
+        """Restart the TTL of an entry the server confirmed unchanged (HTTP 304)."""
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "UPDATE responses SET stored_at = ?, last_used = ? WHERE url = ?", (now, now, url)
+            )
+            self._connection.commit()
+
+    def _evict(self):
+        total_size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+        for url, size in self._connection.execute(
+            "SELECT url, size FROM responses ORDER BY last_used ASC"
+        ).fetchall():
+            if total_size <= self.max_bytes:
+                break
+            self._connection.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total_size -= size
+
+    def record(self, outcome):
+        """Count a lookup outcome: "hits", "revalidated" or "misses"."""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def configure(runtime_config):
+    """
+    Apply the ``runtime.response_cache`` section.
+
+    Only endpoint classes listed under ``response_cache.endpoints`` are cached,
+    each with its own ``ttl`` in seconds.
+    """
+    global _cache
+    with _configure_lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
+        _endpoint_ttls.clear()
+        _cache_settings.clear()
+        cache_config = runtime_config.get("response_cache") or {}
+        endpoints = cache_config.get("endpoints") or {}
+        if not cache_config.get("path") or not endpoints:
+            return
+        for endpoint, settings in endpoints.items():
+            _endpoint_ttls[endpoint] = float((settings or {}).get("ttl", 86400))
+        _cache_settings["path"] = cache_config["path"]
+        _cache_settings["max_bytes"] = float(cache_config.get("max_size_mb", 200)) * 1024 * 1024
+
+
+def cache_for(endpoint):
+    """
+    Return the cache and TTL for an endpoint class.
+
+    Returns:
+        tuple: (ResponseCache, ttl in seconds), or (None, None) if the endpoint has not opted in.
+    """
+    global _cache
+    if endpoint not in _endpoint_ttls:
+        return None, None
+    if _cache is None:
+        # Opened on first use so importing a configured module never touches the disk.
+        with _configure_lock:
+            if _cache is None:
+                _cache = ResponseCache(_cache_settings["path"], _cache_settings["max_bytes"])
+    return _cache, _endpoint_ttls[endpoint]
+
+
+def conditional_headers(entry):
+    """Build If-None-Match / If-Modified-Since headers from a cached entry."""
+    headers = {}
+    if entry is None:
+        return headers
+    if entry.etag:
+        headers["If-None-Match"] = entry.etag
+    if entry.last_modified:
+        headers["If-Modified-Since"] = entry.last_modified
+    return headers
+
+
+def log_summary():
+    if _cache is not None:
+        logging.info(
+            f"Response cache: {_cache.hits} fresh hits, {_cache.revalidated} revalidated (304), "
+            f"{_cache.misses} downloaded"
+        )
@@ -0,0 +1,158 @@
+"""Stage-2 category scheduling: order categories by priority, expected size and staleness, and stop at a deadline."""
+
+import logging
+import sqlite3
+import statistics
+import threading
+import time
+
+from delta import content_hash
+
+
+SCHEDULE_ORDERS = ("lpt", "stale")
+
+
+class CategoryStats:
+    """
+    SQLite history of each category's size and change times, recorded as categories finish.
+
+    ``changed_at`` is the last run in which the category's first search page
+    differed from the run before, so it tells volatile categories from static
+    ones.
+
+    Parameters:
+        path (str): SQLite database file.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS categories (key TEXT PRIMARY KEY, pages INTEGER NOT NULL,"
+            " products INTEGER NOT NULL, first_page_hash TEXT, changed_at REAL, crawled_at REAL NOT NULL)"
+        )
+
+    def record_page(self, key, page_number, products, data=None):
+        with self._lock:
+            pending = self._pending.setdefault(key, {"pages": 0, "products": 0, "first_page_hash": None})
+            pending["pages"] = max(pending["pages"], page_number)
+            pending["products"] += len(products)
+            if page_number == 1 and data is not None:
+                pending["first_page_hash"] = content_hash(data)
+
+    def record_category_done(self, key):
+        now = time.time()
+        with self._lock:
+            pending = self._pending.pop(key, None)
+            if pending is None:
+                return
+            row = self._connection.execute(
+                "SELECT first_page_hash, changed_at FROM categories WHERE key = ?", (key,)
+            ).fetchone()
+            changed_at = now
+            if row is not None and row[0] == pending["first_page_hash"]:
+                changed_at = row[1]
+            self._connection.execute(
+                "INSERT OR REPLACE INTO categories VALUES (?, ?, ?, ?, ?, ?)",
+                (key, pending["pages"], pending["products"], pending["first_page_hash"], changed_at, now),
+            )
+            self._connection.commit()
+
+    def discard_category(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def load(self):
+        """Return ``{key: {"pages", "products", "changed_at", "crawled_at"}}`` of every recorded category."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT key, pages, products, changed_at, crawled_at FROM categories"
+            ).fetchall()
+        return {
+            key: {"pages": pages, "products": products, "changed_at": changed_at, "crawled_at": crawled_at}
+            for key, pages, products, changed_at, crawled_at in rows
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def category_priority(key, priorities):
+    """Configured priority of a category, by its full key ("a/b/c") or its slug ("c"); 0 if unlisted."""
+    if key in priorities:
+        return float(priorities[key])
+    return float(priorities.get(key.rsplit("/", 1)[-1], 0))
+
+
+def schedule_jobs(jobs, history, priorities=None, order="lpt"):
+    """
+    Order ``(index, aem_url_parts)`` jobs for crawling.
+
+    Higher configured priorities always go first. Within a priority, "lpt"
+    (longest processing time first) starts the categories with the most pages
+    last time first, so a huge category does not start last and set the tail
+    of the run; ties go to the most recently changed. "stale" starts with the
+    categories crawled longest ago (never-crawled ones first), then the
+    largest. Categories without history are expected to be median-sized.
+    Remaining ties keep sheet order.
+
+    Parameters:
+        jobs (iterable): ``(index, aem_url_parts)`` pairs, e.g. from iter_category_jobs.
+        history (dict): ``CategoryStats.load()`` result.
+        priorities (dict): Category key or slug to priority.
+        order (str): "lpt" or "stale".
+
+    Returns:
+        list: The jobs in crawl order.
+    """
+    if order not in SCHEDULE_ORDERS:
+        raise ValueError(f"Unknown schedule order '{order}'; expected one of {list(SCHEDULE_ORDERS)}")
+    priorities = priorities or {}
+    jobs = list(jobs)
+    known_pages = [history[key]["pages"] for key in map(_job_key, jobs) if key in history]
+    default_pages = statistics.median(known_pages) if known_pages else 0
+
+    def sort_key(job):
+        key = _job_key(job)
+        stats = history.get(key, {})
+        expected_pages = stats.get("pages", default_pages)
+        if order == "lpt":
+            rank = (-expected_pages, -(stats.get("changed_at") or 0))
+        else:
+            rank = (stats.get("crawled_at") or 0, -expected_pages)
+        return (-category_priority(key, priorities), *rank)
+
+    scheduled = sorted(jobs, key=sort_key)
+    if scheduled:
+        head = ", ".join(_job_key(job) for job in scheduled[:3])
+        logging.info(f"Scheduled {len(scheduled)} categories ({order}); starting with {head}")
+    return scheduled
+
+
+def _job_key(job):
+    return "/".join(job[1])
+
+
+class Deadline:
+    """
+    Run deadline: once it passes, no further categories are started.
+
+    Parameters:
+        seconds (float): Seconds from now.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = float(seconds)
+        self.started = time.monotonic()
+        self.reached = False
+
+    def check(self):
+        """Whether the deadline has passed; the first True is remembered in ``reached``."""
+        if not self.reached and time.monotonic() - self.started >= self.seconds:
+            self.reached = True
+            logging.warning(f"Run deadline of {self.seconds:g}s reached; no further categories are started")
+        return self.reached
+
@@ -0,0 +1,274 @@
+"""Stage 2 across several processes or hosts: a coordinator, workers leasing queued units, and a merge."""
+
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import socket
+import time
+
+from work_queue import WorkQueue
+import product_catalog_scraper as scraper
+
+
+DEFAULT_SHARDING = {
+    "shard_dir": "stage2_shards",  # queue and partial outputs; must be on a filesystem every worker can reach
+    "lease_timeout": 900,  # seconds a unit stays leased without progress before it is re-queued
+    "max_attempts": 3,
+    "sku_batch_size": 200,
+    "poll_interval": 5.0,  # seconds an idle worker waits while other workers still hold leases
+}
+
+
+class LeaseLost(Exception):
+    """The unit's lease expired and was handed to another worker."""
+
+
+def sharding_config():
+    return {**DEFAULT_SHARDING, **(scraper.CONFIG.get("sharding") or {})}
+
+
+def open_queue(settings):
+    shard_dir = Path(settings["shard_dir"])
+    (shard_dir / "category").mkdir(parents=True, exist_ok=True)
+    (shard_dir / "availability").mkdir(parents=True, exist_ok=True)
+    return WorkQueue(
+        shard_dir / "queue.sqlite",
+        lease_timeout=settings["lease_timeout"],
+        max_attempts=settings["max_attempts"],
+    )
+
+
+def partial_path(settings, kind, unit_id):
+    return Path(settings["shard_dir"]) / kind / f"{unit_id}.json"
+
+
+def write_partial(path, data, worker_id):
+    # Written under a worker-specific name and renamed, so a unit processed twice never leaves a torn file.
+    temporary_path = path.with_name(f"{path.name}.{worker_id}.tmp")
+    with open(temporary_path, "w", encoding="utf-8") as partial_file:
+        json.dump(data, partial_file, ensure_ascii=False)
+    temporary_path.replace(path)
+
+
+def read_partial(path):
+    with open(path, "r", encoding="utf-8") as partial_file:
+        return json.load(partial_file)
+
+
+class UnitState(scraper.CrawlState):
+    """Crawl state of one leased category unit: every fetched page renews the lease."""
+
+    def __init__(self, queue, unit_id, worker_id):
+        super().__init__()
+        self.queue = queue
+        self.unit_id = unit_id
+        self.worker_id = worker_id
+        self.aborted = False
+
+    def record_page(self, key, page_number, products, data):
+        if not self.queue.renew(self.unit_id, self.worker_id):
+            raise LeaseLost(f"Lease on unit {self.unit_id} ({key}) was lost")
+
+    def record_category_aborted(self, key):
+        self.aborted = True
+
+
+def coordinate():
+    """
+    Queue one "category" unit per usable row of the stage-1 sheet, in ``schedule`` order when enabled.
+
+    A queue that already holds units is left alone, so restarting the
+    coordinator never duplicates work.
+
+    Returns:
+        int: Number of category units queued.
+    """
+    settings = sharding_config()
+    queue = open_queue(settings)
+    try:
+        if any(queue.counts().values()):
+            logging.warning(f"{settings['shard_dir']} already holds a run; not queueing categories again.")
+            return 0
+        df = scraper.read_category_rows()
+        # Workers lease units in queue order, so the schedule decides which categories start first.
+        category_stats = scraper.open_category_stats()
+        try:
+            jobs = scraper.scheduled_jobs(scraper.iter_category_jobs(df), category_stats)
+        finally:
+            if category_stats is not None:
+                category_stats.close()
+        units = [
+            {"index": index, "total_rows": len(df), "aem_url_parts": aem_url_parts} for index, aem_url_parts in jobs
+        ]
+        queue.enqueue("category", units)
+        logging.info(f"Queued {len(units)} categories in {settings['shard_dir']}")
+        return len(units)
+    finally:
+        queue.close()
+
+
+def process_category(queue, settings, unit_id, payload, worker_id):
+    """Crawl one category, write its rows and queue availability batches for SKUs not queued yet."""
+    aem_url_parts = payload["aem_url_parts"]
+    logging.info(f"Collecting product info {payload['index'] + 1}/{payload['total_rows']}")
+    category_info = scraper.build_category_info(scraper.fetch_additional_info(aem_url_parts))
+    state = UnitState(queue, unit_id, worker_id)
+    rows = []
+    sku_ids = []
+    pages = scraper.iter_category_pages(aem_url_parts[-1], state, scraper.category_key(aem_url_parts))
+    for products in pages:
+        rows.extend(scraper.parse_category_products(products, category_info))
+        sku_ids.extend(scraper.extract_sku_ids(products))
+    if state.aborted:
+        raise RuntimeError(f"Pagination of {scraper.category_key(aem_url_parts)} was cut short by page failures")
+    write_partial(partial_path(settings, "category", unit_id), rows, worker_id)
+    queue.enqueue_skus(sku_ids, batch_size=settings["sku_batch_size"])
+
+
+def process_availability(queue, settings, unit_id, payload, worker_id):
+    """Look up one batch of SKU availability statuses."""
+    statuses = scraper.fetch_availability_statuses(payload)
+    write_partial(partial_path(settings, "availability", unit_id), statuses, worker_id)
+
+
+UNIT_HANDLERS = {
+    "category": process_category,
+    "availability": process_availability,
+}
+
+
+def work(worker_id=None):
+    """
+    Lease and process units until the queue is drained.
+
+    A failing unit is handed back for another worker to retry. An idle worker
+    keeps polling while other workers hold leases, since they may still queue
+    availability batches or die and leave their units to be re-leased.
+
+    Returns:
+        int: Number of units this worker completed.
+    """
+    settings = sharding_config()
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    queue = open_queue(settings)
+    completed = 0
+    try:
+        while True:
+            unit = queue.lease(worker_id)
+            if unit is None:
+                counts = queue.counts()
+                if not counts["pending"] and not counts["leased"]:
+                    break
+                time.sleep(settings["poll_interval"])
+                continue
+            unit_id, kind, payload = unit
+            try:
+                UNIT_HANDLERS[kind](queue, settings, unit_id, payload, worker_id)
+            except Exception as e:
+                logging.error(f"Worker {worker_id} failed {kind} unit {unit_id}: {e}")
+                queue.fail(unit_id, worker_id, e)
+                continue
+            if queue.complete(unit_id, worker_id):
+                completed += 1
+            else:
+                logging.warning(f"Worker {worker_id} lost the lease on {kind} unit {unit_id}")
+    finally:
+        queue.close()
+    logging.info(f"Worker {worker_id} completed {completed} units")
+    return completed
+
+
+def merge():
+    """
+    Join the partial outputs into the final dated export, in stage-1 sheet order.
+
+    The shard directory is removed after a successful merge unless some units
+    failed, in which case it is kept for inspection.
+
+    Returns:
+        str: Path of the export, or None while units are still pending or leased.
+    """
+    settings = sharding_config()
+    queue = open_queue(settings)
+    try:
+        counts = queue.counts()
+        if counts["pending"] or counts["leased"]:
+            logging.error(f"Cannot merge yet: {counts['pending']} pending and {counts['leased']} leased units")
+            return None
+        for _, payload in queue.units("category", state="failed"):
+            logging.error(f"Category {scraper.category_key(payload['aem_url_parts'])} failed on every attempt")
+        if counts["failed"]:
+            logging.error(f"{counts['failed']} units failed; their rows or statuses are missing from the export")
+
+        availability_statuses = {}
+        for unit_id, _ in queue.units("availability"):
+            availability_statuses.update(read_partial(partial_path(settings, "availability", unit_id)))
+        chunks = (read_partial(partial_path(settings, "category", unit_id)) for unit_id, _ in queue.units("category"))
+
+        output_template = scraper.IO_CONFIG["output_filename_template"].format(
+            brand_name=scraper.SITE_CONFIG["brand_name"]
+        )
+        history = scraper.open_history_store()
+        on_chunk = history.ingest_rows if history is not None else None
+        path = scraper.export_rows(
+            chunks, availability_statuses, datetime.now().strftime(output_template), on_chunk=on_chunk
+        )
+        if history is not None:
+            history.finish_run()
+            history.close()
+    finally:
+        queue.close()
+    if not counts["failed"]:
+        shutil.rmtree(settings["shard_dir"], ignore_errors=True)
+    return path
+
+
+def run_local(workers):
+    """Coordinate, run ``workers`` worker processes on this host and merge."""
+    coordinate()
+    processes = [
+        multiprocessing.Process(target=work, args=(f"{socket.gethostname()}-local-{number}",))
+        for number in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return merge()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--config", default=None, help="Config file; defaults to config.yaml next to the scraper.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("coordinate", help="Queue the categories of the stage-1 sheet.")
+    work_parser = subparsers.add_parser("work", help="Process queued units until the queue is drained.")
+    work_parser.add_argument("--worker-id", default=None, help="Defaults to <hostname>-<pid>.")
+    subparsers.add_parser("merge", help="Write the final export from the partial outputs.")
+    run_parser = subparsers.add_parser("run", help="Coordinate, run local worker processes and merge.")
+    run_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    return parser.parse_args(argv)
+
+
+def run_cli(argv=None):
+    args = parse_args(argv)
+    if args.config:
+        scraper.configure_from_file(args.config)
+    if args.command == "coordinate":
+        coordinate()
+    elif args.command == "work":
+        work(args.worker_id)
+    elif args.command == "merge":
+        merge()
+    else:
+        run_local(args.workers)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    run_cli()
@@ -0,0 +1,226 @@
+"""Multi-store availability: coalesced, optionally batched SKU x store lookups and a compact matrix or long export."""
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import math
+import threading
+
+from output_sinks import chunked, open_sink, output_path
+import metrics
+
+
+SKU_COLUMN = "singleSKUCatalogEntryID"
+
+LONG_COLUMNS = [SKU_COLUMN, "store_id", "availableStatusKey"]
+
+
+class StoreAvailabilityFetcher:
+    """
+    Look up the availability of every submitted SKU in every configured store.
+
+    Each (SKU, store) pair is requested once, however often the SKU is
+    submitted, including while its lookup is still in flight. All stores share
+    one pool of ``workers`` threads, so adding stores adds queued work rather
+    than threads. At most ``queue_size`` lookups (or batches) wait for a
+    worker; beyond that, submit_many blocks the crawl until workers catch up.
+    With ``batch_template``, SKUs are buffered per store and looked up
+    ``batch_size`` at a time.
+
+    Parameters:
+        fetch_json (callable): Fetches and decodes one URL; returns None on failure.
+        single_template (str): Per-SKU availability URL with ``{sku_id}`` and ``{store_id}``.
+        store_ids (list): Stores to query.
+        workers (int): Threads shared by every store.
+        queue_size (int): Lookups or batches queued or in flight before producers block.
+        batch_template (str): Optional several-SKU URL with ``{sku_ids}`` (comma-separated) and ``{store_id}``.
+            Its response must be a list of objects holding the SKU ID under ``batch_sku_field``
+            and an ``availableStatusKey``.
+        batch_size (int): SKUs per batched request.
+        batch_sku_field (str): Field of a batched response entry holding the SKU ID.
+    """
+
+    def __init__(
+        self,
+        fetch_json,
+        single_template,
+        store_ids,
+        workers=32,
+        queue_size=1000,
+        batch_template=None,
+        batch_size=20,
+        batch_sku_field="skuId",
+    ):
+        self.fetch_json = fetch_json
+        self.single_template = single_template
+        self.store_ids = [str(store_id) for store_id in store_ids]
+        self.batch_template = batch_template
+        self.batch_size = max(1, int(batch_size))
+        self.batch_sku_field = batch_sku_field
+        self.sku_ids = []
+        self.statuses = {}
+        self.completed = 0
+        self._sku_count = 0
+        self._seen_sku_ids = set()
+        self._buffers = {store_id: [] for store_id in self.store_ids}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="store-availability")
+        self._slots = threading.BoundedSemaphore(max(1, int(queue_size)))
+        self._progress = metrics.ProgressReporter("store availability lookups")
+
+    def submit_many(self, sku_ids):
+        """Queue lookups of SKU IDs in every store; null and already submitted SKU IDs are skipped."""
+        new_sku_ids = []
+        with self._lock:
+            for sku_id in sku_ids:
+                if sku_id is None or (isinstance(sku_id, float) and math.isnan(sku_id)):
+                    continue
+                if sku_id in self._seen_sku_ids:
+                    continue
+                self._seen_sku_ids.add(sku_id)
+                new_sku_ids.append(sku_id)
+            # Once spilled, one DiskSet is both the seen set and the ordered SKU list.
+            if self.sku_ids is not self._seen_sku_ids:
+                self.sku_ids.extend(new_sku_ids)
+            self._sku_count += len(new_sku_ids)
+        for store_id in self.store_ids:
+            if self.batch_template is None:
+                for sku_id in new_sku_ids:
+                    self._submit(self._fetch_single, sku_id, store_id)
+                continue
+            with self._lock:
+                buffer = self._buffers[store_id]
+                buffer.extend(new_sku_ids)
+                full_batches = []
+                while len(buffer) >= self.batch_size:
+                    full_batches.append(buffer[:self.batch_size])
+                    del buffer[:self.batch_size]
+            for batch in full_batches:
+                self._submit(self._fetch_batch, batch, store_id)
+
+    def _submit(self, function, *args):
+        # The slot is released when the lookup finishes or is cancelled, so queued work stays bounded.
+        self._slots.acquire()
+        future = self._executor.submit(function, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+
+    def spill(self, sku_ids, statuses):
+        """
+        Move the SKU list and the statuses into disk-backed containers.
+
+        Parameters:
+            sku_ids (memory_budget.DiskSet): Takes over as the SKU list and the seen set.
+            statuses (memory_budget.DiskDict): Opened with ``tuple_keys``; close() returns it.
+        """
+        with self._lock:
+            sku_ids.update(self.sku_ids)
+            statuses.update(self.statuses)
+            self.sku_ids = self._seen_sku_ids = sku_ids
+            self.statuses = statuses
+
+    def _record(self, sku_id, store_id, status):
+        with self._lock:
+            self.statuses[(sku_id, store_id)] = status
+            self.completed += 1
+            completed = self.completed
+        self._progress.update(completed, self._sku_count * len(self.store_ids))
+
+    def _fetch_single(self, sku_id, store_id):
+        try:
+            data = self.fetch_json(self.single_template.format(sku_id=sku_id, store_id=store_id))
+            status = data.get("availableStatusKey", "N/A") if data else "N/A"
+        except Exception as e:
+            logging.warning(f"Availability fetch failed for SKU ID {sku_id} in store {store_id}: {e}")
+            status = "N/A"
+        self._record(sku_id, store_id, status)
+
+    def _fetch_batch(self, sku_ids, store_id):
+        try:
+            data = self.fetch_json(
+                self.batch_template.format(sku_ids=",".join(str(sku_id) for sku_id in sku_ids), store_id=store_id)
+            )
+        except Exception as e:
+            logging.warning(f"Availability fetch failed for {len(sku_ids)} SKU IDs in store {store_id}: {e}")
+            data = None
+        found = {}
+        for entry in data if isinstance(data, list) else []:
+            if isinstance(entry, dict) and entry.get(self.batch_sku_field) is not None:
+                found[str(entry[self.batch_sku_field])] = entry.get("availableStatusKey", "N/A")
+        for sku_id in sku_ids:
+            self._record(sku_id, store_id, found.get(str(sku_id), "N/A"))
+
+    def close(self):
+        """
+        Flush partial batches, wait for every lookup and stop the workers.
+
+        Returns:
+            dict: ``{(sku_id, store_id): status}``; failed lookups are "N/A".
+        """
+        for store_id in self.store_ids:
+            with self._lock:
+                batch, self._buffers[store_id] = self._buffers[store_id], []
+            if batch:
+                self._submit(self._fetch_batch, batch, store_id)
+        self._executor.shutdown(wait=True)
+        logging.info(
+            f"Completed {self.completed} store availability lookups "
+            f"for {self._sku_count} SKU IDs in {len(self.store_ids)} stores"
+        )
+        return self.statuses
+
+    def cancel(self):
+        """Drop queued lookups and stop the workers after their current request."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_matrix_rows(statuses, sku_ids, store_ids):
+    """Yield one row per SKU with one status column per store."""
+    for sku_id in sku_ids:
+        row = {SKU_COLUMN: sku_id}
+        for store_id in store_ids:
+            row[store_id] = statuses.get((sku_id, store_id), "N/A")
+        yield row
+
+
+def iter_long_rows(statuses, sku_ids, store_ids):
+    """Yield one row per SKU and store."""
+    for sku_id in sku_ids:
+        for store_id in store_ids:
+            status = statuses.get((sku_id, store_id), "N/A")
+            yield {SKU_COLUMN: sku_id, "store_id": store_id, "availableStatusKey": status}
+
+
+def write_store_availability(
+    statuses, sku_ids, store_ids, file_name, layout="matrix", output_format="csv", chunk_size=10000
+):
+    """
+    Write the SKU x store statuses.
+
+    Parameters:
+        statuses (dict): ``{(sku_id, store_id): status}`` from StoreAvailabilityFetcher.close.
+        sku_ids (list): SKU IDs in output order.
+        store_ids (list): Store IDs in output order.
+        file_name (str): Output file name; its suffix is swapped for ``output_format``.
+        layout (str): "matrix" for one row per SKU and a column per store, "long" for one row per pair.
+        output_format (str): "csv", "jsonl" or "parquet".
+        chunk_size (int): Rows per write.
+
+    Returns:
+        str: Path of the written file.
+    """
+    if layout == "matrix":
+        columns = [SKU_COLUMN, *store_ids]
+        rows = iter_matrix_rows(statuses, sku_ids, store_ids)
+    elif layout == "long":
+        columns = LONG_COLUMNS
+        rows = iter_long_rows(statuses, sku_ids, store_ids)
+    else:
+        raise ValueError(f"Unknown store availability layout '{layout}'; expected 'matrix' or 'long'")
+    path = output_path(file_name, output_format)
+    sink = open_sink(output_format, path, columns)
+    try:
+        for chunk in chunked(rows, chunk_size):
+            sink.write_rows(chunk)
+    finally:
+        sink.close()
+    logging.info(f"Store availability saved to {path}")
+    return path
@@ -0,0 +1,35 @@
+import asyncio
+import threading
+import time
+
+from async_engine import AsyncFetchEngine
+
+
+def test_engine_bounds_in_flight_calls_per_host_and_globally():
+    lock = threading.Lock()
+    in_flight = {"total": 0, "max_total": 0}
+    per_host = {}
+
+    def fake_fetch(host):
+        with lock:
+            in_flight["total"] += 1
+            in_flight["max_total"] = max(in_flight["max_total"], in_flight["total"])
+            current, peak = per_host.get(host, (0, 0))
+            per_host[host] = (current + 1, max(peak, current + 1))
+        time.sleep(0.02)
+        with lock:
+            in_flight["total"] -= 1
+            current, peak = per_host[host]
+            per_host[host] = (current - 1, peak)
+        return host
+
+    async def run_all(engine):
+        urls = [f"https://{host}/page/{i}" for host in ("a.example", "b.example") for i in range(8)]
+        return await asyncio.gather(*(engine.run(url, fake_fetch, url.split("/")[2]) for url in urls))
+
+    with AsyncFetchEngine(global_concurrency=3, per_host_concurrency=2) as engine:
+        results = asyncio.run(run_all(engine))
+
+    assert results == ["a.example"] * 8 + ["b.example"] * 8
+    assert in_flight["max_total"] <= 3
+    assert all(peak <= 2 for _, peak in per_host.values())
@@ -0,0 +1,33 @@
+import threading
+
+from availability_pipeline import AvailabilityPipeline
+
+
+def test_pipeline_looks_up_skus_while_producer_is_still_running():
+    first_lookup_done = threading.Event()
+    calls = []
+    lock = threading.Lock()
+
+    def fake_fetch_status(sku_id):
+        with lock:
+            calls.append(sku_id)
+        first_lookup_done.set()
+        if sku_id == "sku-broken":
+            raise RuntimeError("boom")
+        return f"STATUS-{sku_id}"
+
+    with AvailabilityPipeline(fake_fetch_status, workers=3, queue_size=2) as pipeline:
+        pipeline.submit_many(["sku-1", None, float("nan"), "sku-1"])
+        # The crawl has not finished, yet the first lookup already ran.
+        assert first_lookup_done.wait(timeout=5)
+        pipeline.submit_many(["sku-2", "sku-broken", "sku-3", "sku-2"])
+    statuses = pipeline.statuses
+
+    assert sorted(calls) == ["sku-1", "sku-2", "sku-3", "sku-broken"]
+    assert statuses == {
+        "sku-1": "STATUS-sku-1",
+        "sku-2": "STATUS-sku-2",
+        "sku-3": "STATUS-sku-3",
+        "sku-broken": "N/A",
+    }
+    assert pipeline.submitted == pipeline.completed == 4
@@ -0,0 +1,79 @@
+import json
+
+import benchmark
+from mock_retailer import MockCatalog, MockRetailer
+
+
+def test_benchmark_runs_both_stages_against_mock_retailer(tmp_path):
+    catalog = MockCatalog(level_1=1, level_2=2, level_3=2, products_per_category=7)
+    overrides = {
+        "runtime": {"rate_limit": {"enabled": False}, "crawl_engine": "async"},
+        "io": {"output_format": "jsonl"},
+    }
+
+    with MockRetailer(catalog) as retailer:
+        report = benchmark.run_benchmark(retailer, overrides, page_size=3, workdir=tmp_path)
+
+    assert report["catalog_products"] == report["exported_products"] == 28
+    assert retailer.request_counts == {
+        "menu": 1,
+        "model": 4,
+        "search": 12,  # three pages per category; recordSetTotal makes the empty end page unnecessary
+        "availability": 28,
+        "throttled": 0,
+        "errors": 0,
+    }
+    assert report["requests"] == 45
+    assert report["latency_ms"]["p50"] is not None
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"]
+    assert report["process_peak_rss_mb"] > 0
+    assert (tmp_path / "category_menu.xlsx").exists()
+
+
+def test_mock_retailer_throttles_and_injects_errors():
+    catalog = MockCatalog(level_1=1, level_2=1, level_3=1, products_per_category=2)
+    retailer = MockRetailer(catalog, throttle_rps=2)
+    try:
+        statuses = [retailer.respond("/api/availability/sku-l3-0-0-0-0", {})[0] for _ in range(4)]
+        assert statuses[:2] == [200, 200]
+        assert statuses[2:] == [429, 429]
+        assert retailer.respond("/api/availability/sku-l3-0-0-0-0", {})[1] == {"Retry-After": "1"}
+    finally:
+        retailer.stop()
+
+    failing = MockRetailer(catalog, error_rate=1.0)
+    try:
+        assert failing.respond("/content/home.navMenu.json", {})[0] == 500
+        assert failing.request_counts["errors"] == 1
+    finally:
+        failing.stop()
+
+
+def test_import_time_benchmark_reports_each_module():
+    report = benchmark.measure_import_times(["cli", "product_catalog_scraper"], repeat=1)
+
+    assert set(report) == {"cli", "product_catalog_scraper"}
+    assert report["product_catalog_scraper"]["import_ms"] > 0
+    assert report["product_catalog_scraper"]["heavy_modules"] == []
+
+
+def test_outage_shorter_than_circuit_reset_timeout_loses_no_categories(tmp_path):
+    catalog = MockCatalog(level_1=1, level_2=2, level_3=2, products_per_category=7)
+    overrides = {
+        "runtime": {
+            "rate_limit": {"enabled": False, "backoff_base": 0.05, "backoff_cap": 0.1},
+            "circuit_breaker": {"failure_threshold": 2, "reset_timeout": 1.0},
+            "request_retries": 3,
+        },
+        "io": {"output_format": "jsonl"},
+    }
+
+    # The menu is served, then every request fails for 0.5s: the circuit opens and the
+    # requests made meanwhile wait for its trial instead of failing their categories.
+    with MockRetailer(catalog, outage_seconds=0.5, outage_after=1) as retailer:
+        report = benchmark.run_benchmark(retailer, overrides, page_size=3, workdir=tmp_path)
+
+    assert retailer.request_counts["errors"] > 0
+    assert report["exported_products"] == 28
+    with open(tmp_path / "benchmark_MockRetail.jsonl", encoding="utf-8") as export_file:
+        assert "N/A" not in {json.loads(line)["Availability Status"] for line in export_file}
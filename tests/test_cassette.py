@@ -0,0 +1,61 @@
+import json
+
+import cassette
+import http_client
+
+
+def test_reader_serves_last_recorded_body_and_skips_torn_index_lines(tmp_path):
+    path = tmp_path / "run.cassette"
+    writer = cassette.CassetteWriter(path)
+    writer.record("https://example.test/a", b'{"v": 1}')
+    writer.record("https://example.test/b", b'{"v": 2}')
+    writer.record("https://example.test/a", b'{"v": 3}')
+    writer.close()
+    with open(cassette.index_path(path), "a", encoding="utf-8") as index_file:
+        index_file.write('{"url": "https://example.test/c", "offset": 999999, "length": 5}\n{"url": ')
+
+    reader = cassette.CassetteReader(path)
+    try:
+        assert reader.get("https://example.test/a") == b'{"v": 3}'
+        assert reader.get("https://example.test/b") == b'{"v": 2}'
+        assert reader.get("https://example.test/c") is None
+        assert (reader.replayed, reader.missing) == (2, 1)
+    finally:
+        reader.close()
+
+
+def test_fetch_json_data_records_then_replays_without_network(monkeypatch, tmp_path):
+    class FakeResponse:
+        status_code = 200
+        headers = {}
+
+        def __init__(self, url):
+            self.content = json.dumps({"url": url}).encode("utf-8")
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return json.loads(self.content)
+
+    class FakeSession:
+        def get(self, url, timeout=None):
+            return FakeResponse(url)
+
+    class NoNetwork:
+        def get(self, url, timeout=None):
+            raise AssertionError(f"network used in replay mode: {url}")
+
+    settings = {"mode": "record", "path": str(tmp_path / "run.cassette")}
+    try:
+        http_client.configure({"cassette": settings})
+        monkeypatch.setattr(http_client, "get_session", lambda: FakeSession())
+        assert http_client.fetch_json_data("https://example.test/a.json") == {"url": "https://example.test/a.json"}
+
+        http_client.configure({"cassette": {**settings, "mode": "replay"}})
+        monkeypatch.setattr(http_client, "get_session", lambda: NoNetwork())
+        assert http_client.fetch_json_data("https://example.test/a.json") == {"url": "https://example.test/a.json"}
+        assert http_client.fetch_json_data("https://example.test/missing.json") is None
+        assert cassette.get_reader().replayed == 1
+    finally:
+        http_client.configure({})
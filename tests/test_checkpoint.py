@@ -0,0 +1,137 @@
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+import product_catalog_scraper
+from checkpoint import CheckpointJournal
+
+
+class SimulatedKill(BaseException):
+    pass
+
+
+def test_journal_ignores_partial_last_line(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = CheckpointJournal(path)
+    journal.record_category("cat/phones", {"Category_Title": "Phones"})
+    journal.record_page("cat/phones", 1, [{"uniqueID": "u1"}])
+    journal.record_page("cat/phones", 2, [{"uniqueID": "u2"}])
+    journal.record_availability("sku-1", "LAST_PIECES")
+    journal.close()
+    with open(path, "a", encoding="utf-8") as journal_file:
+        journal_file.write('{"type": "page", "key": "cat/phones", "pa')
+
+    resumed = CheckpointJournal(path, resume=True)
+    resumed.close()
+
+    assert resumed.category_info("cat/phones") == {"Category_Title": "Phones"}
+    assert resumed.saved_pages("cat/phones") == ([[{"uniqueID": "u1"}], [{"uniqueID": "u2"}]], 3, False)
+    assert resumed.statuses == {"sku-1": "LAST_PIECES"}
+
+
+@pytest.mark.parametrize("crawl_engine", ["serial", "async"])
+def test_resume_skips_completed_work_and_merges_into_export(monkeypatch, tmp_path, crawl_engine):
+    input_df = pd.DataFrame({"AEM_URL": ["/cat/phones/smartphones", "/cat/audio/headphones"]})
+    pages_per_category = {"smartphones": 3, "headphones": 2}
+    fetched_pages = []
+    model_calls = []
+    availability_calls = []
+    saved = {}
+    kill_after = {"pages": None}
+
+    def fake_fetch_additional_info(aem_url_parts):
+        model_calls.append(aem_url_parts[-1])
+        return {"categoryId": aem_url_parts[-1], "title": aem_url_parts[-1], "remoteSPAUrl": "/a/b/c"}
+
+    def fake_fetch_json_data(url, retries=None, timeout=None):
+        category_slug = urlparse(url).path.rstrip("/").split("/")[-1]
+        page_number = int(parse_qs(urlparse(url).query)["pageNumber"][0])
+        if kill_after["pages"] is not None and len(fetched_pages) >= kill_after["pages"]:
+            raise SimulatedKill()
+        fetched_pages.append((category_slug, page_number))
+        if page_number > pages_per_category[category_slug]:
+            return {"catalogEntryView": []}
+        return {
+            "catalogEntryView": [
+                {
+                    "uniqueID": f"{category_slug}-{page_number}",
+                    "singleSKUCatalogEntryID": f"sku-{category_slug}-{page_number}",
+                }
+            ]
+        }
+
+    def fake_fetch_single_availability(sku_id):
+        availability_calls.append(sku_id)
+        return "LAST_PIECES"
+
+    monkeypatch.setattr(product_catalog_scraper.pd, "read_excel", lambda *args, **kwargs: input_df)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_additional_info", fake_fetch_additional_info)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_json_data", fake_fetch_json_data)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_single_availability", fake_fetch_single_availability)
+    monkeypatch.setattr(product_catalog_scraper, "save_to_excel", lambda data, filename: saved.update(data=data))
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "checkpoint_filename", str(tmp_path / "run.jsonl"))
+    monkeypatch.setitem(product_catalog_scraper.RUNTIME_CONFIG, "availability_mode", "barrier")
+    monkeypatch.setitem(product_catalog_scraper.RUNTIME_CONFIG, "crawl_engine", crawl_engine)
+    monkeypatch.setitem(product_catalog_scraper.RUNTIME_CONFIG, "global_concurrency", 1)
+
+    product_catalog_scraper.main()
+    clean_run = saved["data"]
+    assert not (tmp_path / "run.jsonl").exists()
+
+    fetched_pages.clear()
+    kill_after["pages"] = 5
+    with pytest.raises(SimulatedKill):
+        product_catalog_scraper.main()
+    killed_run_pages = set(fetched_pages)
+    assert len(killed_run_pages) == 5
+
+    fetched_pages.clear()
+    model_calls.clear()
+    kill_after["pages"] = None
+    product_catalog_scraper.main(resume=True)
+
+    assert model_calls == []
+    all_pages = {(slug, page) for slug, count in pages_per_category.items() for page in range(1, count + 2)}
+    assert sorted(fetched_pages) == sorted(all_pages - killed_run_pages)
+    assert saved["data"] == clean_run
+    assert not (tmp_path / "run.jsonl").exists()
+
+
+def test_resume_retries_availability_lookups_that_failed(monkeypatch, tmp_path):
+    input_df = pd.DataFrame({"AEM_URL": ["/cat/phones/smartphones"]})
+    host_down = {"value": True}
+    availability_calls = []
+    saved = {}
+
+    def fake_fetch_json_data(url, retries=None, timeout=None):
+        page_number = int(parse_qs(urlparse(url).query)["pageNumber"][0])
+        if page_number > 1:
+            return {"catalogEntryView": []}
+        return {"catalogEntryView": [{"uniqueID": "u1", "singleSKUCatalogEntryID": "sku-1"}]}
+
+    def fake_fetch_single_availability(sku_id):
+        availability_calls.append(sku_id)
+        return "N/A" if host_down["value"] else "LAST_PIECES"
+
+    def save_or_crash(data, filename):
+        saved["data"] = data
+        if host_down["value"]:
+            raise SimulatedKill()
+
+    monkeypatch.setattr(product_catalog_scraper.pd, "read_excel", lambda *args, **kwargs: input_df)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_additional_info", lambda parts: {})
+    monkeypatch.setattr(product_catalog_scraper, "fetch_json_data", fake_fetch_json_data)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_single_availability", fake_fetch_single_availability)
+    monkeypatch.setattr(product_catalog_scraper, "save_to_excel", save_or_crash)
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "checkpoint_filename", str(tmp_path / "run.jsonl"))
+
+    with pytest.raises(SimulatedKill):
+        product_catalog_scraper.main()
+    assert saved["data"][0]["Availability Status"] == "N/A"
+
+    host_down["value"] = False
+    product_catalog_scraper.main(resume=True)
+
+    assert availability_calls == ["sku-1", "sku-1"]
+    assert saved["data"][0]["Availability Status"] == "Τελευταία τεμάχια"
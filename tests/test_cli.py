@@ -0,0 +1,42 @@
+from pathlib import Path
+import subprocess
+import sys
+
+import pytest
+
+import cli
+
+
+def test_pipeline_modules_import_without_config_or_heavy_dependencies():
+    script = (
+        "import sys, cli, menu_extractor, product_catalog_scraper, sharding\n"
+        "assert not product_catalog_scraper.CONFIG.loaded\n"
+        "print(','.join(name for name in ('pandas', 'numpy', 'openpyxl', 'pyarrow') if name in sys.modules))\n"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=Path(cli.__file__).resolve().parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert completed.stdout.strip() == ""
+
+
+def test_cli_hands_command_arguments_to_the_stage(monkeypatch):
+    import product_catalog_scraper
+
+    calls = []
+    monkeypatch.setattr(product_catalog_scraper, "main", lambda **kwargs: calls.append(kwargs))
+
+    cli.main(["--log-level", "WARNING", "products", "--limit", "5", "--resume"])
+
+    assert calls == [{"limit": 5, "resume": True, "deadline_seconds": None, "memory_budget_mb": None}]
+
+
+def test_cli_command_help_is_the_stage_help(capsys):
+    with pytest.raises(SystemExit):
+        cli.main(["history", "--help"])
+
+    assert "--db" in capsys.readouterr().out
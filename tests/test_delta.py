@@ -0,0 +1,145 @@
+import csv
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+from delta import DeltaSnapshot
+import product_catalog_scraper
+
+
+@pytest.mark.parametrize("crawl_engine", ["serial", "async"])
+def test_delta_run_recrawls_only_changed_categories_and_reports_changes(monkeypatch, tmp_path, crawl_engine):
+    input_df = pd.DataFrame({"AEM_URL": ["/cat/phones/smartphones", "/cat/audio/headphones"]})
+    catalog = {
+        "smartphones": [
+            [{"uniqueID": "p1", "singleSKUCatalogEntryID": "s1", "price": [{"usage": "Offer", "value": "100"}]}],
+            [{"uniqueID": "p2", "singleSKUCatalogEntryID": "s2", "price": [{"usage": "Offer", "value": "200"}]}],
+        ],
+        "headphones": [
+            [{"uniqueID": "h1", "singleSKUCatalogEntryID": "t1", "price": [{"usage": "Offer", "value": "30"}]}],
+            [{"uniqueID": "h2", "singleSKUCatalogEntryID": "t2", "price": [{"usage": "Offer", "value": "40"}]}],
+        ],
+    }
+    statuses = {"s1": "LAST_PIECES", "s2": "LAST_PIECES", "t1": "LAST_PIECES", "t2": "LAST_PIECES", "t3": "ON_ORDER"}
+    fetched_pages = []
+    availability_calls = []
+    status_lookups = []
+    saved = {}
+    reusable_statuses = DeltaSnapshot.reusable_statuses
+
+    def counting_reusable_statuses(snapshot, products):
+        status_lookups.append([product["uniqueID"] for product in products])
+        return reusable_statuses(snapshot, products)
+
+    def fake_fetch_json_data(url, retries=None, timeout=None):
+        category_slug = urlparse(url).path.rstrip("/").split("/")[-1]
+        page_number = int(parse_qs(urlparse(url).query)["pageNumber"][0])
+        fetched_pages.append((category_slug, page_number))
+        pages = catalog[category_slug]
+        return {"catalogEntryView": pages[page_number - 1] if page_number <= len(pages) else []}
+
+    def fake_fetch_single_availability(sku_id):
+        availability_calls.append(sku_id)
+        return statuses[sku_id]
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(DeltaSnapshot, "reusable_statuses", counting_reusable_statuses)
+    monkeypatch.setattr(product_catalog_scraper.pd, "read_excel", lambda *args, **kwargs: input_df)
+    monkeypatch.setattr(
+        product_catalog_scraper,
+        "fetch_additional_info",
+        lambda parts: {"categoryId": parts[-1], "title": parts[-1], "remoteSPAUrl": "/" + "/".join(parts)},
+    )
+    monkeypatch.setattr(product_catalog_scraper, "fetch_json_data", fake_fetch_json_data)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_single_availability", fake_fetch_single_availability)
+    monkeypatch.setattr(product_catalog_scraper, "save_to_excel", lambda data, filename: saved.update(data=data))
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "checkpoint_filename", None)
+    monkeypatch.setitem(product_catalog_scraper.RUNTIME_CONFIG, "crawl_engine", crawl_engine)
+    monkeypatch.setattr(
+        product_catalog_scraper,
+        "DELTA_CONFIG",
+        {"enabled": True, "snapshot_filename": "snapshot.sqlite", "change_report_template": "changes.csv"},
+    )
+
+    product_catalog_scraper.main()
+    assert len(saved["data"]) == 4
+
+    # Headphones change on the first page: one price drop, one product replaced.
+    catalog["headphones"] = [
+        [{"uniqueID": "h1", "singleSKUCatalogEntryID": "t1", "price": [{"usage": "Offer", "value": "25"}]}],
+        [{"uniqueID": "h3", "singleSKUCatalogEntryID": "t3", "price": [{"usage": "Offer", "value": "50"}]}],
+    ]
+    statuses["s2"] = "NOT_AVAILABLE"  # not refreshed: product unchanged and status still fresh
+    fetched_pages.clear()
+    availability_calls.clear()
+    status_lookups.clear()
+    product_catalog_scraper.main()
+
+    # Each page's SKUs are checked against the snapshot exactly once.
+    assert sorted(status_lookups) == [["h1"], ["h3"], ["p1"], ["p2"]]
+    assert sorted(fetched_pages) == [("headphones", 1), ("headphones", 2), ("headphones", 3), ("smartphones", 1)]
+    assert sorted(availability_calls) == ["t1", "t3"]
+    assert [row["uniqueID"] for row in saved["data"]] == ["p1", "p2", "h1", "h3"]
+    assert saved["data"][1]["Availability Status"] == "Τελευταία τεμάχια"
+
+    with open(tmp_path / "changes.csv", encoding="utf-8", newline="") as report_file:
+        changes = {
+            (row["change_type"], row["uniqueID"], row["old_value"], row["new_value"])
+            for row in csv.DictReader(report_file)
+        }
+    assert changes == {
+        ("added", "h3", "", ""),
+        ("removed", "h2", "", ""),
+        ("price_changed", "h1", "30", "25"),
+    }
+
+
+@pytest.mark.parametrize("crawl_engine", ["serial", "async"])
+def test_delta_does_not_snapshot_failed_pages_or_statuses(monkeypatch, tmp_path, crawl_engine):
+    input_df = pd.DataFrame({"AEM_URL": ["/cat/phones/smartphones"]})
+    pages = [
+        [{"uniqueID": "p1", "singleSKUCatalogEntryID": "s1"}],
+        [{"uniqueID": "p2", "singleSKUCatalogEntryID": "s2"}],
+    ]
+    outage = {"value": True}
+    fetched_pages = []
+    availability_calls = []
+    saved = {}
+
+    def fake_fetch_json_data(url, retries=None, timeout=None):
+        page_number = int(parse_qs(urlparse(url).query)["pageNumber"][0])
+        fetched_pages.append(page_number)
+        if outage["value"] and page_number > 1:
+            return None
+        return {"catalogEntryView": pages[page_number - 1] if page_number <= len(pages) else []}
+
+    def fake_fetch_single_availability(sku_id):
+        availability_calls.append(sku_id)
+        return "N/A" if outage["value"] else "LAST_PIECES"
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(product_catalog_scraper.pd, "read_excel", lambda *args, **kwargs: input_df)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_additional_info", lambda parts: {})
+    monkeypatch.setattr(product_catalog_scraper, "fetch_json_data", fake_fetch_json_data)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_single_availability", fake_fetch_single_availability)
+    monkeypatch.setattr(product_catalog_scraper, "save_to_excel", lambda data, filename: saved.update(data=data))
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "checkpoint_filename", None)
+    monkeypatch.setitem(product_catalog_scraper.RUNTIME_CONFIG, "crawl_engine", crawl_engine)
+    monkeypatch.setattr(
+        product_catalog_scraper,
+        "DELTA_CONFIG",
+        {"enabled": True, "snapshot_filename": "snapshot.sqlite", "change_report_template": "changes.csv"},
+    )
+
+    product_catalog_scraper.main()
+    assert [row["uniqueID"] for row in saved["data"]] == ["p1"]
+
+    outage["value"] = False
+    fetched_pages.clear()
+    availability_calls.clear()
+    product_catalog_scraper.main()
+
+    assert fetched_pages == [1, 2, 3]
+    assert sorted(availability_calls) == ["s1", "s2"]
+    assert [row["Availability Status"] for row in saved["data"]] == ["Τελευταία τεμάχια"] * 2
@@ -0,0 +1,102 @@
+import pandas as pd
+
+import product_catalog_scraper
+from history_store import HistoryStore, main, run_date_from_filename
+
+
+def _row(sku_id, price, availability, category_id="cat-1", category_title="Phones"):
+    return {
+        "Category_ID_number": category_id,
+        "Category_Title": category_title,
+        "uniqueID": f"u-{sku_id}",
+        "singleSKUCatalogEntryID": sku_id,
+        "name": f"Product {sku_id}",
+        "Original_Price": "N/A",
+        "Current_Price": price,
+        "Availability Status": availability,
+    }
+
+
+def _store_with_runs(path):
+    store = HistoryStore(path)
+    runs = {
+        "2024-01-01": [_row("sku-1", "10.0", "A"), _row("sku-2", "5", "A")],
+        "2024-01-02": [_row("sku-1", "9.5", "B"), _row("sku-2", "5", "A"), _row("sku-2", "5", "A", "cat-2", "Deals")],
+        "2024-01-03": [_row("sku-1", "9.5", "A")],
+    }
+    for run_date, rows in runs.items():
+        store.start_run(run_date)
+        store.ingest_rows(rows)
+        store.finish_run()
+    return store
+
+
+def test_price_history_and_availability_flips(tmp_path):
+    store = _store_with_runs(tmp_path / "history.sqlite")
+
+    assert [(row["run_date"], row["current_price"]) for row in store.price_history("sku-1")] == [
+        ("2024-01-01", 10.0),
+        ("2024-01-02", 9.5),
+        ("2024-01-03", 9.5),
+    ]
+    assert [row["current_price"] for row in store.price_history("sku-1", since="2024-01-02")] == [9.5, 9.5]
+    assert [
+        (row["sku_id"], row["run_date"], row["previous_availability"], row["availability"])
+        for row in store.availability_flips()
+    ] == [("sku-1", "2024-01-02", "A", "B"), ("sku-1", "2024-01-03", "B", "A")]
+
+
+def test_category_snapshot_defaults_to_latest_run_and_reingest_replaces_run(tmp_path):
+    store = _store_with_runs(tmp_path / "history.sqlite")
+
+    assert [row["sku_id"] for row in store.category_snapshot("Phones")] == ["sku-1"]
+    assert [row["sku_id"] for row in store.category_snapshot("cat-1", run_date="2024-01-02")] == ["sku-1", "sku-2"]
+    assert [row["run_date"] for row in store.category_snapshot("Deals")] == ["2024-01-02"]
+
+    store.start_run("2024-01-03")
+    store.ingest_rows([_row("sku-2", "4", "A")])
+    store.finish_run()
+    assert [row["sku_id"] for row in store.category_snapshot("Phones")] == ["sku-2"]
+
+
+def test_cli_backfills_from_export_files(tmp_path, capsys):
+    export = tmp_path / "20240105_DemoRetail.csv"
+    export.write_text(
+        "Category_ID_number,singleSKUCatalogEntryID,Current_Price,Availability Status\ncat-1,sku-9,12.5,A\n",
+        encoding="utf-8",
+    )
+    db = str(tmp_path / "history.sqlite")
+
+    assert run_date_from_filename(export) == "2024-01-05"
+    main(["--db", db, "ingest", str(export)])
+    rows = main(["--db", db, "category", "cat-1"])
+
+    assert rows[0]["sku_id"] == "sku-9"
+    assert rows[0]["current_price"] == 12.5
+    assert "sku-9" in capsys.readouterr().out
+
+
+def test_main_ingests_export_into_history_store(monkeypatch, tmp_path):
+    saved = {}
+    input_df = pd.DataFrame({"AEM_URL": ["/cat/phones/smartphones"]})
+    monkeypatch.setattr(product_catalog_scraper.pd, "read_excel", lambda *args, **kwargs: input_df)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_additional_info", lambda parts: {"categoryId": "cat-1"})
+    monkeypatch.setattr(
+        product_catalog_scraper,
+        "fetch_json_data",
+        lambda url, **kwargs: {"catalogEntryView": [{"uniqueID": "u1", "singleSKUCatalogEntryID": "sku-1"}]}
+        if "pageNumber=1&" in url
+        else {"catalogEntryView": []},
+    )
+    monkeypatch.setattr(product_catalog_scraper, "fetch_single_availability", lambda sku_id: "EXHAUSTED")
+    monkeypatch.setattr(product_catalog_scraper, "save_to_excel", lambda data, filename: saved.update(data=data))
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "checkpoint_filename", None)
+    monkeypatch.setitem(
+        product_catalog_scraper.CONFIG, "history", {"enabled": True, "path": str(tmp_path / "history.sqlite")}
+    )
+
+    product_catalog_scraper.main()
+
+    store = HistoryStore(tmp_path / "history.sqlite")
+    assert [row["availability"] for row in store.price_history("sku-1")] == ["Εξαντλημένο"]
+    assert len(saved["data"]) == 1
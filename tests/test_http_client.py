@@ -0,0 +1,89 @@
+import threading
+
+import requests
+
+import http_client
+
+
+def test_session_is_shared_and_pool_matches_worker_count():
+    http_client.configure({"availability_workers": 20, "global_concurrency": 8, "crawl_engine": "async"})
+    sessions = []
+
+    def grab():
+        sessions.append(http_client.get_session())
+
+    threads = [threading.Thread(target=grab) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(session) for session in sessions}) == 1
+    adapter = sessions[0].get_adapter("https://www.demo-retail.example.com/")
+    assert adapter._pool_maxsize == 28
+    assert "gzip" in sessions[0].headers["Accept-Encoding"]
+    assert sessions[0].headers["Connection"] == "keep-alive"
+
+    http_client.configure({"http_pool_size": 4, "http_keep_alive": False, "http_compression": False})
+    session = http_client.get_session()
+    assert session is not sessions[0]
+    assert session.get_adapter("https://www.demo-retail.example.com/")._pool_maxsize == 4
+    assert session.headers["Accept-Encoding"] == "identity"
+    assert session.headers["Connection"] == "close"
+
+
+def test_default_pool_covers_crawl_and_availability_workers():
+    # The pipelined availability workers run while the crawl is still paging,
+    # so the pool must hold both sets of connections at once.
+    assert http_client.resolve_pool_size({"availability_workers": 20, "global_concurrency": 8}) == 24
+    assert (
+        http_client.resolve_pool_size({"availability_workers": 20, "parallel_pages": 1, "speculative_pages": 1})
+        == 21
+    )
+    assert (
+        http_client.resolve_pool_size(
+            {"availability_workers": 20, "global_concurrency": 8, "crawl_engine": "async"}
+        )
+        == 28
+    )
+    assert http_client.resolve_pool_size({"http_pool_size": 5, "crawl_engine": "async"}) == 5
+    store_config = {"enabled": True, "store_ids": ["1", "2"], "workers": 10}
+    assert http_client.resolve_pool_size({"availability_workers": 20, "global_concurrency": 8}, store_config) == 34
+    assert http_client.resolve_pool_size({"availability_workers": 20}, {**store_config, "enabled": False}) == 24
+
+
+def test_fetch_json_data_retries_through_shared_session(monkeypatch):
+    calls = []
+
+    class FakeResponse:
+        status_code = 200
+        headers = {}
+        content = b'{"ok": true}'
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"ok": True}
+
+    class FakeSession:
+        def get(self, url, timeout=None):
+            calls.append((url, timeout))
+            if len(calls) == 1:
+                raise requests.ConnectionError("reset")
+            return FakeResponse()
+
+    http_client.configure({"request_retries": 2, "request_timeout": 7})
+    monkeypatch.setattr(http_client, "get_session", lambda: FakeSession())
+    monkeypatch.setattr(http_client.time, "sleep", lambda seconds: None)
+
+    assert http_client.fetch_json_data("https://example.test/a.json") == {"ok": True}
+    assert calls == [("https://example.test/a.json", 7), ("https://example.test/a.json", 7)]
+
+
+def test_fractional_request_timeout_is_kept():
+    http_client.configure({"request_timeout": 0.5})
+    try:
+        assert http_client._settings["request_timeout"] == 0.5
+    finally:
+        http_client.configure({})
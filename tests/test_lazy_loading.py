@@ -0,0 +1,34 @@
+import sys
+
+from lazy_loading import LazyConfig, LazyModule
+
+
+def test_lazy_config_loads_once_on_first_access():
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return {"runtime": {"workers": 4}}
+
+    config = LazyConfig(loader)
+    runtime = config.section("runtime")
+    delta = config.section("delta", optional=True)
+
+    assert not config.loaded and not loads
+    assert runtime["workers"] == 4
+    runtime["workers"] = 8
+    assert config["runtime"] == {"workers": 8}
+    assert dict(delta) == {}
+    assert config.loaded and len(loads) == 1
+
+
+def test_lazy_module_imports_on_first_attribute_and_allows_overrides(monkeypatch):
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    colorsys = LazyModule("colorsys")
+
+    assert "colorsys" not in sys.modules
+    assert colorsys.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert "colorsys" in sys.modules
+
+    monkeypatch.setattr(colorsys, "rgb_to_hsv", lambda *args: "patched")
+    assert colorsys.rgb_to_hsv(1.0, 0.0, 0.0) == "patched"
@@ -0,0 +1,113 @@
+import pandas as pd
+import pytest
+
+import memory_budget
+import metrics
+import product_catalog_scraper
+
+
+def test_disk_containers_behave_like_set_and_dict(tmp_path):
+    store = memory_budget.SpillStore(tmp_path)
+    try:
+        sku_ids = store.set("sku_ids")
+        sku_ids.update(["b", "a", "b", 1, "1"])
+        sku_ids.add("a")
+        assert list(sku_ids) == ["b", "a", 1, "1"]
+        assert len(sku_ids) == 4
+        assert 1 in sku_ids and "c" not in sku_ids
+
+        statuses = store.dict("statuses")
+        statuses.update({"a": "LAST_PIECES", 1: "EXHAUSTED"})
+        statuses["b"] = "ON_ORDER"
+        assert statuses["a"] == "LAST_PIECES"
+        assert statuses.get("1") is None
+        assert dict(statuses.items()) == {"a": "LAST_PIECES", 1: "EXHAUSTED", "b": "ON_ORDER"}
+        assert statuses.lookup(["a", "missing", 1]) == {"a": "LAST_PIECES", 1: "EXHAUSTED"}
+        with pytest.raises(KeyError):
+            statuses["missing"]
+
+        sku_ids.difference_update(statuses)
+        assert list(sku_ids) == ["1"]
+
+        pairs = store.dict("store_statuses", tuple_keys=True)
+        pairs[("sku-1", "store-2")] = "N/A"
+        assert ("sku-1", "store-2") in pairs
+        assert list(pairs) == [("sku-1", "store-2")]
+    finally:
+        store.close()
+    assert not store.path.exists()
+
+
+def test_memory_budget_latches_once_reached():
+    budget = memory_budget.MemoryBudget(1e9)
+    assert not budget.check()
+
+    budget = memory_budget.MemoryBudget(0.001)
+    assert budget.check()
+    assert budget.reached
+    assert memory_budget.summary(budget)["spilled"] is True
+    assert memory_budget.summary()["peak_rss_mb"] > 0
+
+
+def _run_main(monkeypatch, tmp_path, availability_mode, memory_budget_mb=None):
+    input_df = pd.DataFrame({"AEM_URL": ["/cat/phones/smartphones", "/cat/tv/televisions"]})
+    saved = {}
+
+    def fake_fetch_json_data(url, retries=None, timeout=None):
+        category_slug = url.split("?")[0].rstrip("/").split("/")[-1]
+        page_number = int(url.split("pageNumber=")[1].split("&")[0])
+        if page_number > 2:
+            return {"catalogEntryView": []}
+        return {
+            "catalogEntryView": [
+                {
+                    "uniqueID": f"{category_slug}-{page_number}-{item}",
+                    # Every SKU is listed twice, so the spilled sets have duplicates to drop.
+                    "singleSKUCatalogEntryID": f"sku-{page_number}-{item}",
+                    "name": f"Product {item}",
+                }
+                for item in range(3)
+            ]
+        }
+
+    def fake_save_to_excel(data, filename):
+        saved["data"] = data
+
+    def record_reports(extra=None):
+        saved["summary"] = extra
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(product_catalog_scraper.pd, "read_excel", lambda *args, **kwargs: input_df)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_additional_info", lambda aem_url_parts: {"title": "T"})
+    monkeypatch.setattr(product_catalog_scraper, "fetch_json_data", fake_fetch_json_data)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_single_availability", lambda sku_id: "LAST_PIECES")
+    monkeypatch.setattr(product_catalog_scraper, "save_to_excel", fake_save_to_excel)
+    monkeypatch.setattr(metrics, "write_reports", record_reports)
+    monkeypatch.setitem(product_catalog_scraper.RUNTIME_CONFIG, "availability_mode", availability_mode)
+    monkeypatch.setitem(product_catalog_scraper.RUNTIME_CONFIG, "spill_dir", str(tmp_path))
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "output_filename_template", "export.xlsx")
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "checkpoint_filename", None)
+
+    product_catalog_scraper.main(memory_budget_mb=memory_budget_mb)
+    return saved
+
+
+@pytest.mark.parametrize("availability_mode", ["pipeline", "barrier"])
+def test_spilled_run_streams_the_same_export_from_disk(monkeypatch, tmp_path, availability_mode):
+    (tmp_path / "memory").mkdir()
+    in_memory = _run_main(monkeypatch, tmp_path / "memory", availability_mode)
+    spilled = _run_main(monkeypatch, tmp_path, availability_mode, memory_budget_mb=0.001)
+
+    assert "data" not in spilled  # the workbook was streamed instead of built in one save_to_excel
+    exported = pd.read_excel(tmp_path / "export.xlsx", dtype=str)
+    assert len(exported) == len(in_memory["data"]) == 12
+    assert list(exported["uniqueID"]) == [row["uniqueID"] for row in in_memory["data"]]
+    assert set(exported["Availability Status"]) == {"Τελευταία τεμάχια"}
+    assert spilled["summary"]["memory"]["spilled"] is True
+    assert in_memory["summary"]["memory"] == {
+        "peak_rss_mb": in_memory["summary"]["memory"]["peak_rss_mb"],
+        "budget_mb": None,
+        "spilled": False,
+    }
+    assert not list(tmp_path.glob("spill_*.sqlite"))
+    assert not list(tmp_path.glob("*.rows.jsonl"))
@@ -1,3 +1,5 @@
+import sys
+
 import menu_extractor
 
 
@@ -41,3 +43,60 @@ def test_extract_categories_builds_expected_hierarchy():
     assert extracted[2]["UniqueID"] == "L3"
     assert extracted[2]["ParentUniqueID"] == "L2"
     assert [row["Level"] for row in extracted] == [1, 2, 3]
+
+
+def test_iter_categories_walks_menus_deeper_than_the_recursion_limit():
+    depth = sys.getrecursionlimit() + 100
+    menu = []
+    children = menu
+    for level in range(1, depth + 1):
+        category = {"level": str(level), "uniqueID": f"L{level}", "aem_url": f"/l{level}"}
+        children.append(category)
+        children = category["childMenu"] = []
+
+    rows = list(menu_extractor.iter_categories(menu))
+
+    assert len(rows) == depth
+    assert rows[-1]["ParentUniqueID"] == f"L{depth - 1}"
+
+
+def test_menu_rows_are_handed_off_as_jsonl_for_stage_2(tmp_path, monkeypatch):
+    import product_catalog_scraper
+
+    menu = [
+        {"navTitle": "Other", "childMenu": []},
+        {
+            "navTitle": "Products",
+            "childMenu": [
+                {
+                    "level": "1",
+                    "uniqueID": "L1",
+                    "childMenu": [
+                        {
+                            "level": "2",
+                            "uniqueID": "L2",
+                            "childMenu": [{"level": "3", "uniqueID": "L3", "aem_url": "/a/b/c"}],
+                        }
+                    ],
+                }
+            ],
+        },
+    ]
+    monkeypatch.setattr(menu_extractor, "fetch_json_data", lambda url: menu)
+    handoff_path = tmp_path / "menu.jsonl"
+    config = {
+        "site": {"menu_endpoint": "https://example.test/menu.json", "nav_title": "Products"},
+        "io": {"menu_excel_filename": None, "menu_handoff_filename": str(handoff_path)},
+    }
+    emitted = []
+
+    row_count = menu_extractor.write_menu_outputs(
+        menu_extractor.iter_menu_categories(config), config, on_row=emitted.append
+    )
+
+    assert row_count == 3
+    assert [row["UniqueID"] for row in emitted] == ["L1", "L2", "L3"]
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "menu_handoff_filename", str(handoff_path))
+    rows = product_catalog_scraper.read_category_rows()
+    assert [row["AEM_URL"] for row in rows] == ["/a/b/c"]
+    assert list(product_catalog_scraper.iter_category_jobs(rows)) == [(0, ["a", "b", "c"])]
@@ -0,0 +1,77 @@
+import json
+import logging
+
+import requests
+
+import http_client
+import metrics
+
+
+def test_fetch_json_data_records_endpoint_metrics_and_reports(monkeypatch, tmp_path):
+    calls = []
+
+    class FakeResponse:
+        status_code = 200
+        headers = {}
+        content = b'{"availableStatusKey": "LAST_PIECES"}'
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return json.loads(self.content)
+
+    class FakeSession:
+        def get(self, url, timeout=None):
+            calls.append(url)
+            if len(calls) == 1:
+                raise requests.ConnectionError("reset")
+            return FakeResponse()
+
+    http_client.configure(
+        {
+            "request_retries": 2,
+            "rate_limit": {"enabled": False},
+            "metrics": {
+                "summary_filename": str(tmp_path / "summary.json"),
+                "prometheus_textfile": str(tmp_path / "scraper.prom"),
+            },
+        }
+    )
+    http_client.register_endpoint("availability", "https://www.example.test/api/availability/{sku_id}")
+    monkeypatch.setattr(http_client, "get_session", lambda: FakeSession())
+    monkeypatch.setattr(http_client.time, "sleep", lambda seconds: None)
+
+    assert http_client.fetch_json_data("https://www.example.test/api/availability/sku-1") is not None
+    metrics.get_metrics().set_gauge("availability_queue_depth", 7)
+    metrics.get_metrics().set_gauge("availability_queue_depth", 2)
+    with metrics.timer("output_write"):
+        pass
+    summary = metrics.write_reports({"rate_limits": {}})
+
+    endpoint = summary["endpoints"][0]
+    assert endpoint["endpoint"] == "availability"
+    assert (endpoint["requests"], endpoint["retries"], endpoint["failures"]) == (1, 1, 0)
+    assert endpoint["bytes"] == len(FakeResponse.content)
+    assert summary["gauges"]["availability_queue_depth"] == {"current": 2, "max": 7}
+    assert "output_write" in summary["timings_seconds"]
+    assert json.loads((tmp_path / "summary.json").read_text())["endpoints"][0]["requests"] == 1
+    prometheus = (tmp_path / "scraper.prom").read_text()
+    assert 'scraper_requests_total{endpoint="availability"} 1' in prometheus
+    assert 'scraper_request_duration_seconds_bucket{endpoint="availability",le="+Inf"} 1' in prometheus
+
+
+def test_progress_reporter_logs_at_most_once_per_interval(monkeypatch, caplog):
+    now = {"value": 0.0}
+    monkeypatch.setattr(metrics.time, "monotonic", lambda: now["value"])
+    progress = metrics.ProgressReporter("availability lookups", interval=50)
+
+    with caplog.at_level(logging.INFO):
+        for completed in range(1, 101):
+            now["value"] += 1
+            progress.update(completed, 100)
+
+    assert [record.getMessage() for record in caplog.records] == [
+        "Progress: 50/100 availability lookups",
+        "Progress: 100/100 availability lookups",
+    ]
@@ -0,0 +1,86 @@
+import csv
+import json
+
+import pandas as pd
+import pytest
+
+import output_sinks
+import product_catalog_scraper
+
+
+COLUMNS = ["uniqueID", "name", "Current_Price", "Level 3"]
+ROWS = [
+    {"uniqueID": "u1", "name": "Phone", "Current_Price": "199.99", "Level 3": "smartphones"},
+    {"uniqueID": "u2", "name": "Ακουστικά", "Current_Price": 49, "Level 3": None, "extra": "ignored"},
+]
+
+
+def test_csv_and_jsonl_sinks_write_chunks_with_fixed_columns(tmp_path):
+    for output_format in ("csv", "jsonl"):
+        path = tmp_path / f"out.{output_format}"
+        sink = output_sinks.open_sink(output_format, path, COLUMNS)
+        sink.write_rows(ROWS[:1])
+        sink.write_rows(ROWS[1:])
+        sink.close()
+
+        if output_format == "csv":
+            with open(path, encoding="utf-8", newline="") as csv_file:
+                written = list(csv.DictReader(csv_file))
+            assert [row["uniqueID"] for row in written] == ["u1", "u2"]
+            assert list(written[0]) == COLUMNS
+        else:
+            written = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+            assert written[1] == {"uniqueID": "u2", "name": "Ακουστικά", "Current_Price": 49, "Level 3": None}
+
+
+def test_parquet_sink_writes_one_row_group_per_chunk(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "out.parquet"
+    sink = output_sinks.open_sink("parquet", path, COLUMNS)
+    sink.write_rows(ROWS[:1])
+    sink.write_rows(ROWS[1:])
+    sink.close()
+
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.metadata.num_row_groups == 2
+    table = parquet_file.read()
+    assert table.column("Current_Price").to_pylist() == ["199.99", "49"]
+    assert table.column("Level 3").to_pylist() == ["smartphones", None]
+
+
+def test_main_streams_rows_to_configured_sink(monkeypatch, tmp_path):
+    input_df = pd.DataFrame({"AEM_URL": ["/cat/phones/smartphones"]})
+    pages = {
+        1: [{"uniqueID": f"u{i}", "singleSKUCatalogEntryID": f"sku-{i % 3}", "name": f"P{i}"} for i in range(5)],
+        2: [{"uniqueID": "u5", "singleSKUCatalogEntryID": "sku-9", "name": "P5"}],
+    }
+    saved = {}
+
+    def fake_fetch_json_data(url, retries=None, timeout=None):
+        page_number = int(url.split("pageNumber=")[1].split("&")[0])
+        return {"catalogEntryView": pages.get(page_number, [])}
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(product_catalog_scraper.pd, "read_excel", lambda *args, **kwargs: input_df)
+    monkeypatch.setattr(
+        product_catalog_scraper,
+        "fetch_additional_info",
+        lambda parts: {"categoryId": "c1", "title": "Phones", "remoteSPAUrl": "/a/b/c"},
+    )
+    monkeypatch.setattr(product_catalog_scraper, "fetch_json_data", fake_fetch_json_data)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_single_availability", lambda sku_id: "ON_ORDER")
+    monkeypatch.setattr(product_catalog_scraper, "save_to_excel", lambda data, filename: saved.update(data=data))
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "checkpoint_filename", None)
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "output_filename_template", "export.xlsx")
+
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "output_format", "excel")
+    product_catalog_scraper.main()
+
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "output_format", "jsonl")
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "write_chunk_size", 2)
+    product_catalog_scraper.main()
+
+    streamed = [json.loads(line) for line in (tmp_path / "export.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert streamed == saved["data"]
+    assert all(row["Availability Status"] == "Σε παραγγελία" for row in streamed)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["export.jsonl"]
@@ -0,0 +1,100 @@
+import json
+import os
+import signal
+
+import pytest
+
+import benchmark
+import parse_pool
+import product_catalog_scraper
+from mock_retailer import MockCatalog, MockRetailer
+
+
+PRODUCT = {
+    "uniqueID": "1001",
+    "singleSKUCatalogEntryID": "sku-1",
+    "partNumber": "P-1",
+    "shortDescription": "Phone",
+    "name": "Phone 1",
+    "manufacturer": "Acme",
+    "buyable": "true",
+    "UserData": [{"seo_url": "/phone-1", "ratings": [5, 4]}, {"seo_url": "/ignored"}],
+    "price": [
+        {"usage": "Display", "value": "199.00", "currency": "EUR"},
+        {"usage": "Offer", "value": "149.00", "currency": "EUR"},
+    ],
+    "attributes": [{"name": "color", "values": ["black"] * 20}],
+}
+
+
+@pytest.mark.parametrize(
+    "product",
+    [
+        PRODUCT,
+        {"uniqueID": "1002"},
+        {"uniqueID": "1003", "UserData": [], "price": []},
+        {"uniqueID": "1004", "UserData": ["not-a-dict"]},
+        {"uniqueID": "1005", "UserData": [{"other": 1}]},
+    ],
+)
+def test_compact_product_parses_like_the_full_product(product):
+    category = {"Category_Title": "Phones"}
+    full = product_catalog_scraper.parse_product_record(product, category, "https://shop.example/")
+    compact = product_catalog_scraper.parse_product_record(
+        parse_pool.compact_product(product), category, "https://shop.example/"
+    )
+
+    assert compact == full
+
+
+def test_compact_search_page_keeps_pagination_fields_and_drops_the_rest():
+    body = json.dumps(
+        {"recordSetTotal": "31", "recordSetStartNumber": "15", "facetView": [{"x": 1}], "catalogEntryView": [PRODUCT]}
+    ).encode()
+
+    page = parse_pool.compact_search_page(body, use_orjson=False)
+
+    assert set(page) == {"recordSetTotal", "recordSetStartNumber", "catalogEntryView"}
+    assert page["catalogEntryView"][0]["UserData"] == [{"seo_url": "/phone-1"}]
+    assert "attributes" not in page["catalogEntryView"][0]
+    assert parse_pool.compact_search_page(b'{"recordSetTotal": "0"}') == {
+        "recordSetTotal": "0",
+        "catalogEntryView": [],
+    }
+    with pytest.raises(ValueError):
+        parse_pool.compact_search_page(b"not json")
+
+
+def test_mock_retailer_run_with_parse_workers_exports_every_product(tmp_path):
+    catalog = MockCatalog(level_1=1, level_2=2, level_3=2, products_per_category=7)
+    overrides = {
+        "runtime": {"rate_limit": {"enabled": False}, "crawl_engine": "async", "parse_workers": 2},
+        "io": {"output_format": "jsonl"},
+    }
+
+    with MockRetailer(catalog) as retailer:
+        report = benchmark.run_benchmark(retailer, overrides, page_size=3, workdir=tmp_path)
+
+    assert report["catalog_products"] == report["exported_products"] == 28
+    assert retailer.request_counts["search"] == 12
+    assert parse_pool.get_pool() is None  # restoring the previous config shut the pool down
+
+
+def test_broken_pool_falls_back_to_decoding_in_the_fetching_thread(caplog):
+    body = json.dumps({"recordSetTotal": "1", "catalogEntryView": [PRODUCT]}).encode()
+    expected = parse_pool.compact_search_page(body, use_orjson=False)
+    pool = parse_pool.ParsePool(1, use_orjson=False)
+    try:
+        assert pool.decode_search_page(body) == expected
+        for process in list(pool._executor._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+            process.join()
+
+        assert pool.decode_search_page(body) == expected
+        assert pool.decode_search_page(body) == expected
+        assert pool.broken
+        assert caplog.text.count("Parse pool failed") == 1
+        with pytest.raises(ValueError):
+            pool.decode_search_page(b"not json")
+    finally:
+        pool.close()
@@ -0,0 +1,33 @@
+import json
+
+import benchmark
+import pipeline
+import product_catalog_scraper
+from mock_retailer import MockCatalog, MockRetailer
+
+
+def test_pipeline_crawls_categories_handed_off_by_stage_1(tmp_path, monkeypatch):
+    catalog = MockCatalog(level_1=1, level_2=2, level_3=2, products_per_category=7)
+    overrides = {
+        "runtime": {"rate_limit": {"enabled": False}, "crawl_engine": "async"},
+        "io": {
+            "output_format": "jsonl",
+            "menu_excel_filename": None,
+            "menu_handoff_filename": "category_menu.jsonl",
+        },
+    }
+    monkeypatch.chdir(tmp_path)
+    previous_config = product_catalog_scraper.CONFIG
+
+    with MockRetailer(catalog) as retailer:
+        product_catalog_scraper.configure(benchmark.build_config(retailer, overrides, page_size=3))
+        try:
+            pipeline.run_pipeline()
+        finally:
+            product_catalog_scraper.configure(previous_config)
+
+    with open(tmp_path / "benchmark_MockRetail.jsonl", "r", encoding="utf-8") as export_file:
+        rows = [json.loads(line) for line in export_file]
+    assert len(rows) == 28
+    assert (tmp_path / "category_menu.jsonl").exists()
+    assert not (tmp_path / "category_menu.xlsx").exists()
@@ -1,12 +1,15 @@
 import concurrent.futures
 import threading
+from urllib.parse import parse_qs, urlparse
 
 import pandas as pd
+import pytest
 
 import product_catalog_scraper
 
 
-def test_main_skips_rows_with_missing_or_invalid_aem_url(monkeypatch):
+@pytest.mark.parametrize("availability_mode", ["pipeline", "barrier"])
+def test_main_skips_rows_with_missing_or_invalid_aem_url(monkeypatch, availability_mode):
     input_df = pd.DataFrame(
         {
             "AEM_URL": [None, "", "   ", "/cat/phones/smartphones", 123],
@@ -48,9 +51,11 @@ def test_main_skips_rows_with_missing_or_invalid_aem_url(monkeypatch):
             }
         return {"catalogEntryView": []}
 
-    def fake_fetch_availability_statuses(sku_ids):
-        assert sku_ids == ["sku-1"]
-        return {"sku-1": "IMMEDIATELY_AVAILABLE"}
+    availability_calls = []
+
+    def fake_fetch_single_availability(sku_id):
+        availability_calls.append(sku_id)
+        return "IMMEDIATELY_AVAILABLE"
 
     def fake_save_to_excel(data, filename):
         saved["data"] = data
@@ -59,12 +64,14 @@ def test_main_skips_rows_with_missing_or_invalid_aem_url(monkeypatch):
     monkeypatch.setattr(product_catalog_scraper.pd, "read_excel", fake_read_excel)
     monkeypatch.setattr(product_catalog_scraper, "fetch_additional_info", fake_fetch_additional_info)
     monkeypatch.setattr(product_catalog_scraper, "fetch_json_data", fake_fetch_json_data)
-    monkeypatch.setattr(product_catalog_scraper, "fetch_availability_statuses", fake_fetch_availability_statuses)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_single_availability", fake_fetch_single_availability)
     monkeypatch.setattr(product_catalog_scraper, "save_to_excel", fake_save_to_excel)
+    monkeypatch.setitem(product_catalog_scraper.RUNTIME_CONFIG, "availability_mode", availability_mode)
 
     product_catalog_scraper.main(limit=None)
 
     assert additional_info_calls == [["cat", "phones", "smartphones"]]
+    assert availability_calls == ["sku-1"]
     assert len(saved["data"]) == 1
     assert saved["data"][0]["singleSKUCatalogEntryID"] == "sku-1"
     assert saved["data"][0]["Availability Status"] == "Άμεσα διαθέσιμο"
@@ -110,3 +117,297 @@ def test_fetch_availability_statuses_deduplicates_and_uses_bounded_workers(monke
         "sku-2": "STATUS-sku-2",
         "sku-3": "STATUS-sku-3",
     }
+
+
+def _run_main_with_fake_catalog(monkeypatch, crawl_engine, limit=None, global_concurrency=16):
+    input_df = pd.DataFrame(
+        {
+            "AEM_URL": [
+                "/cat/phones/smartphones",
+                None,
+                "/cat/audio/headphones",
+                "/cat/tv/televisions",
+            ],
+        }
+    )
+    pages_per_category = {"smartphones": 3, "headphones": 1, "televisions": 2}
+    saved = {}
+
+    def fake_fetch_additional_info(aem_url_parts):
+        return {
+            "categoryId": f"id-{aem_url_parts[-1]}",
+            "title": aem_url_parts[-1].title(),
+            "remoteSPAUrl": "/" + "/".join(aem_url_parts),
+        }
+
+    def fake_fetch_json_data(url, retries=None, timeout=None):
+        query = parse_qs(urlparse(url).query)
+        category_slug = urlparse(url).path.rstrip("/").split("/")[-1]
+        page_number = int(query["pageNumber"][0])
+        with availability_lock:
+            saved["pages"].append((category_slug, page_number))
+        if page_number > pages_per_category[category_slug]:
+            return {"catalogEntryView": []}
+        return {
+            "catalogEntryView": [
+                {
+                    "uniqueID": f"{category_slug}-{page_number}-{item}",
+                    "singleSKUCatalogEntryID": f"sku-{category_slug}-{page_number}-{item}",
+                    "name": f"Product {item}",
+                    "price": [{"usage": "Offer", "value": str(item)}],
+                }
+                for item in range(2)
+            ]
+        }
+
+    availability_lock = threading.Lock()
+    saved["sku_ids"] = []
+    saved["pages"] = []
+
+    def fake_fetch_single_availability(sku_id):
+        with availability_lock:
+            saved["sku_ids"].append(sku_id)
+        return "LAST_PIECES"
+
+    def fake_save_to_excel(data, filename):
+        saved["data"] = data
+
+    monkeypatch.setattr(product_catalog_scraper.pd, "read_excel", lambda *args, **kwargs: input_df)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_additional_info", fake_fetch_additional_info)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_json_data", fake_fetch_json_data)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_single_availability", fake_fetch_single_availability)
+    monkeypatch.setattr(product_catalog_scraper, "save_to_excel", fake_save_to_excel)
+    monkeypatch.setitem(product_catalog_scraper.RUNTIME_CONFIG, "crawl_engine", crawl_engine)
+    monkeypatch.setitem(product_catalog_scraper.RUNTIME_CONFIG, "global_concurrency", global_concurrency)
+
+    product_catalog_scraper.main(limit=limit)
+    return saved
+
+
+def test_async_engine_produces_same_rows_as_serial_loop(monkeypatch):
+    serial = _run_main_with_fake_catalog(monkeypatch, "serial")
+    concurrent_run = _run_main_with_fake_catalog(monkeypatch, "async")
+
+    assert len(serial["data"]) == 12
+    assert concurrent_run["data"] == serial["data"]
+    assert sorted(concurrent_run["sku_ids"]) == sorted(serial["sku_ids"])
+    assert all(row["Availability Status"] == "Τελευταία τεμάχια" for row in serial["data"])
+
+
+def test_async_engine_respects_product_limit_like_serial_loop(monkeypatch):
+    serial = _run_main_with_fake_catalog(monkeypatch, "serial", limit=7)
+    concurrent_run = _run_main_with_fake_catalog(monkeypatch, "async", limit=7)
+
+    assert len(serial["data"]) == 8
+    assert concurrent_run["data"] == serial["data"]
+    # Only the exported products are looked up, and later categories stop early.
+    assert sorted(concurrent_run["sku_ids"]) == sorted(serial["sku_ids"])
+    assert len(serial["sku_ids"]) == 8
+
+    one_at_a_time = _run_main_with_fake_catalog(monkeypatch, "async", limit=7, global_concurrency=1)
+    assert one_at_a_time["data"] == serial["data"]
+    assert sorted(one_at_a_time["pages"]) == sorted(serial["pages"])
+
+
+def test_async_crawl_streams_categories_in_order_while_later_ones_run(monkeypatch):
+    release_last = threading.Event()
+    started = []
+
+    def fake_fetch_json_data(url, retries=None, timeout=None):
+        category_slug = urlparse(url).path.rstrip("/").split("/")[-1]
+        page_number = int(parse_qs(urlparse(url).query)["pageNumber"][0])
+        if page_number == 1:
+            started.append(category_slug)
+        if category_slug == "c" and not release_last.wait(timeout=5):
+            raise AssertionError("category c was not released")
+        if page_number > 1:
+            return {"catalogEntryView": []}
+        return {"catalogEntryView": [{"uniqueID": category_slug}]}
+
+    monkeypatch.setattr(product_catalog_scraper, "fetch_additional_info", lambda parts: {"title": parts[-1]})
+    monkeypatch.setattr(product_catalog_scraper, "fetch_json_data", fake_fetch_json_data)
+    monkeypatch.setitem(product_catalog_scraper.RUNTIME_CONFIG, "global_concurrency", 2)
+    jobs = [(index, ["cat", slug]) for index, slug in enumerate(["a", "b", "c", "d"])]
+
+    results = product_catalog_scraper.crawl_categories_async(jobs, len(jobs))
+    first = next(results)
+    assert first[1] == [[{"uniqueID": "a"}]]
+    # Only a window of categories runs ahead of the consumer, so "d" waits for a free slot.
+    assert "d" not in started
+    release_last.set()
+    rest = list(results)
+
+    assert [pages[0][0]["uniqueID"] for _, pages in rest] == ["b", "c", "d"]
+
+
+def test_async_crawl_keeps_fetching_while_consumer_is_blocked(monkeypatch):
+    fetched = []
+    all_fetched = threading.Event()
+
+    def fake_fetch_json_data(url, retries=None, timeout=None):
+        category_slug = urlparse(url).path.rstrip("/").split("/")[-1]
+        page_number = int(parse_qs(urlparse(url).query)["pageNumber"][0])
+        fetched.append((category_slug, page_number))
+        if len(fetched) == 6:
+            all_fetched.set()
+        if page_number > 2:
+            return {"catalogEntryView": []}
+        return {"catalogEntryView": [{"uniqueID": f"{category_slug}-{page_number}"}]}
+
+    monkeypatch.setattr(product_catalog_scraper, "fetch_additional_info", lambda parts: {})
+    monkeypatch.setattr(product_catalog_scraper, "fetch_json_data", fake_fetch_json_data)
+    monkeypatch.setitem(product_catalog_scraper.RUNTIME_CONFIG, "global_concurrency", 2)
+    jobs = [(0, ["cat", "a"]), (1, ["cat", "b"])]
+
+    results = product_catalog_scraper.crawl_categories_async(jobs, len(jobs))
+    next(results)
+    # The consumer is now "blocked" (e.g. on a full availability queue); "b" must still finish.
+    assert all_fetched.wait(timeout=5)
+    assert [pages for _, pages in results] == [[[{"uniqueID": "b-1"}], [{"uniqueID": "b-2"}]]]
+
+
+def test_category_records_share_category_fields_and_match_dict_rows():
+    category = product_catalog_scraper.category_fields(
+        {"Category_ID_number": "c1", "Category_Title": "Phones", "Category_URL": "/electronics/phones/"}
+    )
+    products = [
+        {
+            "uniqueID": "u1",
+            "singleSKUCatalogEntryID": "sku-1",
+            "UserData": [{"seo_url": "/p/phone-1"}],
+            "price": [{"usage": "Display", "value": "20"}, {"usage": "Offer", "value": "15"}],
+        },
+        {"uniqueID": "u2", "UserData": ["not-a-dict"], "price": []},
+    ]
+
+    records = product_catalog_scraper.parse_category_records(products, category)
+
+    assert all(record.category is category for record in records)
+    assert not hasattr(records[0], "__dict__")
+    base_url = product_catalog_scraper.SITE_CONFIG["web_base_url"].rstrip("/")
+    assert records[0].as_row() == {
+        "Category_ID_number": "c1",
+        "Category_Title": "Phones",
+        "Category_URL": "/electronics/phones/",
+        "uniqueID": "u1",
+        "singleSKUCatalogEntryID": "sku-1",
+        "partNumber": "N/A",
+        "shortDescription": "N/A",
+        "name": "N/A",
+        "manufacturer": "N/A",
+        "buyable": "N/A",
+        "Level 1": "electronics",
+        "Level 2": "phones",
+        "Level 3": None,
+        "Link": f"{base_url}/p/phone-1",
+        "Original_Price": "20",
+        "Current_Price": "15",
+    }
+    assert records[1].product_fields() == {
+        **dict.fromkeys(product_catalog_scraper.PRODUCT_RECORD_KEYS, "N/A"),
+        "uniqueID": "u2",
+        "Link": f"{base_url}/N/A",
+    }
+    assert list(records[0].as_row()) == product_catalog_scraper.OUTPUT_COLUMNS[:-1]
+
+
+def _fake_search(monkeypatch, pages, record_set_total=None, failing_pages=()):
+    """Serve ``pages`` products per page of category "c" and record the requested page numbers."""
+    requested = []
+    lock = threading.Lock()
+
+    def fake_fetch_json_data(url, retries=None, timeout=None):
+        page_number = int(parse_qs(urlparse(url).query)["pageNumber"][0])
+        with lock:
+            requested.append(page_number)
+        if page_number in failing_pages:
+            return None
+        products = [{"uniqueID": f"p{page_number}-{item}"} for item in range(pages.get(page_number, 0))]
+        data = {"catalogEntryView": products}
+        if record_set_total is not None:
+            data["recordSetTotal"] = str(record_set_total)
+        return data
+
+    monkeypatch.setattr(product_catalog_scraper, "fetch_json_data", fake_fetch_json_data)
+    monkeypatch.setitem(product_catalog_scraper.API_CONFIG, "page_size", 2)
+    return requested
+
+
+def test_pagination_with_record_set_total_fetches_known_pages_in_parallel_batches(monkeypatch):
+    requested = _fake_search(monkeypatch, {1: 2, 2: 2, 3: 2, 4: 2, 5: 1}, record_set_total=9, failing_pages={3})
+    monkeypatch.setitem(product_catalog_scraper.RUNTIME_CONFIG, "parallel_pages", 3)
+
+    pagination = product_catalog_scraper.CategoryPagination("c")
+    assert pagination.next_batch(3) == [1]
+    pages = list(product_catalog_scraper.iter_category_pages("c"))
+
+    # Page 3 failed once and is skipped like in a page-by-page walk; the short page 5 ends the category.
+    assert [page[0]["uniqueID"] for page in pages] == ["p1-0", "p2-0", "p4-0", "p5-0"]
+    assert sorted(requested) == [1, 2, 3, 4, 5]
+
+
+def test_speculative_pagination_keeps_failure_and_end_semantics(monkeypatch):
+    requested = _fake_search(monkeypatch, {1: 2, 2: 2})
+    monkeypatch.setitem(product_catalog_scraper.RUNTIME_CONFIG, "speculative_pages", 3)
+
+    pages = list(product_catalog_scraper.iter_category_pages("c"))
+
+    assert [page[0]["uniqueID"] for page in pages] == ["p1-0", "p2-0"]
+    # Pages 2-4 are fetched together: the empty page 3 ends the category and page 4 is dropped.
+    assert sorted(requested) == [1, 2, 3, 4]
+
+    aborted = []
+    _fake_search(monkeypatch, {1: 2, 2: 2, 6: 2}, failing_pages={3, 4, 5})
+    state = product_catalog_scraper.CrawlState()
+    monkeypatch.setattr(state, "record_category_aborted", aborted.append)
+
+    pages = list(product_catalog_scraper.iter_category_pages("c", state, "c"))
+
+    # Three failures in a row abort the category even though they span two batches.
+    assert [page[0]["uniqueID"] for page in pages] == ["p1-0", "p2-0"]
+    assert aborted == ["c"]
+
+
+def test_columnar_postprocess_matches_row_output(monkeypatch, tmp_path):
+    categories = [
+        product_catalog_scraper.category_fields(
+            {"Category_ID_number": "c1", "Category_Title": "Phones", "Category_URL": "/electronics/phones/smart"}
+        ),
+        product_catalog_scraper.category_fields(
+            {"Category_ID_number": "c2", "Category_Title": "N/A", "Category_URL": "N/A"}
+        ),
+    ]
+    products = [
+        {"uniqueID": "u1", "singleSKUCatalogEntryID": "sku-1", "price": [{"usage": "Offer", "value": "9"}]},
+        {"uniqueID": "u2", "singleSKUCatalogEntryID": "sku-2", "buyable": True},
+        {"uniqueID": "u3", "singleSKUCatalogEntryID": ""},
+        {"uniqueID": "u4"},
+        {"uniqueID": "u5", "singleSKUCatalogEntryID": "sku-5"},
+    ]
+    records = [
+        *product_catalog_scraper.parse_category_records(products[:3], categories[0]),
+        *product_catalog_scraper.parse_category_records(products[2:], categories[1]),
+    ]
+    statuses = {"sku-1": "LAST_PIECES", "sku-2": "UNKNOWN_STATUS", "": "EXHAUSTED", "sku-5": "N/A"}
+
+    rows = [record.as_row() for record in records]
+    product_catalog_scraper.apply_availability(rows, statuses)
+    frame = product_catalog_scraper.build_output_frame(records, statuses)
+
+    assert list(frame.columns) == product_catalog_scraper.OUTPUT_COLUMNS
+    assert frame["Category_Title"].dtype == "category"
+    assert frame["Availability Status"].dtype == "category"
+    assert next(product_catalog_scraper.iter_frame_rows(frame, 100)) == rows
+
+    frame.to_excel(tmp_path / "columnar.xlsx", index=False)
+    pd.DataFrame(rows).to_excel(tmp_path / "rows.xlsx", index=False)
+    pd.testing.assert_frame_equal(pd.read_excel(tmp_path / "columnar.xlsx"), pd.read_excel(tmp_path / "rows.xlsx"))
+
+
+def test_main_columnar_postprocess_saves_same_table(monkeypatch):
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "postprocess", "columnar")
+    columnar = _run_main_with_fake_catalog(monkeypatch, "serial")
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "postprocess", "rows")
+    serial = _run_main_with_fake_catalog(monkeypatch, "serial")
+
+    assert next(product_catalog_scraper.iter_frame_rows(columnar["data"], 100)) == serial["data"]
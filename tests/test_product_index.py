@@ -0,0 +1,101 @@
+import csv
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+import product_catalog_scraper
+from product_index import ProductIndex
+
+
+def test_index_parses_shared_products_once_and_keeps_listing_order():
+    parsed = []
+
+    def parse_product(product):
+        parsed.append(product.get("uniqueID"))
+        return {"uniqueID": product.get("uniqueID")}
+
+    index = ProductIndex()
+    phones = index.add_category({"Category_Title": "Phones"})
+    deals = index.add_category({"Category_Title": "Deals"})
+    index.add_products([{"uniqueID": "p1"}, {"uniqueID": "p2"}], phones, parse_product)
+    index.add_products([{"uniqueID": "p2"}, {}, {}], deals, parse_product)
+
+    assert parsed == ["p1", "p2", None, None]
+    assert len(index.products) == 4  # products without a uniqueID are never merged
+    assert index.duplicate_listings == 1
+    assert [(category["Category_Title"], product.get("uniqueID")) for category, product in index.iter_listings()] == [
+        ("Phones", "p1"),
+        ("Phones", "p2"),
+        ("Deals", "p2"),
+        ("Deals", None),
+        ("Deals", None),
+    ]
+
+
+def _run_main(monkeypatch, tmp_path, product_index, output_format="excel"):
+    input_df = pd.DataFrame({"AEM_URL": ["/cat/phones/smartphones", "/cat/deals/weekly"]})
+    listings = {
+        "smartphones": [
+            {"uniqueID": "p1", "singleSKUCatalogEntryID": "s1"},
+            {"uniqueID": "p2", "singleSKUCatalogEntryID": "s2"},
+        ],
+        "weekly": [{"uniqueID": "p2", "singleSKUCatalogEntryID": "s2"}],
+    }
+    saved = {}
+
+    def fake_fetch_json_data(url, retries=None, timeout=None):
+        category_slug = urlparse(url).path.rstrip("/").split("/")[-1]
+        page_number = int(parse_qs(urlparse(url).query)["pageNumber"][0])
+        return {"catalogEntryView": listings[category_slug] if page_number == 1 else []}
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(product_catalog_scraper.pd, "read_excel", lambda *args, **kwargs: input_df)
+    monkeypatch.setattr(
+        product_catalog_scraper,
+        "fetch_additional_info",
+        lambda parts: {"categoryId": parts[-1], "title": parts[-1], "remoteSPAUrl": "/" + "/".join(parts)},
+    )
+    monkeypatch.setattr(product_catalog_scraper, "fetch_json_data", fake_fetch_json_data)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_single_availability", lambda sku_id: "LAST_PIECES")
+    monkeypatch.setattr(
+        product_catalog_scraper, "save_to_excel", lambda data, filename: saved.update(data=data, filename=filename)
+    )
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "checkpoint_filename", None)
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "output_filename_template", "export.xlsx")
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "output_format", output_format)
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "product_index", product_index)
+    product_catalog_scraper.main()
+    return saved
+
+
+@pytest.mark.parametrize("output_format", ["excel", "csv"])
+def test_denormalized_index_export_matches_plain_export(monkeypatch, tmp_path, output_format):
+    plain = _run_main(monkeypatch, tmp_path, "off", output_format)
+    plain_file = (tmp_path / "export.csv").read_text() if output_format == "csv" else None
+    indexed = _run_main(monkeypatch, tmp_path, "denormalized", output_format)
+
+    if output_format == "excel":
+        assert len(plain["data"]) == 3
+        assert indexed["data"] == plain["data"]
+    else:
+        assert (tmp_path / "export.csv").read_text() == plain_file
+
+
+def test_normalized_index_export_writes_products_and_memberships(monkeypatch, tmp_path):
+    _run_main(monkeypatch, tmp_path, "normalized", "csv")
+
+    with open(tmp_path / "export_products.csv", encoding="utf-8", newline="") as products_file:
+        products = list(csv.DictReader(products_file))
+    with open(tmp_path / "export_product_categories.csv", encoding="utf-8", newline="") as memberships_file:
+        memberships = list(csv.DictReader(memberships_file))
+
+    assert [(row["uniqueID"], row["Availability Status"]) for row in products] == [
+        ("p1", "Τελευταία τεμάχια"),
+        ("p2", "Τελευταία τεμάχια"),
+    ]
+    assert [(row["uniqueID"], row["Category_ID_number"], row["Level 2"]) for row in memberships] == [
+        ("p1", "smartphones", "phones"),
+        ("p2", "smartphones", "phones"),
+        ("p2", "weekly", "deals"),
+    ]
@@ -0,0 +1,131 @@
+import requests
+
+import http_client
+import rate_limiter
+
+
+def test_endpoint_limiter_backs_off_multiplicatively_and_recovers_additively():
+    limiter = rate_limiter.EndpointLimiter(
+        "search",
+        {**rate_limiter.DEFAULT_RATE_LIMIT, "initial_rate": 10.0, "initial_concurrency": 8},
+    )
+
+    limiter.on_throttle()
+    assert limiter.bucket.rate == 5.0
+    assert limiter.concurrency.limit == 4.0
+
+    for _ in range(10):
+        limiter.on_success()
+    assert 6.5 < limiter.bucket.rate < 7.5
+    assert 5.0 < limiter.concurrency.limit < 7.0
+    assert limiter.summary()["throttled"] == 1
+
+
+def test_circuit_breaker_opens_and_half_opens_after_timeout(monkeypatch):
+    now = {"value": 100.0}
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now["value"])
+    breaker = rate_limiter.CircuitBreaker("www.example.test", failure_threshold=2, reset_timeout=10)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow(timeout=0)
+
+    now["value"] += 10
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_half_open_trial_answered_with_client_error_closes_circuit(monkeypatch):
+    now = {"value": 0.0}
+    statuses = [500, 404, 200]
+    requested = []
+
+    class FakeResponse:
+        def __init__(self, status_code):
+            self.status_code = status_code
+            self.headers = {}
+            self.content = b'{"availableStatusKey": "LAST_PIECES"}'
+
+        def raise_for_status(self):
+            if self.status_code >= 400:
+                raise requests.HTTPError(f"{self.status_code}", response=self)
+
+        def json(self):
+            return {"availableStatusKey": "LAST_PIECES"}
+
+    class FakeSession:
+        def get(self, url, timeout=None):
+            requested.append(url)
+            return FakeResponse(statuses[len(requested) - 1])
+
+    http_client.configure(
+        {"request_retries": 1, "circuit_breaker": {"failure_threshold": 1, "reset_timeout": 10}}
+    )
+    monkeypatch.setattr(http_client, "get_session", lambda: FakeSession())
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now["value"])
+    breaker = rate_limiter.get_breaker("www.example.test")
+
+    assert http_client.fetch_json_data("https://www.example.test/api/availability/sku-1") is None
+    assert breaker.state == "open"
+
+    now["value"] += 10
+    assert http_client.fetch_json_data("https://www.example.test/api/availability/delisted") is None
+    assert breaker.state == "closed"
+    assert http_client.fetch_json_data("https://www.example.test/api/availability/sku-2") is not None
+    assert len(requested) == 3
+
+
+def test_parse_retry_after_accepts_seconds_and_rejects_garbage():
+    assert rate_limiter.parse_retry_after("3") == 3.0
+    assert rate_limiter.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert rate_limiter.parse_retry_after("soon") is None
+    assert rate_limiter.parse_retry_after(None) is None
+
+
+def test_fetch_json_data_honours_retry_after_on_throttling(monkeypatch):
+    sleeps = []
+    responses = []
+    now = {"value": 0.0}
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        now["value"] += seconds
+
+    class FakeResponse:
+        def __init__(self, status_code, headers=None):
+            self.status_code = status_code
+            self.headers = headers or {}
+            self.content = b'{"availableStatusKey": "LAST_PIECES"}'
+
+        def raise_for_status(self):
+            if self.status_code >= 400:
+                raise requests.HTTPError(f"{self.status_code}", response=self)
+
+        def json(self):
+            return {"availableStatusKey": "LAST_PIECES"}
+
+    class FakeSession:
+        def get(self, url, timeout=None):
+            response = FakeResponse(429, {"Retry-After": "2"}) if not responses else FakeResponse(200)
+            responses.append(response)
+            return response
+
+    http_client.configure({"request_retries": 3, "rate_limit": {"initial_rate": 8.0}})
+    http_client.register_endpoint("availability", "https://www.example.test/api/availability/{sku_id}")
+    monkeypatch.setattr(http_client, "get_session", lambda: FakeSession())
+    monkeypatch.setattr(http_client.time, "sleep", fake_sleep)
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now["value"])
+
+    data = http_client.fetch_json_data("https://www.example.test/api/availability/sku-1")
+
+    limiter = rate_limiter.get_limiter("availability")
+    assert data == {"availableStatusKey": "LAST_PIECES"}
+    assert [response.status_code for response in responses] == [429, 200]
+    assert limiter.throttled == 1
+    assert limiter.bucket.rate < 8.0
+    assert max(sleeps) >= 2.0
+    assert rate_limiter.get_breaker("www.example.test").state == "closed"
@@ -0,0 +1,76 @@
+import json
+
+import http_client
+import response_cache
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b"", headers=None):
+        self.status_code = status_code
+        self.content = body
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def test_cache_evicts_least_recently_used_entries(tmp_path):
+    cache = response_cache.ResponseCache(tmp_path / "cache.sqlite", max_bytes=10)
+    cache.put("https://a", b"1234")
+    cache.put("https://b", b"1234")
+    assert cache.get("https://a") is not None  # "b" is now the least recently used
+    cache.put("https://c", b"1234")
+
+    assert cache.get("https://b") is None
+    assert cache.get("https://a").body == b"1234"
+    assert cache.get("https://c").body == b"1234"
+    cache.close()
+
+
+def test_opted_in_endpoint_is_served_fresh_then_revalidated(monkeypatch, tmp_path):
+    requests_seen = []
+    now = {"value": 1000.0}
+
+    class FakeSession:
+        def get(self, url, timeout=None, headers=None):
+            requests_seen.append((url, headers))
+            if headers and headers.get("If-None-Match") == '"v1"':
+                return FakeResponse(304)
+            return FakeResponse(
+                200, b'{"title": "Phones"}', {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+            )
+
+    http_client.configure(
+        {
+            "response_cache": {
+                "path": str(tmp_path / "cache.sqlite"),
+                "endpoints": {"model": {"ttl": 60}},
+            }
+        }
+    )
+    http_client.register_endpoint("model", "https://content.example.test/products/{aem_path}.model.json")
+    http_client.register_endpoint("search", "https://www.example.test/search/{category_slug}")
+    monkeypatch.setattr(http_client, "get_session", lambda: FakeSession())
+    monkeypatch.setattr(http_client.time, "time", lambda: now["value"])
+    monkeypatch.setattr(response_cache.time, "time", lambda: now["value"])
+
+    model_url = "https://content.example.test/products/cat/phones.model.json"
+    assert http_client.fetch_json_data(model_url) == {"title": "Phones"}
+    assert http_client.fetch_json_data(model_url) == {"title": "Phones"}
+    now["value"] += 120
+    assert http_client.fetch_json_data(model_url) == {"title": "Phones"}
+    assert http_client.fetch_json_data("https://www.example.test/search/phones") == {"title": "Phones"}
+    assert http_client.fetch_json_data("https://www.example.test/search/phones") == {"title": "Phones"}
+
+    assert requests_seen == [
+        (model_url, None),
+        (model_url, {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}),
+        ("https://www.example.test/search/phones", None),
+        ("https://www.example.test/search/phones", None),
+    ]
+    cache, _ = response_cache.cache_for("model")
+    assert (cache.hits, cache.revalidated, cache.misses) == (1, 1, 1)
+    http_client.configure({})
@@ -0,0 +1,114 @@
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from scheduler import CategoryStats, Deadline, schedule_jobs
+import product_catalog_scraper
+
+
+def record_category(stats, key, pages, first_page):
+    for page_number in range(1, pages + 1):
+        stats.record_page(key, page_number, [{}], first_page if page_number == 1 else None)
+    stats.record_category_done(key)
+
+
+def test_stats_keep_sizes_and_change_times(tmp_path, monkeypatch):
+    stats = CategoryStats(tmp_path / "stats.sqlite")
+    monkeypatch.setattr("scheduler.time.time", lambda: 100.0)
+    record_category(stats, "a/b/small", 1, {"v": 1})
+    record_category(stats, "a/b/large", 5, {"v": 1})
+    monkeypatch.setattr("scheduler.time.time", lambda: 200.0)
+    record_category(stats, "a/b/small", 2, {"v": 2})
+    record_category(stats, "a/b/large", 5, {"v": 1})
+
+    history = stats.load()
+
+    assert history["a/b/small"] == {"pages": 2, "products": 2, "changed_at": 200.0, "crawled_at": 200.0}
+    assert history["a/b/large"] == {"pages": 5, "products": 5, "changed_at": 100.0, "crawled_at": 200.0}
+
+
+def test_schedule_orders_by_priority_then_expected_size_or_staleness():
+    jobs = [(0, ["x", "small"]), (1, ["x", "new"]), (2, ["x", "large"]), (3, ["x", "vip"])]
+    history = {
+        "x/small": {"pages": 1, "products": 10, "changed_at": 50.0, "crawled_at": 300.0},
+        "x/large": {"pages": 9, "products": 90, "changed_at": 10.0, "crawled_at": 100.0},
+        "x/vip": {"pages": 1, "products": 10, "changed_at": 10.0, "crawled_at": 200.0},
+    }
+    priorities = {"vip": 5}
+
+    lpt = schedule_jobs(jobs, history, priorities, order="lpt")
+    stale = schedule_jobs(jobs, history, priorities, order="stale")
+
+    # "new" has no history and counts as median-sized (1 page), tying with "small" but never changed.
+    assert [job[0] for job in lpt] == [3, 2, 0, 1]
+    assert [job[0] for job in stale] == [3, 1, 2, 0]
+
+
+def test_deadline_stops_new_categories_and_exports_what_was_crawled(monkeypatch, tmp_path):
+    input_df = pd.DataFrame({"AEM_URL": ["/cat/phones/smartphones", "/cat/audio/headphones"]})
+    catalog = {
+        "smartphones": [[{"uniqueID": "p1", "singleSKUCatalogEntryID": "s1"}]],
+        "headphones": [[{"uniqueID": "h1", "singleSKUCatalogEntryID": "t1"}]] * 4,
+    }
+    fetched = []
+    saved = {}
+
+    def fake_fetch_json_data(url, retries=None, timeout=None):
+        category_slug = urlparse(url).path.rstrip("/").split("/")[-1]
+        page_number = int(parse_qs(urlparse(url).query)["pageNumber"][0])
+        fetched.append(category_slug)
+        pages = catalog[category_slug]
+        return {"catalogEntryView": pages[page_number - 1] if page_number <= len(pages) else []}
+
+    class OneCategoryDeadline(Deadline):
+        def check(self):
+            self.reached = fetched != []
+            return self.reached
+
+    stats_path = tmp_path / "stats.sqlite"
+    stats = CategoryStats(stats_path)
+    record_category(stats, "cat/audio/headphones", 4, {"v": 1})
+    stats.close()
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(product_catalog_scraper.pd, "read_excel", lambda *args, **kwargs: input_df)
+    monkeypatch.setattr(
+        product_catalog_scraper,
+        "fetch_additional_info",
+        lambda parts: {"categoryId": parts[-1], "title": parts[-1], "remoteSPAUrl": "/" + "/".join(parts)},
+    )
+    monkeypatch.setattr(product_catalog_scraper, "fetch_json_data", fake_fetch_json_data)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_single_availability", lambda sku_id: "LAST_PIECES")
+    monkeypatch.setattr(product_catalog_scraper, "save_to_excel", lambda data, filename: saved.update(data=data))
+    monkeypatch.setattr(product_catalog_scraper, "Deadline", OneCategoryDeadline)
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "checkpoint_filename", str(tmp_path / "run.jsonl"))
+    monkeypatch.setitem(product_catalog_scraper.API_CONFIG, "page_size", 1)
+    monkeypatch.setitem(
+        product_catalog_scraper.CONFIG, "schedule", {"enabled": True, "stats_filename": str(stats_path)}
+    )
+
+    product_catalog_scraper.main(deadline_seconds=60)
+
+    # The larger category is scheduled first; the deadline keeps the other one from starting.
+    assert set(fetched) == {"headphones"}
+    assert [row["uniqueID"] for row in saved["data"]] == ["h1"] * 4
+    assert (tmp_path / "run.jsonl").exists()
+
+
+def test_streamed_jobs_keep_arrival_order_without_draining_the_stream(tmp_path, caplog):
+    stats = CategoryStats(tmp_path / "stats.sqlite")
+    record_category(stats, "x/large", 9, {"v": 1})
+    pulled = []
+
+    def stream():
+        for job in [(0, ["x", "small"]), (1, ["x", "large"])]:
+            pulled.append(job[0])
+            yield job
+
+    try:
+        jobs = product_catalog_scraper.scheduled_jobs(stream(), stats, streamed=True)
+        assert pulled == []  # nothing is read from stage 1 before crawling asks for it
+        assert [job[0] for job in jobs] == [0, 1]
+        assert "schedule ordering is skipped" in caplog.text
+    finally:
+        stats.close()
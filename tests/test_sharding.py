@@ -0,0 +1,88 @@
+from urllib.parse import parse_qs, urlparse
+import threading
+
+import pandas as pd
+
+import product_catalog_scraper
+import sharding
+
+
+def _fake_catalog(monkeypatch, tmp_path, failing_pages=()):
+    input_df = pd.DataFrame({"AEM_URL": ["/cat/phones/smartphones", None, "/cat/audio/headphones", "/cat/tv/tvs"]})
+    pages_per_category = {"smartphones": 3, "headphones": 1, "tvs": 2}
+    lock = threading.Lock()
+    saved = {"sku_ids": [], "exports": []}
+
+    def fake_fetch_json_data(url, retries=None, timeout=None):
+        category_slug = urlparse(url).path.rstrip("/").split("/")[-1]
+        page_number = int(parse_qs(urlparse(url).query)["pageNumber"][0])
+        if (category_slug, page_number) in failing_pages:
+            return None
+        if page_number > pages_per_category[category_slug]:
+            return {"catalogEntryView": []}
+        return {
+            "catalogEntryView": [
+                {
+                    "uniqueID": f"{category_slug}-{page_number}-{item}",
+                    # Every category lists the shared product once.
+                    "singleSKUCatalogEntryID": "sku-shared" if item == 0 else f"sku-{category_slug}-{page_number}",
+                    "name": f"Product {item}",
+                }
+                for item in range(2)
+            ]
+        }
+
+    def fake_fetch_single_availability(sku_id):
+        with lock:
+            saved["sku_ids"].append(sku_id)
+        return "LAST_PIECES"
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(product_catalog_scraper.pd, "read_excel", lambda *args, **kwargs: input_df)
+    monkeypatch.setattr(
+        product_catalog_scraper, "fetch_additional_info", lambda parts: {"title": parts[-1], "categoryId": parts[-1]}
+    )
+    monkeypatch.setattr(product_catalog_scraper, "fetch_json_data", fake_fetch_json_data)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_single_availability", fake_fetch_single_availability)
+    monkeypatch.setattr(
+        product_catalog_scraper, "save_to_excel", lambda data, filename: saved["exports"].append(list(data))
+    )
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "checkpoint_filename", None)
+    monkeypatch.setitem(
+        product_catalog_scraper.CONFIG,
+        "sharding",
+        {"shard_dir": str(tmp_path / "shards"), "lease_timeout": 60, "poll_interval": 0, "sku_batch_size": 2},
+    )
+    return saved
+
+
+def test_sharded_run_matches_single_process_export(monkeypatch, tmp_path):
+    saved = _fake_catalog(monkeypatch, tmp_path)
+    product_catalog_scraper.main()
+    single_process_rows = saved["exports"].pop()
+    saved["sku_ids"].clear()
+
+    assert sharding.coordinate() == 3
+    assert sharding.coordinate() == 0
+    # A worker that leased the first category and died: its lease expires and another worker takes it.
+    queue = sharding.open_queue({**sharding.sharding_config(), "lease_timeout": -1})
+    assert queue.lease("dead-worker")[2]["aem_url_parts"] == ["cat", "phones", "smartphones"]
+    queue.close()
+    assert sharding.work("worker-a") > 0
+    assert sharding.merge() is not None
+
+    assert saved["exports"] == [single_process_rows]
+    assert sorted(saved["sku_ids"]) == sorted(set(saved["sku_ids"]))
+    assert not (tmp_path / "shards").exists()
+
+
+def test_category_cut_short_by_page_failures_is_retried_then_failed(monkeypatch, tmp_path):
+    saved = _fake_catalog(monkeypatch, tmp_path, failing_pages={("tvs", 1), ("tvs", 2), ("tvs", 3)})
+
+    sharding.coordinate()
+    sharding.work("worker-a")
+    sharding.merge()
+
+    rows = saved["exports"].pop()
+    assert {row["Category_Title"] for row in rows} == {"smartphones", "headphones"}
+    assert (tmp_path / "shards" / "queue.sqlite").exists()
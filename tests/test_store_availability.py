@@ -0,0 +1,147 @@
+import threading
+
+import pandas as pd
+
+from memory_budget import SpillStore
+import product_catalog_scraper
+from store_availability import StoreAvailabilityFetcher, write_store_availability
+
+
+def test_each_sku_and_store_is_requested_once_through_a_shared_pool():
+    requested = []
+    lock = threading.Lock()
+
+    def fake_fetch_json(url):
+        with lock:
+            requested.append(url)
+        sku_id, store_id = url.split("/")
+        return None if sku_id == "sku-bad" else {"availableStatusKey": f"{sku_id}@{store_id}"}
+
+    fetcher = StoreAvailabilityFetcher(fake_fetch_json, "{sku_id}/{store_id}", ["s1", 2], workers=4)
+    fetcher.submit_many(["sku-1", "sku-2", None, float("nan")])
+    fetcher.submit_many(["sku-2", "sku-1", "sku-bad"])
+    statuses = fetcher.close()
+
+    expected = [f"{sku_id}/{store_id}" for sku_id in ["sku-1", "sku-2", "sku-bad"] for store_id in ["s1", "2"]]
+    assert sorted(requested) == sorted(expected)
+    assert fetcher.sku_ids == ["sku-1", "sku-2", "sku-bad"]
+    assert statuses[("sku-2", "2")] == "sku-2@2"
+    assert statuses[("sku-bad", "s1")] == "N/A"
+
+
+def test_batched_lookups_buffer_skus_per_store_and_flush_on_close():
+    requested = []
+
+    def fake_fetch_json(url):
+        requested.append(url)
+        store_id, sku_ids = url.split("?skus=")
+        # "b" is missing from the response and counts as a failed lookup.
+        return [
+            {"id": sku_id, "availableStatusKey": f"OK-{store_id}"} for sku_id in sku_ids.split(",") if sku_id != "b"
+        ]
+
+    fetcher = StoreAvailabilityFetcher(
+        fake_fetch_json,
+        "{sku_id}/{store_id}",
+        ["s1", "s2"],
+        workers=1,
+        batch_template="{store_id}?skus={sku_ids}",
+        batch_size=2,
+        batch_sku_field="id",
+    )
+    fetcher.submit_many(["a", "b", "c"])
+    statuses = fetcher.close()
+
+    assert sorted(requested) == ["s1?skus=a,b", "s1?skus=c", "s2?skus=a,b", "s2?skus=c"]
+    assert statuses[("a", "s2")] == "OK-s2"
+    assert statuses[("b", "s1")] == "N/A"
+
+
+def test_spilled_fetcher_keeps_sku_order_and_statuses_on_disk(tmp_path):
+    fetcher = StoreAvailabilityFetcher(
+        lambda url: {"availableStatusKey": url}, "{sku_id}/{store_id}", ["s1"], workers=1
+    )
+    fetcher.submit_many(["sku-2", "sku-1"])
+    store = SpillStore(tmp_path)
+    try:
+        fetcher.spill(store.set("store_sku_ids"), store.dict("store_statuses", tuple_keys=True))
+        fetcher.submit_many(["sku-1", "sku-3"])
+        statuses = fetcher.close()
+
+        assert list(fetcher.sku_ids) == ["sku-2", "sku-1", "sku-3"]
+        expected = {(sku_id, "s1"): f"{sku_id}/s1" for sku_id in ["sku-2", "sku-1", "sku-3"]}
+        assert dict(statuses.items()) == expected
+    finally:
+        store.close()
+
+
+def test_submit_many_blocks_once_queue_size_lookups_are_pending():
+    release = threading.Event()
+    started = []
+
+    def slow_fetch_json(url):
+        started.append(url)
+        release.wait(5)
+        return {"availableStatusKey": "OK"}
+
+    fetcher = StoreAvailabilityFetcher(
+        slow_fetch_json, "{sku_id}/{store_id}", ["s1", "s2"], workers=1, queue_size=3
+    )
+    producer = threading.Thread(target=fetcher.submit_many, args=([f"sku-{number}" for number in range(5)],))
+    producer.start()
+    producer.join(0.2)
+
+    assert producer.is_alive()  # 10 lookups, but only 3 may be pending
+    assert len(started) == 1
+    release.set()
+    producer.join(5)
+    statuses = fetcher.close()
+
+    assert not producer.is_alive()
+    assert len(statuses) == 10
+
+
+def test_matrix_and_long_layouts(tmp_path):
+    statuses = {("sku-1", "s1"): "A", ("sku-1", "s2"): "B", ("sku-2", "s1"): "C"}
+
+    matrix_path = write_store_availability(statuses, ["sku-1", "sku-2"], ["s1", "s2"], str(tmp_path / "stores.csv"))
+    long_path = write_store_availability(
+        statuses, ["sku-1", "sku-2"], ["s1", "s2"], str(tmp_path / "stores_long.csv"), layout="long"
+    )
+
+    matrix = pd.read_csv(matrix_path, dtype=str, keep_default_na=False)
+    assert matrix.to_dict("records") == [
+        {"singleSKUCatalogEntryID": "sku-1", "s1": "A", "s2": "B"},
+        {"singleSKUCatalogEntryID": "sku-2", "s1": "C", "s2": "N/A"},
+    ]
+    assert len(pd.read_csv(long_path)) == 4
+
+
+def test_main_writes_store_matrix_next_to_export(monkeypatch, tmp_path):
+    input_df = pd.DataFrame({"AEM_URL": ["/cat/phones/smartphones"]})
+
+    def fake_fetch_json_data(url, retries=None, timeout=None):
+        if "/availability/" in url:
+            return {"availableStatusKey": "EXHAUSTED" if "storeId=s2" in url else "LAST_PIECES"}
+        if "pageNumber=1&" in url:
+            return {"catalogEntryView": [{"uniqueID": "u1", "singleSKUCatalogEntryID": "sku-1"}]}
+        return {"catalogEntryView": []}
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(product_catalog_scraper.pd, "read_excel", lambda *args, **kwargs: input_df)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_additional_info", lambda parts: {})
+    monkeypatch.setattr(product_catalog_scraper, "fetch_json_data", fake_fetch_json_data)
+    monkeypatch.setattr(product_catalog_scraper, "fetch_single_availability", lambda sku_id: "LAST_PIECES")
+    monkeypatch.setattr(product_catalog_scraper, "save_to_excel", lambda data, filename: None)
+    monkeypatch.setitem(product_catalog_scraper.IO_CONFIG, "checkpoint_filename", None)
+    monkeypatch.setitem(
+        product_catalog_scraper.CONFIG,
+        "store_availability",
+        {"enabled": True, "store_ids": ["s1", "s2"], "filename_template": "stores.csv"},
+    )
+
+    product_catalog_scraper.main()
+
+    assert pd.read_csv(tmp_path / "stores.csv").to_dict("records") == [
+        {"singleSKUCatalogEntryID": "sku-1", "s1": "LAST_PIECES", "s2": "EXHAUSTED"}
+    ]
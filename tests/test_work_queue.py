@@ -0,0 +1,44 @@
+from work_queue import WorkQueue
+
+
+def test_lease_hands_out_each_unit_once_in_queue_order(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.sqlite")
+    queue.enqueue("category", [{"index": 0}, {"index": 1}])
+
+    first = queue.lease("worker-a")
+    second = queue.lease("worker-b")
+
+    assert first[1:] == ("category", {"index": 0})
+    assert second[1:] == ("category", {"index": 1})
+    assert queue.lease("worker-c") is None
+    assert queue.complete(first[0], "worker-a")
+    assert not queue.complete(second[0], "worker-a")
+    assert queue.counts() == {"pending": 0, "leased": 1, "done": 1, "failed": 0}
+
+
+def test_expired_and_failed_leases_are_requeued_until_max_attempts(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.sqlite", lease_timeout=-1, max_attempts=2)
+    queue.enqueue("category", [{"index": 0}])
+
+    unit_id, _, _ = queue.lease("dead-worker")
+    assert queue.lease("worker-b")[0] == unit_id
+    assert not queue.complete(unit_id, "dead-worker")
+
+    queue.fail(unit_id, "worker-b", "boom")
+
+    assert queue.lease("worker-c") is None
+    assert queue.counts()["failed"] == 1
+    assert list(queue.units("category", state="failed")) == [(unit_id, {"index": 0})]
+
+
+def test_enqueue_skus_batches_only_sku_ids_not_queued_before(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.sqlite")
+
+    assert queue.enqueue_skus(["sku-1", "sku-2", "sku-1", "sku-3"], batch_size=2) == 3
+    assert queue.enqueue_skus(["sku-2", "sku-4"], batch_size=2) == 1
+
+    assert [payload for _, payload in queue.units("availability", state="pending")] == [
+        ["sku-1", "sku-2"],
+        ["sku-3"],
+        ["sku-4"],
+    ]
@@ -0,0 +1,167 @@
+"""Durable SQLite work queue with leases, shared by the stage-2 coordinator and its workers."""
+
+import json
+import sqlite3
+import time
+
+
+class WorkQueue:
+    """
+    Queue of work units stored in an SQLite file.
+
+    Workers lease one unit at a time. A lease that is not completed or renewed
+    within ``lease_timeout`` seconds (e.g. because its worker died) is handed to
+    the next worker. A unit that failed ``max_attempts`` times is parked as
+    "failed" instead of being retried forever. Every method opens its own
+    transaction, so any number of worker processes can share the file.
+
+    Parameters:
+        path (str): SQLite database file.
+        lease_timeout (float): Seconds a lease stays valid without a renewal.
+        max_attempts (int): Leases per unit before it is marked failed.
+    """
+
+    def __init__(self, path, lease_timeout=900, max_attempts=3):
+        self.path = str(path)
+        self.lease_timeout = float(lease_timeout)
+        self.max_attempts = int(max_attempts)
+        self._connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS units (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                error TEXT);
+            CREATE INDEX IF NOT EXISTS units_state ON units (state, id);
+            CREATE TABLE IF NOT EXISTS skus (sku_id TEXT PRIMARY KEY);
+            """
+        )
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front so two workers never lease the same unit.
+        self._connection.execute("BEGIN IMMEDIATE")
+        return self._connection
+
+    def enqueue(self, kind, payloads):
+        """Add one unit of ``kind`` per JSON-serialisable payload."""
+        connection = self._transaction()
+        try:
+            connection.executemany(
+                "INSERT INTO units (kind, payload) VALUES (?, ?)",
+                [(kind, json.dumps(payload, ensure_ascii=False)) for payload in payloads],
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def enqueue_skus(self, sku_ids, batch_size=200):
+        """
+        Queue "availability" units for SKU IDs no worker has queued before.
+
+        Returns:
+            int: Number of newly queued SKU IDs.
+        """
+        connection = self._transaction()
+        try:
+            new_sku_ids = []
+            for sku_id in dict.fromkeys(str(sku_id) for sku_id in sku_ids):
+                if connection.execute("INSERT OR IGNORE INTO skus (sku_id) VALUES (?)", (sku_id,)).rowcount:
+                    new_sku_ids.append(sku_id)
+            connection.executemany(
+                "INSERT INTO units (kind, payload) VALUES ('availability', ?)",
+                [
+                    (json.dumps(new_sku_ids[start:start + batch_size]),)
+                    for start in range(0, len(new_sku_ids), batch_size)
+                ],
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return len(new_sku_ids)
+
+    def lease(self, worker_id):
+        """
+        Lease the oldest pending unit, first re-queueing leases that expired.
+
+        Returns:
+            tuple: ``(unit_id, kind, payload)``, or None when nothing is pending.
+        """
+        now = time.time()
+        connection = self._transaction()
+        try:
+            connection.execute(
+                "UPDATE units SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+                " error = COALESCE(error, 'lease expired'), lease_owner = NULL"
+                " WHERE state = 'leased' AND lease_expires < ?",
+                (self.max_attempts, now),
+            )
+            row = connection.execute(
+                "SELECT id, kind, payload FROM units WHERE state = 'pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                connection.execute(
+                    "UPDATE units SET state = 'leased', attempts = attempts + 1, lease_owner = ?, lease_expires = ?"
+                    " WHERE id = ?",
+                    (worker_id, now + self.lease_timeout, row[0]),
+                )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def _update_lease(self, unit_id, worker_id, assignments, parameters=()):
+        connection = self._transaction()
+        try:
+            updated = connection.execute(
+                f"UPDATE units SET {assignments} WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+                (*parameters, unit_id, worker_id),
+            ).rowcount
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return bool(updated)
+
+    def renew(self, unit_id, worker_id):
+        """Extend a lease that is still held; returns False if it was lost."""
+        return self._update_lease(unit_id, worker_id, "lease_expires = ?", (time.time() + self.lease_timeout,))
+
+    def complete(self, unit_id, worker_id):
+        """Mark a leased unit done; returns False if the lease was lost to another worker."""
+        return self._update_lease(unit_id, worker_id, "state = 'done', lease_owner = NULL")
+
+    def fail(self, unit_id, worker_id, error):
+        """Give a unit back after an error; it is retried until ``max_attempts`` is reached."""
+        return self._update_lease(
+            unit_id,
+            worker_id,
+            "state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, lease_owner = NULL, error = ?",
+            (self.max_attempts, str(error)),
+        )
+
+    def counts(self):
+        """Return the number of units per state."""
+        rows = self._connection.execute("SELECT state, COUNT(*) FROM units GROUP BY state").fetchall()
+        return {"pending": 0, "leased": 0, "done": 0, "failed": 0, **dict(rows)}
+
+    def units(self, kind, state="done"):
+        """Yield ``(unit_id, payload)`` of the units of ``kind`` in ``state``, in queue order."""
+        rows = self._connection.execute(
+            "SELECT id, payload FROM units WHERE kind = ? AND state = ? ORDER BY id", (kind, state)
+        ).fetchall()
+        for unit_id, payload in rows:
+            yield unit_id, json.loads(payload)
+
+    def close(self):
+        self._connection.close()